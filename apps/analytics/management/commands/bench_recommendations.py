@@ -0,0 +1,60 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.analytics.recommendations import BuildStats, similar_products
+from apps.core.benchmarks import environment_info, write_results
+
+
+class Command(BaseCommand):
+    help = 'Time the recommendation build on synthetic order lines (no database involved)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=1_000_000)
+        parser.add_argument('--products', type=int, default=20_000)
+        parser.add_argument('--lines-per-order', type=float, default=3.0)
+        parser.add_argument('--top-k', type=int, default=12)
+        parser.add_argument('--min-support', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the result as JSON to this file')
+
+    def _synthetic_lines(self, options):
+        import numpy as np
+
+        rng = np.random.default_rng(options['seed'])
+        lines = options['lines']
+        orders = max(1, int(lines / options['lines_per_order']))
+        # Long-tailed popularity, like a real catalog
+        weights = 1 / np.arange(1, options['products'] + 1) ** 0.8
+        products = rng.choice(options['products'], size=lines, p=weights / weights.sum())
+        return np.column_stack([rng.integers(0, orders, size=lines), products])
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        lines = self._synthetic_lines(options)
+        generate_s = time.perf_counter() - started
+
+        stats = BuildStats()
+        started = time.perf_counter()
+        neighbors = sum(len(ids) for _, ids, _ in similar_products(
+            lines, options['top_k'], options['min_support'], stats))
+        build_s = time.perf_counter() - started
+
+        result = {
+            **stats.as_dict(),
+            'top_k': options['top_k'],
+            'min_support': options['min_support'],
+            'neighbors': neighbors,
+            'generate_s': round(generate_s, 3),
+            'build_s': round(build_s, 3),
+            'environment': environment_info(),
+        }
+        self.stdout.write(
+            f"{result['lines']} lines, {result['orders']} orders, {result['products']} products: "
+            f"built in {result['build_s']}s ({result['timings_s']})"
+        )
+        if options['output']:
+            write_results(options['output'], result)
+        else:
+            self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from apps.analytics.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "frequently bought together" recommendations from recent order lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=None,
+                            help='Neighbours kept per product, defaults to RECOMMENDATION_TOP_K')
+        parser.add_argument('--min-support', type=int, default=None,
+                            help='Minimum orders two products share, defaults to '
+                                 'RECOMMENDATION_MIN_SUPPORT')
+        parser.add_argument('--window-days', type=int, default=None,
+                            help='Order history used, defaults to RECOMMENDATION_WINDOW_DAYS')
+
+    def handle(self, *args, **options):
+        stats = build_recommendations(top_k=options['top_k'], min_support=options['min_support'],
+                                      window_days=options['window_days'])
+        timings = ', '.join(f"{name} {value:.2f}s" for name, value in stats.timings.items())
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.stored} products stored from {stats.lines} lines in {stats.orders} orders "
+            f"({timings})"
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ("store", "0002_productvariant_stock_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductRecommendation",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="recommendation",
+                        serialize=False,
+                        to="store.product",
+                        verbose_name="المنتج",
+                    ),
+                ),
+                (
+                    "neighbors",
+                    models.JSONField(default=list, verbose_name="المنتجات المقترحة"),
+                ),
+                (
+                    "scores",
+                    models.JSONField(default=list, verbose_name="درجات التشابه"),
+                ),
+                (
+                    "built_at",
+                    models.DateTimeField(auto_now=True, verbose_name="تاريخ البناء"),
+                ),
+            ],
+            options={
+                "verbose_name": "توصية منتج",
+                "verbose_name_plural": "توصيات المنتجات",
+            },
+        ),
+    ]
@@ -1,3 +1,21 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class ProductRecommendation(models.Model):
+    """Top co-purchased products of a product, rebuilt by ``build_recommendations``."""
+    
+    product = models.OneToOneField('store.Product', on_delete=models.CASCADE,
+                                   primary_key=True, related_name='recommendation',
+                                   verbose_name=_('المنتج'))
+    # Product ids and their similarity scores, best first
+    neighbors = models.JSONField(_('المنتجات المقترحة'), default=list)
+    scores = models.JSONField(_('درجات التشابه'), default=list)
+    built_at = models.DateTimeField(_('تاريخ البناء'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('توصية منتج')
+        verbose_name_plural = _('توصيات المنتجات')
+    
+    def __str__(self):
+        return str(self.product_id)
@@ -0,0 +1,153 @@
+"""
+"Frequently bought together" recommendations.
+
+``build_recommendations`` turns recent order lines into a sparse
+order × product matrix, multiplies it by its transpose to get co-purchase
+counts, normalises them to cosine similarity and keeps the ``top_k`` best
+neighbours of every product in ``ProductRecommendation``. Serving is then a
+primary-key lookup per product (or one ``IN`` query for a cart) with no
+aggregation at request time.
+
+NumPy and SciPy are only imported by the batch job.
+"""
+
+import time
+from collections import defaultdict
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ProductRecommendation
+
+STORE_BATCH_SIZE = 1000
+FETCH_CHUNK_SIZE = 20000
+
+
+class BuildStats:
+    def __init__(self):
+        self.lines = 0
+        self.orders = 0
+        self.products = 0
+        self.stored = 0
+        self.timings = {}
+
+    def as_dict(self):
+        return {'lines': self.lines, 'orders': self.orders, 'products': self.products,
+                'stored': self.stored,
+                'timings_s': {name: round(value, 3) for name, value in self.timings.items()}}
+
+
+def load_order_lines(since=None):
+    """``(order id, product id)`` pairs of non-cancelled orders as an ``n × 2`` array."""
+    import numpy as np
+    from apps.orders.models import Order, OrderItem
+
+    lines = (OrderItem.objects.exclude(order__status=Order.Status.CANCELLED)
+             .values_list('order_id', 'product_id'))
+    if since is not None:
+        lines = lines.filter(order__created_at__gte=since)
+    flat = np.fromiter(chain.from_iterable(lines.iterator(chunk_size=FETCH_CHUNK_SIZE)),
+                       dtype=np.int64)
+    return flat.reshape(-1, 2)
+
+
+def similar_products(lines, top_k, min_support=1, stats=None):
+    """Yield ``(product id, neighbour ids, scores)`` from an ``n × 2`` array of order lines."""
+    import numpy as np
+    from scipy import sparse
+
+    stats = stats or BuildStats()
+    started = time.perf_counter()
+    order_ids, order_index = np.unique(lines[:, 0], return_inverse=True)
+    product_ids, product_index = np.unique(lines[:, 1], return_inverse=True)
+    stats.lines, stats.orders, stats.products = len(lines), len(order_ids), len(product_ids)
+
+    baskets = sparse.csr_matrix(
+        (np.ones(len(lines), dtype=np.float32), (order_index, product_index)),
+        shape=(len(order_ids), len(product_ids)),
+    )
+    baskets.data[:] = 1  # the same product twice in one order counts once
+    stats.timings['matrix'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    co_purchases = (baskets.T @ baskets).tocsr()
+    buyers = co_purchases.diagonal()
+    co_purchases.setdiag(0)
+    if min_support > 1:
+        co_purchases.data[co_purchases.data < min_support] = 0
+    co_purchases.eliminate_zeros()
+    # Cosine similarity: co-purchases / sqrt(buyers of a × buyers of b)
+    scale = sparse.diags(1 / np.sqrt(np.maximum(buyers, 1)))
+    similarity = (scale @ co_purchases @ scale).tocsr()
+    stats.timings['similarity'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    indptr, indices, data = similarity.indptr, similarity.indices, similarity.data
+    for row in range(len(product_ids)):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        scores = data[start:end]
+        best = np.arange(end - start)
+        if len(best) > top_k:
+            best = np.argpartition(-scores, top_k)[:top_k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        yield (int(product_ids[row]), product_ids[indices[start:end][best]].tolist(),
+               np.round(scores[best], 4).tolist())
+    stats.timings['top_k'] = time.perf_counter() - started
+
+
+def build_recommendations(top_k=None, min_support=None, window_days=None):
+    """Rebuild every product's recommendations; returns ``BuildStats``."""
+    top_k = top_k or settings.RECOMMENDATION_TOP_K
+    min_support = min_support or settings.RECOMMENDATION_MIN_SUPPORT
+    window_days = window_days or settings.RECOMMENDATION_WINDOW_DAYS
+    stats = BuildStats()
+
+    started = time.perf_counter()
+    lines = load_order_lines(since=timezone.now() - timedelta(days=window_days))
+    stats.timings['load'] = time.perf_counter() - started
+
+    rows = [ProductRecommendation(product_id=product_id, neighbors=neighbors, scores=scores)
+            for product_id, neighbors, scores in similar_products(lines, top_k, min_support, stats)]
+
+    started = time.perf_counter()
+    with transaction.atomic():
+        # Readers keep seeing the previous build until this commits.
+        ProductRecommendation.objects.all().delete()
+        ProductRecommendation.objects.bulk_create(rows, batch_size=STORE_BATCH_SIZE)
+    stats.stored = len(rows)
+    stats.timings['store'] = time.perf_counter() - started
+    return stats
+
+
+# Serving
+
+def recommended_ids(product_ids, limit=None):
+    """Best neighbours of one or more products (e.g. a cart), excluding the products themselves."""
+    limit = limit or settings.RECOMMENDATION_TOP_K
+    product_ids = set(product_ids)
+    if not product_ids:
+        return []
+    rows = (ProductRecommendation.objects.filter(product_id__in=product_ids)
+            .values_list('neighbors', 'scores'))
+    totals = defaultdict(float)
+    for neighbors, scores in rows:
+        for neighbor, score in zip(neighbors, scores):
+            if neighbor not in product_ids:
+                totals[neighbor] += score
+    return sorted(totals, key=totals.get, reverse=True)[:limit]
+
+
+def recommended_products(product_ids, limit=None):
+    """Published products recommended for ``product_ids``, best first."""
+    from apps.store.models import Product
+
+    limit = limit or settings.RECOMMENDATION_TOP_K
+    # Over-fetch a little so unpublished neighbours don't shorten the list.
+    ids = recommended_ids(product_ids, limit * 2)
+    products = Product.objects.published().for_listing().in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products][:limit]
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import recommendations
+
+
+@shared_task(ignore_result=True)
+def build_recommendations():
+    recommendations.build_recommendations()
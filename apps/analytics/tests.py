@@ -1,3 +1,57 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from apps.orders.models import Order, OrderItem
+from apps.payment.models import PaymentMethod
+from apps.store.models import Product
+from . import recommendations
+from .models import ProductRecommendation
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        payment_method = PaymentMethod.objects.create(
+            name='الدفع عند الاستلام', code='cod',
+            type=PaymentMethod.PaymentType.CASH_ON_DELIVERY,
+        )
+        cls.phone, cls.case, cls.charger, cls.book = [
+            Product.objects.create(name=name, sku=name, description='-', short_description='-',
+                                   price=10, quantity=100, status=Product.Status.PUBLISHED)
+            for name in ['phone', 'case', 'charger', 'book']
+        ]
+        baskets = [
+            [cls.phone, cls.case], [cls.phone, cls.case], [cls.phone, cls.case, cls.charger],
+            [cls.phone, cls.charger], [cls.phone, cls.charger], [cls.book],
+            [cls.book, cls.case],
+        ]
+        for products in baskets:
+            order = Order.objects.create(customer_name='عميل', customer_phone='+966500000000',
+                                         shipping_city='الرياض', shipping_address='شارع 1',
+                                         payment_method=payment_method)
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, product=product, product_name=product.name,
+                          product_sku=product.sku, price=product.price)
+                for product in products
+            ])
+
+    def test_build_ranks_co_purchased_products(self):
+        stats = recommendations.build_recommendations(top_k=2, min_support=2)
+        self.assertEqual((stats.lines, stats.orders, stats.products), (14, 7, 4))
+
+        phone = ProductRecommendation.objects.get(product=self.phone)
+        self.assertEqual(phone.neighbors, [self.charger.pk, self.case.pk])
+        # book and case share a single order, below the minimum support
+        self.assertFalse(ProductRecommendation.objects.filter(product=self.book).exists())
+
+    def test_product_and_cart_lookups(self):
+        recommendations.build_recommendations(top_k=2, min_support=1)
+
+        with self.assertNumQueries(2):
+            products = recommendations.recommended_products([self.phone.pk])
+        self.assertEqual(products, [self.charger, self.case])
+        self.assertEqual(recommendations.recommended_ids([self.phone.pk, self.charger.pk]),
+                         [self.case.pk])
+
+        response = self.client.get(reverse('store:product_recommendations', args=[self.book.pk]))
+        self.assertEqual([item['id'] for item in response.json()['results']], [self.case.pk])
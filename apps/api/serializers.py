@@ -0,0 +1,37 @@
+from rest_framework import serializers
+
+from apps.core.pricing import get_engine, money
+from apps.store.models import Product
+
+
+class PricedProductListSerializer(serializers.ListSerializer):
+    """Prices the whole page in one engine pass before serializing rows."""
+
+    def to_representation(self, data):
+        products = list(data.all() if hasattr(data, 'all') else data)
+        self.child.context['prices'] = get_engine().price_products(products)
+        return super().to_representation(products)
+
+
+class ProductSerializer(serializers.ModelSerializer):
+    price_with_tax = serializers.SerializerMethodField()
+    discount_percentage = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'uuid', 'name', 'slug', 'sku', 'short_description', 'price',
+                  'compare_price', 'price_with_tax', 'discount_percentage',
+                  'stock_status', 'is_featured', 'is_bestseller', 'is_new']
+        list_serializer_class = PricedProductListSerializer
+
+    def _price(self, obj):
+        prices = self.context.get('prices')
+        if prices is None or obj.pk not in prices:
+            prices = get_engine().price_products([obj])
+        return prices[obj.pk]
+
+    def get_price_with_tax(self, obj):
+        return str(money(self._price(obj).price_with_tax))
+
+    def get_discount_percentage(self, obj):
+        return self._price(obj).discount_percentage
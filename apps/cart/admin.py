@@ -13,7 +13,7 @@ class CartAdmin(admin.ModelAdmin):
     list_display = ['id', 'user', 'session_key', 'count', 'total', 'created_at']
     list_filter = ['created_at', 'updated_at']
     search_fields = ['user__email', 'session_key']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['created_at', 'updated_at', 'recovery_sent_at']
     inlines = [CartItemInline]
 
 
@@ -0,0 +1,103 @@
+"""
+Abandoned cart maintenance.
+
+Guest carts idle past ``CART_ABANDONED_TTL`` and empty customer carts are
+deleted in primary-key batches walked along the ``updated_at`` index, with
+an optional pause between batches so the reaper never holds locks for long
+or starves request traffic. Customer carts that still hold items are kept
+and get one recovery reminder per period of inactivity.
+"""
+
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from apps.core import notifications
+from .models import Cart, CartItem
+
+
+class ReapStats:
+    def __init__(self):
+        self.carts = 0
+        self.items = 0
+        self.batches = 0
+        self.recovery_sent = 0
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    @property
+    def carts_per_second(self):
+        return self.carts / self.elapsed if self.elapsed else 0.0
+
+
+def abandoned_carts(now=None):
+    """Guest carts past the TTL, and customer carts left empty past the TTL."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.CART_ABANDONED_TTL)
+    has_items = Exists(CartItem.objects.filter(cart=OuterRef('pk')))
+    return (Cart.objects.filter(updated_at__lt=cutoff)
+            .filter(Q(user__isnull=True) | ~has_items))
+
+
+def recoverable_carts(now=None):
+    """Customer carts with items, idle past the recovery delay and not yet reminded."""
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.CART_RECOVERY_DELAY)
+    return (Cart.objects.filter(user__isnull=False, updated_at__lt=cutoff)
+            .filter(Exists(CartItem.objects.filter(cart=OuterRef('pk'))))
+            .filter(Q(recovery_sent_at__isnull=True)
+                    | Q(recovery_sent_at__lt=F('updated_at'))))
+
+
+def send_recovery_reminders(now=None):
+    now = now or timezone.now()
+    cart_ids = list(recoverable_carts(now).values_list('pk', flat=True))
+    if cart_ids:
+        with transaction.atomic():
+            # Bypass save() so updated_at keeps measuring customer inactivity.
+            Cart.objects.filter(pk__in=cart_ids).update(recovery_sent_at=now)
+            notifications.notify(notifications.CART_RECOVERY, cart_ids)
+    return len(cart_ids)
+
+
+def reap_abandoned_carts(batch_size=None, pause=None, max_batches=None, now=None):
+    """Delete abandoned carts in batches; returns ``ReapStats``."""
+    batch_size = batch_size or settings.CART_REAP_BATCH_SIZE
+    pause = settings.CART_REAP_PAUSE if pause is None else pause
+    now = now or timezone.now()
+    stats = ReapStats()
+    stats.recovery_sent = send_recovery_reminders(now)
+
+    candidates = abandoned_carts(now).order_by('updated_at').values_list('pk', flat=True)
+    skipped = set()
+    while max_batches is None or stats.batches < max_batches:
+        batch = list(candidates.exclude(pk__in=skipped)[:batch_size])
+        if not batch:
+            break
+        with transaction.atomic():
+            # Re-check under lock: a customer may be using the cart right now.
+            cart_ids = list(abandoned_carts(now).filter(pk__in=batch)
+                            .select_for_update(skip_locked=True).values_list('pk', flat=True))
+            stats.items += CartItem.objects.filter(cart_id__in=cart_ids).delete()[0]
+            stats.carts += Cart.objects.filter(pk__in=cart_ids).delete()[0]
+        skipped.update(set(batch) - set(cart_ids))
+        stats.batches += 1
+        if pause and len(batch) == batch_size:
+            time.sleep(pause)
+    return stats
+
+
+def compact_cart_tables():
+    """Reclaim space after a large reap (``VACUUM ANALYZE`` / SQLite ``VACUUM``)."""
+    tables = [Cart._meta.db_table, CartItem._meta.db_table]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            for table in tables:
+                cursor.execute(f'VACUUM ANALYZE {connection.ops.quote_name(table)}')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
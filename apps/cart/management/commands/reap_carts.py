@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from apps.cart.maintenance import compact_cart_tables, reap_abandoned_carts
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned carts in throttled batches and send cart recovery reminders'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Carts deleted per transaction, defaults to CART_REAP_BATCH_SIZE')
+        parser.add_argument('--pause', type=float, default=None,
+                            help='Seconds to sleep between batches, defaults to CART_REAP_PAUSE')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='Stop after this many batches')
+        parser.add_argument('--compact', action='store_true',
+                            help='Vacuum the cart tables afterwards')
+
+    def handle(self, *args, **options):
+        stats = reap_abandoned_carts(batch_size=options['batch_size'], pause=options['pause'],
+                                     max_batches=options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.carts} carts and {stats.items} items deleted in {stats.batches} batches, "
+            f"{stats.elapsed:.2f}s ({stats.carts_per_second:.0f} carts/s); "
+            f"{stats.recovery_sent} recovery reminders sent"
+        ))
+        if options['compact']:
+            compact_cart_tables()
+            self.stdout.write('Cart tables compacted')
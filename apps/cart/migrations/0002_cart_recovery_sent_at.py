@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("cart", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cart",
+            name="recovery_sent_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="تاريخ إرسال التذكير"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="cart",
+            index=models.Index(
+                fields=["updated_at"], name="cart_cart_updated_c46eb6_idx"
+            ),
+        ),
+    ]
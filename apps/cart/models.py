@@ -2,6 +2,9 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
 from decimal import Decimal
+import secrets
+
+GUEST_COOKIE_SALT = 'apps.cart.guest'
 
 
 class Cart(models.Model):
@@ -10,45 +13,69 @@ class Cart(models.Model):
                                null=True, blank=True, 
                                related_name='cart',
                                verbose_name=_('المستخدم'))
+    # Guest carts: random token kept in the signed cart cookie
     session_key = models.CharField(_('مفتاح الجلسة'), max_length=40, 
                                   null=True, blank=True, db_index=True)
     created_at = models.DateTimeField(_('تاريخ الإنشاء'), auto_now_add=True)
     updated_at = models.DateTimeField(_('تاريخ التحديث'), auto_now=True)
+    recovery_sent_at = models.DateTimeField(_('تاريخ إرسال التذكير'), null=True, blank=True)
     
     class Meta:
         verbose_name = _('سلة التسوق')
         verbose_name_plural = _('سلال التسوق')
+        indexes = [
+            models.Index(fields=['updated_at']),
+        ]
     
     def __str__(self):
         if self.user:
             return f"سلة {self.user.email}"
         return f"سلة الجلسة {self.session_key}"
     
+    @staticmethod
+    def guest_token(request):
+        """Guest cart token from the signed cart cookie, or ``None``."""
+        return request.get_signed_cookie(settings.CART_COOKIE_NAME, default=None,
+                                         salt=GUEST_COOKIE_SALT,
+                                         max_age=settings.CART_ABANDONED_TTL)
+    
+    @staticmethod
+    def set_guest_cookie(response, token):
+        response.set_signed_cookie(settings.CART_COOKIE_NAME, token, salt=GUEST_COOKIE_SALT,
+                                   max_age=settings.CART_ABANDONED_TTL, httponly=True,
+                                   samesite='Lax', secure=settings.SESSION_COOKIE_SECURE)
+    
     @staticmethod
     def get_or_create_cart(request):
+        # Guests are identified by a signed cookie instead of a session, so
+        # browsing without a cart never writes a session row.
+        token = Cart.guest_token(request)
         if request.user.is_authenticated:
             cart, created = Cart.objects.get_or_create(user=request.user)
-            session_cart = Cart.objects.filter(
-                session_key=request.session.session_key
-            ).first()
-            if session_cart and session_cart != cart:
-                cart.merge_with(session_cart)
-                session_cart.delete()
+            if token:
+                guest_cart = Cart.objects.filter(session_key=token,
+                                                 user__isnull=True).first()
+                if guest_cart:
+                    cart.merge_with(guest_cart)
+                    guest_cart.delete()
         else:
-            if not request.session.session_key:
-                request.session.create()
             cart, created = Cart.objects.get_or_create(
-                session_key=request.session.session_key
+                session_key=token or secrets.token_urlsafe(24)
             )
         return cart
     
+    @staticmethod
+    def summary_cache_key(user_id=None, session_key=None):
+        if user_id:
+            return f"cart-summary:user:{user_id}"
+        return f"cart-summary:session:{session_key}"
+    
     def add_item(self, product, variant=None, quantity=1, override_quantity=False):
-        from apps.store.models import Product, ProductVariant
-        
+        # ``product`` and ``variant`` may be instances or primary keys
         cart_item, created = CartItem.objects.get_or_create(
             cart=self,
-            product=product,
-            variant=variant,
+            product_id=getattr(product, 'pk', product),
+            variant_id=getattr(variant, 'pk', variant),
             defaults={'quantity': quantity}
         )
         
@@ -99,25 +126,33 @@ class Cart(models.Model):
     def total_quantity(self):
         return sum(item.quantity for item in self.items)
     
+    def quote(self, items=None):
+        from apps.core.pricing import get_engine
+        
+        return get_engine().price_cart_items(self.items if items is None else items)
+    
     @property
     def subtotal(self):
-        return sum(item.total_price for item in self.items)
+        return self.quote().subtotal
     
     @property
     def tax_total(self):
-        return sum(item.tax_amount for item in self.items)
+        return self.quote().tax_total
     
     @property
     def total(self):
-        return self.subtotal + self.tax_total
+        return self.quote().total
     
     def get_summary(self):
+        items = list(self.items)
+        quote = self.quote(items)
         return {
-            'count': self.count,
-            'total_quantity': self.total_quantity,
-            'subtotal': float(self.subtotal),
-            'tax_total': float(self.tax_total),
-            'total': float(self.total),
+            'count': len(items),
+            'total_quantity': quote.total_quantity,
+            'subtotal': float(quote.subtotal),
+            'tax_total': float(quote.tax_total),
+            'shipping_cost': float(quote.shipping_cost),
+            'total': float(quote.total),
             'items': [
                 {
                     'id': item.id,
@@ -125,10 +160,10 @@ class Cart(models.Model):
                     'product_name': item.product.name,
                     'variant_id': item.variant.id if item.variant else None,
                     'quantity': item.quantity,
-                    'price': float(item.unit_price),
-                    'total_price': float(item.total_price),
+                    'price': float(line.unit_price),
+                    'total_price': float(line.total_price),
                 }
-                for item in self.items
+                for item, line in zip(items, quote.lines)
             ]
         }
 
@@ -156,9 +191,9 @@ class CartItem(models.Model):
     
     @property
     def unit_price(self):
-        if self.variant and self.variant.final_price:
-            return self.variant.final_price
-        return self.product.price
+        from apps.core.pricing import PricingEngine
+        
+        return PricingEngine.unit_price(self.product, self.variant)
     
     @property
     def tax_rate(self):
@@ -166,7 +201,9 @@ class CartItem(models.Model):
     
     @property
     def tax_amount(self):
-        return (self.unit_price * self.tax_rate / 100) * self.quantity
+        from apps.core.pricing import get_engine
+        
+        return self.unit_price * get_engine().tax_factor(self.tax_rate) * self.quantity
     
     @property
     def total_price(self):
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.redis_client import get_redis
+from .models import Cart
+
+
+@receiver(post_save, sender=Cart)
+@receiver(post_delete, sender=Cart)
+def cart_changed(sender, instance, **kwargs):
+    redis = get_redis()
+    if redis is not None:
+        redis.delete(Cart.summary_cache_key(instance.user_id, instance.session_key))
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import maintenance
+
+
+@shared_task(ignore_result=True)
+def reap_abandoned_carts():
+    maintenance.reap_abandoned_carts()
@@ -1,3 +1,190 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core import mail, signing
+from django.core.cache import cache
+from django.db.models import F
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.accounts.models import User
+from apps.core.pricing import get_engine
+from apps.store.models import Attribute, AttributeValue, Product, ProductVariant
+from .maintenance import reap_abandoned_carts
+from .models import GUEST_COOKIE_SALT, Cart, CartItem
+
+
+class CartAddTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='حذاء', sku='SHOE', description='-', short_description='-',
+            price=200, quantity=10, product_type=Product.ProductType.VARIABLE,
+        )
+        size = Attribute.objects.create(name='المقاس')
+        cls.size_42 = AttributeValue.objects.create(attribute=size, value='42')
+        cls.size_43 = AttributeValue.objects.create(attribute=size, value='43')
+        cls.variant = ProductVariant.objects.create(product=cls.product, sku='SHOE-42',
+                                                    quantity=2)
+        cls.variant.attributes.set([cls.size_42])
+        sold_out = ProductVariant.objects.create(product=cls.product, sku='SHOE-43')
+        sold_out.attributes.set([cls.size_43])
+
+    def setUp(self):
+        cache.clear()
+
+    def add(self, attributes, quantity=1):
+        return self.client.post(reverse('cart:cart_add'), {
+            'product_id': self.product.pk, 'attributes': attributes, 'quantity': quantity,
+        })
+
+    def test_add_resolves_variant_from_attributes(self):
+        response = self.add([self.size_42.pk], quantity=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['variant_id'], self.variant.pk)
+        item = CartItem.objects.get()
+        self.assertEqual((item.variant_id, item.quantity), (self.variant.pk, 2))
+
+    def test_add_rejects_unavailable_variant(self):
+        self.assertEqual(self.add([self.size_43.pk]).status_code, 409)
+        self.assertEqual(self.add([self.size_42.pk, self.size_43.pk]).status_code, 404)
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_stock_check_reads_live_quantity_and_counts_the_cart(self):
+        self.assertEqual(self.add([self.size_42.pk]).status_code, 200)
+        # A bulk decrement sends no signal, so a cached quantity would still say 2.
+        ProductVariant.objects.filter(pk=self.variant.pk).update(quantity=F('quantity') - 1)
+        response = self.add([self.size_42.pk])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['available'], 0)
+
+        ProductVariant.objects.filter(pk=self.variant.pk).update(quantity=3)
+        self.assertEqual(self.add([self.size_42.pk], quantity=3).status_code, 409)
+        self.assertEqual(self.add([self.size_42.pk], quantity=2).status_code, 200)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+
+
+class CartSummaryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cart = Cart.objects.create(session_key='summary')
+        for i in range(5):
+            product = Product.objects.create(
+                name=f'منتج {i}', sku=f'P-{i}', description='-', short_description='-',
+                price=10 * (i + 1), quantity=10,
+            )
+            cls.cart.add_item(product, quantity=2)
+
+    def test_summary_prices_cart_in_one_query(self):
+        get_engine()
+        with self.assertNumQueries(1):
+            summary = self.cart.get_summary()
+        self.assertEqual(summary['count'], 5)
+        self.assertEqual(summary['total_quantity'], 10)
+        self.assertEqual(summary['subtotal'], 300.0)
+        self.assertEqual(summary['tax_total'], 45.0)
+        self.assertEqual(summary['total'], 370.0)
+        self.assertEqual(summary['shipping_cost'], 25.0)
+
+
+class CartSummaryViewTests(TestCase):
+    def test_guest_without_session(self):
+        response = self.client.get(reverse('cart:cart_summary'))
+        self.assertEqual(response.json(), {'count': 0, 'total_quantity': 0, 'unavailable': 0})
+
+    def test_summary_counts_unavailable_items(self):
+        in_stock = Product.objects.create(name='أ', sku='A', description='-',
+                                          short_description='-', price=10, quantity=5)
+        scarce = Product.objects.create(name='ب', sku='B', description='-',
+                                        short_description='-', price=10, quantity=1)
+        self.client.post(reverse('cart:cart_add'), {'product_id': in_stock.pk, 'quantity': 2})
+        Cart.objects.get().add_item(scarce, quantity=3)
+
+        response = self.client.get(reverse('cart:cart_summary'))
+        self.assertEqual(response.json(), {'count': 2, 'total_quantity': 5, 'unavailable': 1})
+
+
+class GuestCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='قلم', sku='PEN', description='-',
+                                             short_description='-', price=5, quantity=10)
+
+    def test_guest_cart_uses_signed_cookie_without_session(self):
+        self.client.get(reverse('cart:cart_summary'))
+        self.assertFalse(Cart.objects.exists())
+
+        response = self.client.post(reverse('cart:cart_add'), {'product_id': self.product.pk})
+        self.assertIn(settings.CART_COOKIE_NAME, response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+
+        response = self.client.post(reverse('cart:cart_add'), {'product_id': self.product.pk})
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+        self.assertFalse(Session.objects.exists())
+
+    def test_cookie_is_reissued_on_every_write(self):
+        url = reverse('cart:cart_add')
+        # First add signed almost CART_ABANDONED_TTL ago
+        signed_at = signing.b62_encode(int(time.time()) - settings.CART_ABANDONED_TTL + 60)
+        with mock.patch.object(signing.TimestampSigner, 'timestamp', return_value=signed_at):
+            self.client.post(url, {'product_id': self.product.pk})
+
+        response = self.client.post(url, {'product_id': self.product.pk})
+        self.assertEqual(CartItem.objects.get().quantity, 2)
+        request = RequestFactory().get('/')
+        request.COOKIES[settings.CART_COOKIE_NAME] = response.cookies[settings.CART_COOKIE_NAME].value
+        self.assertEqual(request.get_signed_cookie(settings.CART_COOKIE_NAME,
+                                                   salt=GUEST_COOKIE_SALT, max_age=60),
+                         Cart.objects.get().session_key)
+
+    def test_tampered_cookie_is_ignored(self):
+        Cart.objects.create(session_key='victim').add_item(self.product)
+        self.client.cookies[settings.CART_COOKIE_NAME] = 'victim'
+        response = self.client.get(reverse('cart:cart_summary'))
+        self.assertEqual(response.json()['count'], 0)
+
+    def test_guest_cart_is_merged_on_login(self):
+        self.client.post(reverse('cart:cart_add'), {'product_id': self.product.pk})
+        user = User.objects.create_user(email='g@example.com', password='x',
+                                        first_name='a', last_name='b')
+        self.client.force_login(user)
+        response = self.client.post(reverse('cart:cart_add'), {'product_id': self.product.pk})
+        self.assertEqual(response.cookies[settings.CART_COOKIE_NAME].value, '')
+        cart = Cart.objects.get()
+        self.assertEqual((cart.user_id, cart.cart_items.get().quantity), (user.pk, 2))
+
+
+class CartReaperTests(TestCase):
+    def test_reaps_abandoned_carts_and_reminds_customers(self):
+        product = Product.objects.create(name='كتاب', sku='BOOK', description='-',
+                                         short_description='-', price=50, quantity=10)
+        customer = User.objects.create_user(email='c@example.com', password='x',
+                                            first_name='a', last_name='b')
+        idle_user = User.objects.create_user(email='idle@example.com', password='x',
+                                             first_name='a', last_name='b')
+        guests = [Cart.objects.create(session_key=f'guest-{i}') for i in range(5)]
+        guests[0].add_item(product)
+        customer_cart = Cart.objects.create(user=customer)
+        customer_cart.add_item(product)
+        empty_customer_cart = Cart.objects.create(user=idle_user)
+        fresh = Cart.objects.create(session_key='fresh')
+        Cart.objects.exclude(pk=fresh.pk).update(updated_at=timezone.now() - timedelta(days=60))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = reap_abandoned_carts(batch_size=2, pause=0)
+
+        self.assertEqual((stats.carts, stats.items, stats.batches), (6, 1, 3))
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)),
+                         {customer_cart.pk, fresh.pk})
+        self.assertFalse(Cart.objects.filter(pk=empty_customer_cart.pk).exists())
+        self.assertEqual(stats.recovery_sent, 1)
+        self.assertEqual(mail.outbox[0].to, ['c@example.com'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(reap_abandoned_carts(pause=0).recovery_sent, 0)
+        self.assertEqual(len(mail.outbox), 1)
@@ -0,0 +1,11 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'cart'
+
+urlpatterns = [
+    path('add/', views.cart_add, name='cart_add'),
+    path('summary/', views.cart_summary, name='cart_summary'),
+    path('recommendations/', views.cart_recommendations, name='cart_recommendations'),
+]
@@ -1,3 +1,118 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from apps.core.redis_client import get_async_redis
+from apps.store.models import Product
+from apps.store.variants import get_variant_matrix, variant_quantity
+from .models import Cart, CartItem
+
+CART_SUMMARY_TTL = 30
+
+
+@require_POST
+def cart_add(request):
+    product = get_object_or_404(Product.objects.only('id', 'quantity', 'manage_stock'),
+                                pk=request.POST.get('product_id'), is_active=True)
+    try:
+        quantity = max(int(request.POST.get('quantity', 1)), 1)
+        attribute_ids = [int(pk) for pk in request.POST.getlist('attributes')]
+    except ValueError:
+        return JsonResponse({'error': 'invalid'}, status=400)
+
+    variant_id = None
+    available = product.quantity
+    if attribute_ids:
+        variant = get_variant_matrix(product.pk).resolve(attribute_ids)
+        if variant is None:
+            return JsonResponse({'error': 'variant_not_found'}, status=404)
+        variant_id = variant['id']
+        available = variant_quantity(variant_id)
+
+    if variant_id or product.manage_stock:
+        # What is already in the cart counts against the same stock.
+        lookup, _ = cart_owner(request)
+        in_cart = 0
+        if lookup is not None:
+            in_cart = (CartItem.objects.filter(**lookup, product=product, variant_id=variant_id)
+                       .values_list('quantity', flat=True).first()) or 0
+        if available < in_cart + quantity:
+            return JsonResponse({'error': 'out_of_stock', 'available': available - in_cart},
+                                status=409)
+
+    # The cart (and the guest cookie) only come into existence on the first add.
+    cart = Cart.get_or_create_cart(request)
+    cart.add_item(product, variant=variant_id, quantity=quantity)
+    response = JsonResponse({'count': cart.count, 'variant_id': variant_id})
+    sync_guest_cookie(request, response, cart)
+    return response
+
+
+def sync_guest_cookie(request, response, cart):
+    """Re-issue the guest cart cookie on every cart write, drop it once merged.
+
+    The signature's age is checked against ``CART_ABANDONED_TTL``, so a cookie
+    that was only set on the first add would orphan a cart still in use.
+    """
+    if cart.user_id:
+        if settings.CART_COOKIE_NAME in request.COOKIES:
+            response.delete_cookie(settings.CART_COOKIE_NAME)
+    else:
+        Cart.set_guest_cookie(response, cart.session_key)
+
+
+def cart_owner(request):
+    """Cart lookup and cache key for the request, without touching the session."""
+    if request.user.is_authenticated:
+        return {'cart__user_id': request.user.pk}, Cart.summary_cache_key(user_id=request.user.pk)
+    token = Cart.guest_token(request)
+    if token:
+        return {'cart__session_key': token}, Cart.summary_cache_key(session_key=token)
+    return None, None
+
+
+@require_GET
+def cart_recommendations(request):
+    """Products frequently bought with what is in the cart."""
+    from apps.analytics.recommendations import recommended_products
+    from apps.api.serializers import ProductSerializer
+
+    lookup, _ = cart_owner(request)
+    product_ids = []
+    if lookup is not None:
+        product_ids = CartItem.objects.filter(**lookup).values_list('product_id', flat=True)
+    products = recommended_products(product_ids)
+    return JsonResponse({'results': ProductSerializer(products, many=True).data})
+
+
+async def cart_summary(request):
+    """Cart badge and availability, polled frequently by the storefront."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    lookup, key = await sync_to_async(cart_owner)(request)
+    if lookup is None:
+        return JsonResponse({'count': 0, 'total_quantity': 0, 'unavailable': 0})
+
+    redis = get_async_redis()
+    if redis is not None:
+        cached = await redis.get(key)
+        if cached is not None:
+            return HttpResponse(cached, content_type='application/json')
+
+    available = Coalesce('variant__quantity', 'product__quantity')
+    totals = await CartItem.objects.filter(**lookup).aaggregate(
+        count=Count('id'),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        unavailable=Count('id', filter=Q(quantity__gt=available)),
+    )
+    payload = json.dumps(totals)
+    if redis is not None:
+        await redis.set(key, payload, ex=CART_SUMMARY_TTL)
+    return HttpResponse(payload, content_type='application/json')
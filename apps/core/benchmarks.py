@@ -0,0 +1,258 @@
+"""
+Helpers shared by the benchmark management commands.
+"""
+
+import asyncio
+import contextlib
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def latency_stats(latencies):
+    """Summarise latencies given in seconds as milliseconds."""
+    return {
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'max_ms': round(max(latencies, default=0) * 1000, 3),
+    }
+
+
+def measure(run, repeat=20, warmup=2):
+    """Latency, query count and peak Python allocations of ``run()``.
+
+    Queries and memory come from one extra call made with a query counter and
+    tracemalloc on; the timed calls run without either. Queries are counted
+    with an execute wrapper because ``connection.queries`` is reset at the
+    start of every request.
+    """
+    import tracemalloc
+
+    from django.db import connection
+
+    queries = 0
+
+    def count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    for _ in range(warmup):
+        run()
+    tracemalloc.start()
+    try:
+        with connection.execute_wrapper(count):
+            run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        latencies.append(time.perf_counter() - started)
+    return {
+        **latency_stats(latencies),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        'queries': queries,
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, check=False).stdout.strip()
+    except OSError:
+        commit = ''
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'database': settings.DATABASES['default']['ENGINE'].rsplit('.', 1)[-1],
+    }
+
+
+def write_results(path, results):
+    with open(path, 'w', encoding='utf-8') as output:
+        json.dump(results, output, indent=2, ensure_ascii=False, default=str)
+
+
+# HTTP load generation
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get('transfer-encoding') == 'chunked':
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif 'content-length' in headers:
+        await reader.readexactly(int(headers['content-length']))
+    else:
+        await reader.read()
+        headers['connection'] = 'close'
+    return status, headers.get('connection') != 'close'
+
+
+async def _http_worker(host, port, request, deadline, latencies, errors):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await _read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors.append(status)
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            errors.append('connection')
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def _run_http(url, concurrency, duration, headers):
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    path = parts.path or '/'
+    if parts.query:
+        path = f"{path}?{parts.query}"
+    lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", 'Connection: keep-alive']
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    request = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _http_worker(host, port, request, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    return latencies, errors, elapsed
+
+
+def run_http_benchmark(url, concurrency=50, duration=10.0, headers=None):
+    """Hammer ``url`` with keep-alive GETs and return throughput and latency."""
+    latencies, errors, elapsed = asyncio.run(_run_http(url, concurrency, duration, headers or {}))
+    return {
+        'url': url,
+        'concurrency': concurrency,
+        'duration_s': round(elapsed, 3),
+        'requests': len(latencies),
+        'errors': len(errors),
+        'requests_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        **latency_stats(latencies),
+    }
+
+
+# Startup cost
+
+STARTUP_TARGETS = {
+    # What a management command or Celery worker pays before doing any work
+    'setup': 'import django; django.setup()',
+    # WSGI boot plus loading the URLconf, as on the first request
+    'wsgi': ('from config.wsgi import application\n'
+             'from django.urls import get_resolver\n'
+             'get_resolver().url_patterns'),
+}
+
+
+def parse_importtime(output):
+    """Cumulative import time in ms per top-level package from ``-X importtime``."""
+    packages = {}
+    modules = 0
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        modules += 1
+        if name[1:3] == '  ':
+            continue  # nested import, already included in its parent's cumulative time
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(cumulative) / 1000
+    return modules, packages
+
+
+def profile_startup(settings_module, target='setup'):
+    """Boot Django in a fresh interpreter with ``-X importtime``."""
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+    started = time.perf_counter()
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_TARGETS[target]],
+                             cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if process.returncode:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1])
+    modules, packages = parse_importtime(process.stderr)
+    return {
+        'wall_ms': round(wall_ms, 1),
+        'import_ms': round(sum(packages.values()), 1),
+        'modules': modules,
+        'packages': packages,
+    }
+
+
+@contextlib.contextmanager
+def serve(args, port, env=None, timeout=30):
+    """Run a server process (e.g. gunicorn) until ``port`` accepts connections."""
+    process = subprocess.Popen([sys.executable, '-m', *args], cwd=settings.BASE_DIR,
+                               env={**os.environ, **(env or {})})
+    try:
+        deadline = time.monotonic() + timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"{args[0]} exited with code {process.returncode}")
+            try:
+                socket.create_connection(('127.0.0.1', port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"{args[0]} did not start within {timeout}s")
+                time.sleep(0.2)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
@@ -0,0 +1,205 @@
+"""
+Event fan-out for server-sent events.
+
+``publish`` can be called from any synchronous code (signals, tasks,
+admin actions). Subscribers are asyncio queues held by SSE / long-poll
+views, so one ASGI worker can keep thousands of idle clients without a
+thread per client.
+
+With Redis configured, events travel over Redis pub/sub and each event loop
+keeps a single pattern subscription that fans messages out to its local
+queues. Without Redis (development and tests) events are delivered to
+subscribers in the same process.
+"""
+
+import asyncio
+import contextlib
+import json
+import threading
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .redis_client import get_async_redis, get_redis, redis_enabled
+
+CHANNEL_PREFIX = 'events:'
+QUEUE_SIZE = 100
+# Seconds between SSE keep-alive comments
+HEARTBEAT_INTERVAL = 15
+# Seconds a long-poll request waits for the first event
+LONG_POLL_TIMEOUT = 25
+# Streams are closed after this many seconds and the browser reconnects.
+# Django 4.2 does not notice client disconnects while streaming, so this
+# bounds how long an abandoned stream keeps its subscription.
+STREAM_LIFETIME = 300
+
+STAFF_CHANNEL = 'staff'
+# Seconds between attempts to resubscribe after the pub/sub connection drops,
+# doubling up to the maximum
+RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 30
+
+
+def order_channel(order_uuid):
+    return f"order:{order_uuid}"
+
+
+def product_channel(product_id):
+    return f"product:{product_id}"
+
+
+class _Fanout:
+    """Subscriber queues of one event loop, keyed by channel."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = defaultdict(set)
+
+    def dispatch(self, channel, message):
+        for queue in list(self.subscribers.get(channel, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Slow client: drop the event rather than grow without bound.
+                pass
+
+
+class BaseBroker:
+    def __init__(self):
+        self._fanouts = {}
+        self._lock = threading.Lock()
+
+    def _fanout(self):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            fanout = self._fanouts.get(loop)
+            if fanout is None:
+                for closed in [other for other in self._fanouts if other.is_closed()]:
+                    del self._fanouts[closed]
+                fanout = self._fanouts[loop] = _Fanout(loop)
+                self._started(fanout)
+        return fanout
+
+    def _started(self, fanout):
+        pass
+
+    def publish(self, channel, event, data):
+        raise NotImplementedError
+
+    @staticmethod
+    def encode(event, data):
+        return json.dumps({'event': event, 'data': data}, cls=DjangoJSONEncoder)
+
+    @contextlib.asynccontextmanager
+    async def subscribe(self, channels):
+        fanout = self._fanout()
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        for channel in channels:
+            fanout.subscribers[channel].add(queue)
+        try:
+            yield queue
+        finally:
+            for channel in channels:
+                subscribers = fanout.subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(queue)
+                    if not subscribers:
+                        del fanout.subscribers[channel]
+
+
+class InMemoryBroker(BaseBroker):
+    def publish(self, channel, event, data):
+        message = self.encode(event, data)
+        with self._lock:
+            fanouts = [fanout for loop, fanout in self._fanouts.items() if not loop.is_closed()]
+        for fanout in fanouts:
+            fanout.loop.call_soon_threadsafe(fanout.dispatch, channel, message)
+
+
+class RedisBroker(BaseBroker):
+    def publish(self, channel, event, data):
+        get_redis().publish(CHANNEL_PREFIX + channel, self.encode(event, data))
+
+    def _started(self, fanout):
+        fanout.listener = fanout.loop.create_task(self._listen(fanout))
+
+    async def _listen(self, fanout):
+        # Runs for the life of the event loop: if the pub/sub connection drops,
+        # resubscribe with backoff so open streams keep receiving events.
+        # Events published while disconnected are lost.
+        delay = RECONNECT_DELAY
+        while True:
+            pubsub = get_async_redis().pubsub()
+            try:
+                await pubsub.psubscribe(CHANNEL_PREFIX + '*')
+                delay = RECONNECT_DELAY
+                async for message in pubsub.listen():
+                    if message['type'] != 'pmessage':
+                        continue
+                    channel = message['channel'].decode()[len(CHANNEL_PREFIX):]
+                    fanout.dispatch(channel, message['data'].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                pass
+            finally:
+                with contextlib.suppress(Exception):
+                    await pubsub.reset()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = RedisBroker() if redis_enabled() else InMemoryBroker()
+    return _broker
+
+
+def publish(channels, event, data):
+    broker = get_broker()
+    for channel in channels:
+        broker.publish(channel, event, data)
+
+
+# Views
+
+async def _event_stream(channels):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + STREAM_LIFETIME
+    async with get_broker().subscribe(channels) as queue:
+        yield 'retry: 3000\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(queue.get(), min(HEARTBEAT_INTERVAL, remaining))
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield f"data: {message}\n\n"
+
+
+async def _long_poll(channels, timeout):
+    async with get_broker().subscribe(channels) as queue:
+        try:
+            messages = [await asyncio.wait_for(queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not queue.empty():
+            messages.append(queue.get_nowait())
+    return [json.loads(message) for message in messages]
+
+
+async def event_response(request, channels):
+    """SSE stream for ``channels``, or a single long-poll batch with ``?poll=1``."""
+    if request.GET.get('poll'):
+        events = await _long_poll(channels, LONG_POLL_TIMEOUT)
+        return JsonResponse({'events': events})
+
+    response = StreamingHttpResponse(_event_stream(channels), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,108 @@
+"""
+factory-boy factories for synthetic catalog, cart and order data.
+
+Used by ``manage.py bench_hotpaths``; needs the development requirements
+(factory-boy and Faker). Foreign keys default to ``None`` or a SubFactory
+so callers seeding large tables can ``build_batch`` and ``bulk_create``
+with ids they already have.
+"""
+
+from decimal import Decimal
+
+import factory
+from factory.django import DjangoModelFactory
+
+
+class CategoryFactory(DjangoModelFactory):
+    class Meta:
+        model = 'store.Category'
+
+    name = factory.Faker('word')
+    slug = factory.Sequence(lambda n: f'category-{n}')
+
+
+class BrandFactory(DjangoModelFactory):
+    class Meta:
+        model = 'store.Brand'
+
+    name = factory.Sequence(lambda n: f'Brand {n}')
+    slug = factory.Sequence(lambda n: f'brand-{n}')
+
+
+class ProductFactory(DjangoModelFactory):
+    class Meta:
+        model = 'store.Product'
+
+    name = factory.Faker('sentence', nb_words=3)
+    slug = factory.Sequence(lambda n: f'product-{n}')
+    sku = factory.Sequence(lambda n: f'SKU-{n:07d}')
+    description = factory.Faker('paragraph')
+    short_description = factory.Faker('sentence')
+    price = factory.Faker('pydecimal', left_digits=4, right_digits=2, min_value=1,
+                          max_value=5000)
+    quantity = factory.Faker('random_int', min=0, max=500)
+    sales_count = factory.Faker('random_int', min=0, max=1000)
+    rank_score = factory.Faker('pyfloat', min_value=0, max_value=50)
+    status = 'published'
+
+
+class UserFactory(DjangoModelFactory):
+    class Meta:
+        model = 'accounts.User'
+
+    email = factory.Sequence(lambda n: f'user{n}@example.com')
+    first_name = factory.Faker('first_name')
+    last_name = factory.Faker('last_name')
+    # Hashing a real password per row would dominate seeding time.
+    password = '!'
+
+
+class PaymentMethodFactory(DjangoModelFactory):
+    class Meta:
+        model = 'payment.PaymentMethod'
+        django_get_or_create = ('code',)
+
+    name = 'الدفع عند الاستلام'
+    code = 'cod'
+    type = 'cod'
+
+
+class CartFactory(DjangoModelFactory):
+    class Meta:
+        model = 'cart.Cart'
+
+    session_key = factory.Sequence(lambda n: f'bench-cart-{n}')
+
+
+class CartItemFactory(DjangoModelFactory):
+    class Meta:
+        model = 'cart.CartItem'
+
+    cart = factory.SubFactory(CartFactory)
+    product = factory.SubFactory(ProductFactory)
+    quantity = factory.Faker('random_int', min=1, max=3)
+
+
+class OrderFactory(DjangoModelFactory):
+    class Meta:
+        model = 'orders.Order'
+
+    order_number = factory.Sequence(lambda n: f'BENCH-{n:07d}')
+    customer_name = factory.Faker('name')
+    customer_phone = '+966500000000'
+    shipping_city = factory.Faker('city')
+    shipping_address = factory.Faker('street_address')
+    payment_method = factory.SubFactory(PaymentMethodFactory)
+
+
+class OrderItemFactory(DjangoModelFactory):
+    class Meta:
+        model = 'orders.OrderItem'
+
+    order = factory.SubFactory(OrderFactory)
+    product = factory.SubFactory(ProductFactory)
+    product_name = factory.LazyAttribute(lambda item: item.product.name)
+    product_sku = factory.LazyAttribute(lambda item: item.product.sku)
+    price = factory.LazyAttribute(lambda item: item.product.price)
+    quantity = factory.Faker('random_int', min=1, max=3)
+    tax_rate = Decimal('15')
@@ -0,0 +1,36 @@
+"""
+Housekeeping jobs shared by the whole site.
+"""
+
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+DB_SESSION_ENGINES = ('django.contrib.sessions.backends.db',
+                      'django.contrib.sessions.backends.cached_db')
+
+
+def purge_expired_sessions(batch_size=None, pause=0.0):
+    """Delete expired ``django_session`` rows in batches; returns the number deleted.
+
+    Unlike ``clearsessions`` this never issues one huge ``DELETE``, so it
+    can run while the site is busy.
+    """
+    if settings.SESSION_ENGINE not in DB_SESSION_ENGINES:
+        return 0
+    batch_size = batch_size or settings.SESSION_PURGE_BATCH_SIZE
+    expired = Session.objects.filter(expire_date__lt=timezone.now())
+
+    deleted = 0
+    while True:
+        keys = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not keys:
+            break
+        deleted += Session.objects.filter(pk__in=keys).delete()[0]
+        if len(keys) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    return deleted
@@ -0,0 +1,70 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmarks import environment_info, run_http_benchmark, serve, write_results
+
+# name -> environment for config/gunicorn.conf.py and production settings
+CONFIGURATIONS = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync', 'DB_CONN_MAX_AGE': '0'},
+    'sync-persistent': {'GUNICORN_WORKER_CLASS': 'sync', 'DB_CONN_MAX_AGE': '60'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread', 'DB_CONN_MAX_AGE': '0'},
+    'gthread-persistent': {'GUNICORN_WORKER_CLASS': 'gthread', 'DB_CONN_MAX_AGE': '60'},
+    'gevent': {'GUNICORN_WORKER_CLASS': 'gevent', 'DB_CONN_MAX_AGE': '0'},
+}
+
+
+class Command(BaseCommand):
+    help = 'Start gunicorn under each worker/connection configuration and benchmark a catalog page'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--configs', default=','.join(CONFIGURATIONS),
+                            help=f"Comma-separated subset of: {', '.join(CONFIGURATIONS)}")
+        parser.add_argument('--path', default='/store/products/', help='Page to request')
+        parser.add_argument('--port', type=int, default=8100)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--threads', type=int, default=4, help='gthread threads per worker')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds per run')
+        parser.add_argument('--warmup', type=float, default=2.0, help='Seconds before measuring')
+        parser.add_argument('--output', help='Write all results as JSON to this file')
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['configs'].split(',') if name.strip()]
+        unknown = set(names) - set(CONFIGURATIONS)
+        if unknown:
+            raise CommandError(f"Unknown configurations: {', '.join(sorted(unknown))}")
+
+        port = options['port']
+        url = f"http://127.0.0.1:{port}{options['path']}"
+        gunicorn = ['gunicorn', '-c', str(settings.BASE_DIR / 'config' / 'gunicorn.conf.py'),
+                    'config.wsgi:application']
+        results = []
+        for name in names:
+            env = {
+                **CONFIGURATIONS[name],
+                'DJANGO_SETTINGS_MODULE': os.environ['DJANGO_SETTINGS_MODULE'],
+                'GUNICORN_BIND': f'127.0.0.1:{port}',
+                'GUNICORN_WORKERS': str(options['workers']),
+                'GUNICORN_THREADS': str(options['threads']),
+            }
+            self.stderr.write(f"Starting gunicorn ({name})...")
+            with serve(gunicorn, port, env):
+                if options['warmup']:
+                    run_http_benchmark(url, options['concurrency'], options['warmup'])
+                result = run_http_benchmark(url, options['concurrency'], options['duration'])
+            result['label'] = name
+            results.append(result)
+            self.stdout.write(
+                f"{name:<20} {result['requests_per_s']:>9} req/s  p50 {result['p50_ms']}ms  "
+                f"p99 {result['p99_ms']}ms  {result['errors']} errors"
+            )
+
+        if options['output']:
+            write_results(options['output'], {
+                'environment': environment_info(),
+                'workers': options['workers'],
+                'threads': options['threads'],
+                'results': results,
+            })
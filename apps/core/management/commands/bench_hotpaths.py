@@ -0,0 +1,223 @@
+import json
+import random
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import (setup_databases, setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from apps.core.benchmarks import environment_info, measure, write_results
+
+SEED_BATCH_SIZE = 1000
+ORDER_LINES = 3
+
+
+def _rolled_back(call):
+    """Run ``call`` in a transaction that is rolled back, so every run sees the same data."""
+    def run():
+        with transaction.atomic():
+            call()
+            transaction.set_rollback(True)
+    return run
+
+
+class Command(BaseCommand):
+    help = ('Seed synthetic data at several catalog sizes in a throwaway test database and '
+            'measure cart, checkout, listing and admin hot paths')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000',
+                            help='Comma-separated product counts')
+        parser.add_argument('--cart-items', type=int, default=20,
+                            help='Lines in the measured carts and order')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='Earlier JSON results to print changes against')
+
+    # Data
+
+    def seed(self, size, cart_items, seed=0):
+        """Catalog of ``size`` products with orders and carts proportional to it."""
+        from factory.random import reseed_random
+
+        from apps.cart.models import CartItem
+        from apps.core.factories import (BrandFactory, CartFactory, CartItemFactory,
+                                         CategoryFactory, OrderFactory, OrderItemFactory,
+                                         PaymentMethodFactory, ProductFactory, UserFactory)
+        from apps.orders.models import Order, OrderItem
+        from apps.store.models import Category, Product
+
+        reseed_random(seed)
+        rng = random.Random(seed)
+
+        roots = CategoryFactory.create_batch(max(2, size // 500))
+        children = Category.objects.bulk_create([
+            CategoryFactory.build(parent=rng.choice(roots)) for _ in range(max(3, size // 100))
+        ])
+        categories = roots + children
+        brands = BrandFactory.create_batch(max(2, size // 200))
+
+        products = []
+        for start in range(0, size, SEED_BATCH_SIZE):
+            products += Product.objects.bulk_create([
+                ProductFactory.build(brand=rng.choice(brands))
+                for _ in range(min(SEED_BATCH_SIZE, size - start))
+            ])
+        Product.categories.through.objects.bulk_create([
+            Product.categories.through(product_id=product.pk, category_id=category.pk)
+            for product in products
+            for category in rng.sample(categories, 2)
+        ], batch_size=SEED_BATCH_SIZE)
+
+        payment_method = PaymentMethodFactory()
+        users = UserFactory.create_batch(max(5, size // 50))
+        orders = Order.objects.bulk_create([
+            OrderFactory.build(payment_method=payment_method, customer=rng.choice(users))
+            for _ in range(max(5, size // 5))
+        ], batch_size=SEED_BATCH_SIZE)
+        OrderItem.objects.bulk_create([
+            OrderItemFactory.build(order=order, product=product)
+            for order in orders
+            for product in rng.sample(products, min(ORDER_LINES, len(products)))
+        ], batch_size=SEED_BATCH_SIZE)
+
+        carts = CartFactory.create_batch(max(5, size // 10))
+        CartItem.objects.bulk_create([
+            CartItemFactory.build(cart=cart, product=product)
+            for cart in carts
+            for product in rng.sample(products, min(ORDER_LINES, len(products)))
+        ], batch_size=SEED_BATCH_SIZE)
+
+        # The measured objects
+        lines = rng.sample(products, min(cart_items, len(products)))
+        full_cart = CartFactory()
+        CartItem.objects.bulk_create([CartItemFactory.build(cart=full_cart, product=product)
+                                      for product in lines])
+        user_cart = CartFactory(session_key=None, user=UserFactory())
+        order = OrderFactory(payment_method=payment_method)
+        OrderItem.objects.bulk_create([OrderItemFactory.build(order=order, product=product)
+                                       for product in lines])
+        admin = UserFactory(is_staff=True, is_superuser=True)
+        return {
+            'products': products,
+            'root_category': roots[0],
+            'full_cart': full_cart,
+            'user_cart': user_cart,
+            'order': order,
+            'admin': admin,
+        }
+
+    # Benchmarks
+
+    def benchmarks(self, data):
+        from apps.cart.models import Cart
+        from apps.orders.models import Order
+        from apps.store.views import CATALOG_PAGE_SIZE
+
+        products = data['products']
+        full_cart = Cart.objects.get(pk=data['full_cart'].pk)
+        user_cart = Cart.objects.get(pk=data['user_cart'].pk)
+        order = Order.objects.get(pk=data['order'].pk)
+        product_ids = iter(range(len(products)))
+
+        def add_item():
+            # Cycles through the catalog, so runs hit both new lines and existing ones
+            full_cart.add_item(products[next(product_ids) % len(products)].pk)
+
+        client = Client()
+        admin = Client()
+        admin.force_login(data['admin'])
+
+        def get(client, url, **params):
+            def run():
+                response = client.get(url, params)
+                if response.status_code != 200:
+                    raise CommandError(f'{url} returned {response.status_code}')
+            return run
+
+        listing = reverse('store:product_list')
+        return {
+            'cart.add_item': _rolled_back(add_item),
+            'cart.get_summary': full_cart.get_summary,
+            'cart.merge_with': _rolled_back(lambda: user_cart.merge_with(full_cart)),
+            'order.calculate_totals': _rolled_back(order.calculate_totals),
+            'listing.default': get(client, listing),
+            'listing.category_price': get(client, listing, category=data['root_category'].slug,
+                                          sort='price_asc'),
+            'listing.last_page': get(client, listing,
+                                     page=max(1, -(-len(products) // CATALOG_PAGE_SIZE))),
+            'admin.product_changelist': get(admin, reverse('admin:store_product_changelist')),
+            'admin.order_changelist': get(admin, reverse('admin:orders_order_changelist')),
+            'admin.cart_changelist': get(admin, reverse('admin:cart_cart_changelist')),
+        }
+
+    def run_size(self, size, options):
+        with transaction.atomic():
+            cache.clear()
+            data = self.seed(size, options['cart_items'], options['seed'])
+            results = {}
+            for name, run in self.benchmarks(data).items():
+                results[name] = measure(run, options['repeat'], options['warmup'])
+                self.stdout.write(
+                    f"  {name:<28} p50 {results[name]['p50_ms']:>9.3f}ms  "
+                    f"p99 {results[name]['p99_ms']:>9.3f}ms  "
+                    f"{results[name]['queries']:>4} queries  {results[name]['peak_kib']:>9.1f} KiB"
+                )
+            # Each size starts from an empty database.
+            transaction.set_rollback(True)
+        return results
+
+    @contextmanager
+    def test_database(self):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def compare(self, previous, current):
+        self.stdout.write('\nChange against the earlier results (p50, queries):')
+        for size, results in current.items():
+            for name, result in results.items():
+                before = previous.get(size, {}).get(name)
+                if not before or not before['p50_ms']:
+                    continue
+                change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100
+                self.stdout.write(f"  {size:>7} {name:<28} {change:+7.1f}%  "
+                                  f"{before['queries']} -> {result['queries']} queries")
+
+    def handle(self, *args, **options):
+        try:
+            import factory  # noqa: F401
+        except ImportError:
+            raise CommandError('factory-boy is required: pip install -r requirements/development.txt')
+        sizes = [int(size) for size in options['sizes'].split(',') if size]
+
+        results = {}
+        with self.test_database():
+            for size in sizes:
+                self.stdout.write(f'{size} products:')
+                results[str(size)] = self.run_size(size, options)
+
+        output = {
+            'sizes': results,
+            'cart_items': options['cart_items'],
+            'repeat': options['repeat'],
+            'seed': options['seed'],
+            'environment': environment_info(),
+        }
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as previous:
+                self.compare(json.load(previous)['sizes'], results)
+        if options['output']:
+            write_results(options['output'], output)
+        else:
+            self.stdout.write(json.dumps(output, indent=2))
@@ -0,0 +1,41 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmarks import environment_info, run_http_benchmark, write_results
+
+
+class Command(BaseCommand):
+    help = 'Load-test a running server (gunicorn or uvicorn) and report requests/s and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', help='e.g. http://127.0.0.1:8000/cart/summary/')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds')
+        parser.add_argument('--header', action='append', default=[],
+                            help="Extra request header, 'Name: value'")
+        parser.add_argument('--label', default='', help='Name of the server setup under test')
+        parser.add_argument('--output', help='Write the result as JSON to this file')
+
+    def handle(self, *args, **options):
+        headers = {}
+        for header in options['header']:
+            name, sep, value = header.partition(':')
+            if not sep:
+                raise CommandError(f"Invalid header: {header}")
+            headers[name.strip()] = value.strip()
+
+        result = run_http_benchmark(options['url'], options['concurrency'],
+                                    options['duration'], headers)
+        result['label'] = options['label']
+        result['environment'] = environment_info()
+
+        self.stdout.write(
+            f"{result['label'] or result['url']}: {result['requests_per_s']} req/s, "
+            f"p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms, "
+            f"{result['errors']} errors over {result['requests']} requests"
+        )
+        if options['output']:
+            write_results(options['output'], result)
+        else:
+            self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,55 @@
+import os
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.benchmarks import STARTUP_TARGETS, environment_info, profile_startup, write_results
+
+
+class Command(BaseCommand):
+    help = 'Measure cold-start time and the heaviest imports of settings profiles (-X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('settings_modules', nargs='*',
+                            help='e.g. config.settings.production config.settings.worker; '
+                                 'defaults to the current settings')
+        parser.add_argument('--target', choices=sorted(STARTUP_TARGETS), default='setup')
+        parser.add_argument('--runs', type=int, default=5, help='Runs per profile (median is kept)')
+        parser.add_argument('--top', type=int, default=15, help='Heaviest packages to list')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+
+    def handle(self, *args, **options):
+        modules = options['settings_modules'] or [os.environ['DJANGO_SETTINGS_MODULE']]
+        results = []
+        for settings_module in modules:
+            try:
+                runs = [profile_startup(settings_module, options['target'])
+                        for _ in range(options['runs'])]
+            except RuntimeError as error:
+                raise CommandError(f"{settings_module}: {error}")
+
+            packages = {
+                package: round(statistics.median(run['packages'].get(package, 0) for run in runs), 1)
+                for package in runs[0]['packages']
+            }
+            top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+            result = {
+                'settings': settings_module,
+                'target': options['target'],
+                'runs': options['runs'],
+                'wall_ms': statistics.median(run['wall_ms'] for run in runs),
+                'import_ms': statistics.median(run['import_ms'] for run in runs),
+                'modules': runs[0]['modules'],
+                'top_packages': dict(top),
+            }
+            results.append(result)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{settings_module} ({options['target']}): {result['wall_ms']:.0f}ms wall, "
+                f"{result['import_ms']:.0f}ms importing {result['modules']} modules"
+            ))
+            for package, ms in top:
+                self.stdout.write(f"  {package:<30} {ms:>8.1f}ms")
+
+        if options['output']:
+            write_results(options['output'], {'environment': environment_info(), 'results': results})
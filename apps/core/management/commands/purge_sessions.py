@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.core.maintenance import purge_expired_sessions
+
+
+class Command(BaseCommand):
+    help = 'Delete expired database sessions in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Rows per DELETE, defaults to SESSION_PURGE_BATCH_SIZE')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        deleted = purge_expired_sessions(batch_size=options['batch_size'], pause=options['pause'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"{deleted} expired sessions deleted in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,43 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from . import routers
+
+
+class ReplicaPinMiddleware:
+    """Read-your-writes for ``ReplicaRouter``.
+
+    A request that writes sets a short-lived cookie; requests carrying it
+    read from the primary until replicas have caught up.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _before(self, request):
+        routers.reset_write_tracking()
+        if settings.REPLICA_PIN_COOKIE in request.COOKIES:
+            routers.pin_to_primary()
+
+    def _after(self, response):
+        if settings.DATABASE_REPLICAS and routers.wrote_to_primary():
+            response.set_cookie(settings.REPLICA_PIN_COOKIE, '1',
+                                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                                samesite='Lax', secure=settings.SESSION_COOKIE_SECURE)
+        routers.reset_write_tracking()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self._before(request)
+        return self._after(self.get_response(request))
+
+    async def __acall__(self, request):
+        self._before(request)
+        return self._after(await self.get_response(request))
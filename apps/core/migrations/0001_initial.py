@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Sequence",
+            fields=[
+                (
+                    "name",
+                    models.CharField(
+                        max_length=100,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="الاسم",
+                    ),
+                ),
+                (
+                    "last_value",
+                    models.BigIntegerField(default=0, verbose_name="آخر قيمة"),
+                ),
+            ],
+            options={
+                "verbose_name": "تسلسل",
+                "verbose_name_plural": "التسلسلات",
+            },
+        ),
+    ]
@@ -1,3 +1,16 @@
 from django.db import models
+from django.utils.translation import gettext_lazy as _
 
-# Create your models here.
+
+class Sequence(models.Model):
+    """Counter behind ``apps.core.sequences.BlockSequence`` on databases without native sequences."""
+    
+    name = models.CharField(_('الاسم'), max_length=100, primary_key=True)
+    last_value = models.BigIntegerField(_('آخر قيمة'), default=0)
+    
+    class Meta:
+        verbose_name = _('تسلسل')
+        verbose_name_plural = _('التسلسلات')
+    
+    def __str__(self):
+        return f"{self.name}: {self.last_value}"
@@ -0,0 +1,76 @@
+"""
+Customer notifications for orders, quick orders and abandoned carts.
+
+Request code only enqueues notification ids; rendering and delivery happen
+in Celery workers (see ``apps.core.tasks``).
+"""
+
+from operator import attrgetter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.template.loader import render_to_string
+
+ORDER_CONFIRMATION = 'order_confirmation'
+ORDER_SHIPPED = 'order_shipped'
+QUICK_ORDER_RECEIVED = 'quick_order_received'
+CART_RECOVERY = 'cart_recovery'
+
+# kind -> (model label, email field, phone field or None, related fields to preload)
+# Fields may be dotted paths through the preloaded relations.
+NOTIFICATION_KINDS = {
+    ORDER_CONFIRMATION: ('orders.Order', 'customer_email', 'customer_phone', ['payment_method']),
+    ORDER_SHIPPED: ('orders.Order', 'customer_email', 'customer_phone', []),
+    QUICK_ORDER_RECEIVED: ('orders.QuickOrder', 'email', 'phone_number', ['product', 'variant']),
+    CART_RECOVERY: ('cart.Cart', 'user.email', None, ['user']),
+}
+
+
+def notify(kind, object_ids):
+    """Queue ``kind`` notifications for ``object_ids`` once the current transaction commits."""
+    if kind not in NOTIFICATION_KINDS:
+        raise ValueError(f"Unknown notification kind: {kind}")
+    object_ids = list(object_ids)
+    if not object_ids:
+        return
+
+    from .tasks import send_notifications
+
+    batch_size = settings.NOTIFICATION_EMAIL_BATCH_SIZE
+    for start in range(0, len(object_ids), batch_size):
+        batch = object_ids[start:start + batch_size]
+        transaction.on_commit(lambda batch=batch: send_notifications.delay(kind, batch))
+
+
+def _render(kind, part, context):
+    return render_to_string(f'notifications/{kind}/{part}.txt', context).strip()
+
+
+def build_messages(kind, object_ids):
+    """Return ``(emails, sms)`` for the objects, rendered in one query.
+
+    ``emails`` holds ``(object_id, EmailMessage)`` pairs so delivery can
+    retry just the ones that failed; ``sms`` holds ``(phone, body)`` pairs.
+    """
+    model_label, email_field, phone_field, related = NOTIFICATION_KINDS[kind]
+    model = apps.get_model(model_label)
+    queryset = model.objects.filter(pk__in=object_ids).select_related(*related)
+
+    emails, sms = [], []
+    for obj in queryset:
+        context = {'object': obj, 'site_name': settings.SITE_NAME,
+                   'currency': settings.DEFAULT_CURRENCY}
+        email = attrgetter(email_field)(obj)
+        if email:
+            emails.append((obj.pk, EmailMessage(
+                subject=' '.join(_render(kind, 'subject', context).splitlines()),
+                body=_render(kind, 'body', context),
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[email],
+            )))
+        phone = attrgetter(phone_field)(obj) if phone_field else None
+        if phone:
+            sms.append((phone, _render(kind, 'sms', context)))
+    return emails, sms
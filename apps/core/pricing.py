@@ -0,0 +1,229 @@
+"""
+Pricing engine.
+
+Tax factors, shipping rules and active promotions are compiled once into a
+``PricingEngine`` snapshot and reused for every price computation; carts,
+orders, listings and API serializers all price through it. Call
+``invalidate_pricing()`` after changing anything the snapshot depends on.
+"""
+
+import threading
+import time
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+VERSION_KEY = 'pricing:version'
+# Seconds between checks of the shared version key
+VERSION_CHECK_INTERVAL = 5
+
+# Callables returning promotion rules to compile into the engine; see
+# ``register_promotion_source``.
+_promotion_sources = []
+_engine = None
+_engine_version = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def money(amount):
+    return Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PricedLine:
+    __slots__ = ('key', 'product_id', 'quantity', 'unit_price', 'tax_rate',
+                 'total_price', 'tax_amount')
+
+    def __init__(self, key, product_id, quantity, unit_price, tax_rate, tax_factor):
+        self.key = key
+        self.product_id = product_id
+        self.quantity = quantity
+        self.unit_price = unit_price
+        self.tax_rate = tax_rate
+        self.total_price = unit_price * quantity
+        self.tax_amount = unit_price * tax_factor * quantity
+
+    @property
+    def total_with_tax(self):
+        return self.total_price + self.tax_amount
+
+
+class Quote:
+    def __init__(self, lines, subtotal, tax_total, shipping_cost, discount_amount):
+        self.lines = lines
+        self.subtotal = money(subtotal)
+        self.tax_total = money(tax_total)
+        self.shipping_cost = money(shipping_cost)
+        self.discount_amount = money(discount_amount)
+
+    @property
+    def total_quantity(self):
+        return sum(line.quantity for line in self.lines)
+
+    @property
+    def total_before_shipping(self):
+        return self.subtotal + self.tax_total
+
+    @property
+    def total(self):
+        return max(self.subtotal + self.tax_total + self.shipping_cost - self.discount_amount, ZERO)
+
+
+class ProductPrice:
+    __slots__ = ('price', 'compare_price', 'price_with_tax', 'discount_percentage')
+
+    def __init__(self, price, compare_price, price_with_tax, discount_percentage):
+        self.price = price
+        self.compare_price = compare_price
+        self.price_with_tax = price_with_tax
+        self.discount_percentage = discount_percentage
+
+
+class PricingEngine:
+    def __init__(self, default_tax_rate, free_shipping_threshold, shipping_cost, promotions=()):
+        self.default_tax_rate = Decimal(str(default_tax_rate))
+        self.free_shipping_threshold = Decimal(str(free_shipping_threshold))
+        self.shipping_cost = Decimal(str(shipping_cost))
+        self.promotions = tuple(promotions)
+        self.promotions_by_code = {promotion.code: promotion for promotion in self.promotions}
+        self._tax_factors = {}
+
+    def tax_factor(self, tax_rate):
+        if tax_rate is None:
+            tax_rate = self.default_tax_rate
+        factor = self._tax_factors.get(tax_rate)
+        if factor is None:
+            factor = self._tax_factors[tax_rate] = Decimal(tax_rate) / HUNDRED
+        return factor
+
+    # Per-item rules
+
+    @staticmethod
+    def unit_price(product, variant=None):
+        if variant is not None and variant.price:
+            return variant.price
+        return product.price
+
+    def price_with_tax(self, price, tax_rate):
+        return price + price * self.tax_factor(tax_rate)
+
+    @staticmethod
+    def discount_percentage(price, compare_price):
+        if compare_price and compare_price > price:
+            return round((compare_price - price) / compare_price * HUNDRED, 1)
+        return 0
+
+    def shipping_for(self, subtotal):
+        if subtotal <= ZERO or subtotal >= self.free_shipping_threshold:
+            return ZERO
+        return self.shipping_cost
+
+    # Batch pricing
+
+    def apply_promotion(self, quote, code, now=None):
+        """Return ``(promotion, quote)`` with the discount of promotion ``code`` added.
+
+        Promotions come from the registered sources and compute their own
+        discount with ``discount(quote, now)``, raising when they do not
+        apply; ``promotion`` is ``None`` for an unknown code.
+        """
+        promotion = self.promotions_by_code.get(code.strip().upper())
+        if promotion is None:
+            return None, quote
+        discount = promotion.discount(quote, now)
+        return promotion, Quote(quote.lines, quote.subtotal, quote.tax_total,
+                                quote.shipping_cost, quote.discount_amount + discount)
+
+    def price_lines(self, lines, shipping_cost=None, discount_amount=ZERO, promotion_code=None):
+        """Price ``(key, product_id, unit_price, tax_rate, quantity)`` tuples in one pass."""
+        tax_factor = self.tax_factor
+        priced = []
+        subtotal = tax_total = ZERO
+        for key, product_id, unit_price, tax_rate, quantity in lines:
+            line = PricedLine(key, product_id, quantity, unit_price, tax_rate,
+                              tax_factor(tax_rate))
+            subtotal += line.total_price
+            tax_total += line.tax_amount
+            priced.append(line)
+        if shipping_cost is None:
+            shipping_cost = self.shipping_for(subtotal)
+        quote = Quote(priced, subtotal, tax_total, shipping_cost, discount_amount)
+        if promotion_code:
+            _, quote = self.apply_promotion(quote, promotion_code)
+        return quote
+
+    def price_cart_items(self, items, **kwargs):
+        """Price cart items loaded with ``select_related('product', 'variant')``."""
+        return self.price_lines((
+            (item.pk, item.product_id, self.unit_price(item.product, item.variant),
+             item.product.tax_rate, item.quantity)
+            for item in items
+        ), **kwargs)
+
+    def price_order_items(self, items, **kwargs):
+        """Price order items from their price and tax snapshots."""
+        return self.price_lines((
+            (item.pk, item.product_id, item.price, item.tax_rate, item.quantity)
+            for item in items
+        ), **kwargs)
+
+    def price_products(self, products):
+        """Listing prices keyed by product id."""
+        return {
+            product.pk: ProductPrice(
+                product.price,
+                product.compare_price,
+                self.price_with_tax(product.price, product.tax_rate),
+                self.discount_percentage(product.price, product.compare_price),
+            )
+            for product in products
+        }
+
+
+def register_promotion_source(source):
+    """Register a callable returning promotion rules compiled into the engine."""
+    if source not in _promotion_sources:
+        _promotion_sources.append(source)
+
+
+def compile_engine():
+    promotions = []
+    for source in _promotion_sources:
+        promotions.extend(source())
+    return PricingEngine(
+        default_tax_rate=settings.DEFAULT_TAX_RATE,
+        free_shipping_threshold=settings.FREE_SHIPPING_THRESHOLD,
+        shipping_cost=settings.SHIPPING_COST,
+        promotions=promotions,
+    )
+
+
+def get_engine():
+    """Return the compiled engine, recompiling when another process invalidated it."""
+    global _engine, _engine_version, _checked_at
+    now = time.monotonic()
+    if _engine is not None and now - _checked_at < VERSION_CHECK_INTERVAL:
+        return _engine
+
+    version = cache.get_or_set(VERSION_KEY, time.time_ns, timeout=None)
+    with _lock:
+        if _engine is None or _engine_version != version:
+            _engine = compile_engine()
+            _engine_version = version
+        _checked_at = now
+    return _engine
+
+
+def invalidate_pricing():
+    global _engine
+    _engine = None
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # Starting over from a fixed value could match a version other
+        # processes already compiled; a timestamp never does.
+        cache.set(VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,64 @@
+"""
+Write-behind buffers for high-volume inserts.
+
+Items are pushed to a Redis list when the default cache is django-redis and
+to an in-process deque otherwise (development and tests). A periodic or
+coalesced Celery task drains the buffer and writes in bulk.
+"""
+
+import json
+import threading
+from collections import defaultdict, deque
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .redis_client import get_redis
+
+_local_buffers = defaultdict(deque)
+_local_lock = threading.Lock()
+
+
+class BufferedQueue:
+    def __init__(self, name):
+        self.key = f"queue:{name}"
+
+    def push(self, item):
+        payload = json.dumps(item, cls=DjangoJSONEncoder)
+        redis = get_redis()
+        if redis is None:
+            with _local_lock:
+                _local_buffers[self.key].append(payload)
+        else:
+            redis.rpush(self.key, payload)
+
+    def drain(self, max_items):
+        """Atomically remove and return up to ``max_items`` items."""
+        redis = get_redis()
+        if redis is None:
+            with _local_lock:
+                buffer = _local_buffers[self.key]
+                payloads = [buffer.popleft() for _ in range(min(max_items, len(buffer)))]
+        else:
+            pipeline = redis.pipeline(transaction=True)
+            pipeline.lrange(self.key, 0, max_items - 1)
+            pipeline.ltrim(self.key, max_items, -1)
+            payloads, _ = pipeline.execute()
+        return [json.loads(payload) for payload in payloads]
+
+    def requeue(self, items):
+        """Put drained ``items`` back at the head of the buffer, in order."""
+        payloads = [json.dumps(item, cls=DjangoJSONEncoder) for item in items]
+        if not payloads:
+            return
+        redis = get_redis()
+        if redis is None:
+            with _local_lock:
+                _local_buffers[self.key].extendleft(reversed(payloads))
+        else:
+            redis.lpush(self.key, *reversed(payloads))
+
+    def __len__(self):
+        redis = get_redis()
+        if redis is None:
+            return len(_local_buffers[self.key])
+        return redis.llen(self.key)
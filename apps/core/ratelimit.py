@@ -0,0 +1,45 @@
+"""
+Sliding-window rate limiting on top of the default cache.
+
+With the django-redis backend every hit is a single atomic ``INCR`` plus a
+``GET`` of the previous window; no per-request rows are written anywhere.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+class SlidingWindowCounter:
+    """Approximate sliding window built from two fixed windows.
+
+    The previous window's count is weighted by how much of it still overlaps
+    the sliding window, which smooths out bursts at window boundaries.
+    """
+
+    def __init__(self, prefix, limit, window):
+        self.prefix = prefix
+        self.limit = limit
+        self.window = window
+
+    def _key(self, key, bucket):
+        return f"ratelimit:{self.prefix}:{key}:{bucket}"
+
+    def hit(self, key):
+        """Record one hit for ``key`` and return whether it is within the limit."""
+        now = time.time()
+        bucket = int(now // self.window)
+        current_key = self._key(key, bucket)
+
+        cache.add(current_key, 0, timeout=self.window * 2)
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            # The key expired between add() and incr(), or the backend keeps
+            # nothing (DummyCache in development), which lets every hit through.
+            cache.set(current_key, 1, timeout=self.window * 2)
+            current = 1
+        previous = cache.get(self._key(key, bucket - 1), 0)
+
+        overlap = 1 - (now % self.window) / self.window
+        return previous * overlap + current <= self.limit
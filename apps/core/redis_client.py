@@ -0,0 +1,42 @@
+"""
+Shared Redis clients.
+
+Both helpers return ``None`` unless the default cache is django-redis, so
+callers can fall back to in-process behaviour in development and tests.
+"""
+
+import asyncio
+import weakref
+
+from django.conf import settings
+
+REDIS_CACHE_BACKEND = 'django_redis.cache.RedisCache'
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def redis_enabled():
+    return settings.CACHES['default']['BACKEND'] == REDIS_CACHE_BACKEND
+
+
+def get_redis():
+    """Synchronous client sharing django-redis' connection pool."""
+    if not redis_enabled():
+        return None
+    from django_redis import get_redis_connection
+
+    return get_redis_connection('default')
+
+
+def get_async_redis():
+    """``redis.asyncio`` client bound to the running event loop."""
+    if not redis_enabled():
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        from redis import asyncio as aioredis
+
+        client = aioredis.from_url(settings.CACHES['default']['LOCATION'])
+        _async_clients[loop] = client
+    return client
@@ -0,0 +1,57 @@
+"""
+Read-replica database routing.
+
+Reads of catalog and reporting models (``REPLICA_READ_APPS``) go to one of
+the ``DATABASE_REPLICAS`` aliases; everything else, and every write, uses
+``default``. Once a request writes, the rest of it reads from the primary,
+and ``ReplicaPinMiddleware`` keeps the client on the primary for
+``REPLICA_PIN_SECONDS`` so it always sees its own writes despite
+replication lag.
+"""
+
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_wrote = contextvars.ContextVar('wrote_to_primary', default=False)
+_pinned = contextvars.ContextVar('pinned_to_primary', default=False)
+
+
+def pin_to_primary(pinned=True):
+    """Send reads in the current context to the primary."""
+    _pinned.set(pinned)
+
+
+def reset_write_tracking():
+    _wrote.set(False)
+    _pinned.set(False)
+
+
+def wrote_to_primary():
+    return _wrote.get()
+
+
+class ReplicaRouter:
+    def _use_primary(self):
+        return (_wrote.get() or _pinned.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block)
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or model._meta.app_label not in settings.REPLICA_READ_APPS
+                or self._use_primary()):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
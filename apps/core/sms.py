@@ -0,0 +1,99 @@
+"""
+SMS backends, modelled on Django's email backends.
+
+The active backend is selected with the ``SMS_BACKEND`` setting.
+"""
+
+import base64
+import json
+import sys
+import threading
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+outbox = []
+
+# Provider statuses that are worth retrying; other 4xx mean a bad number or body.
+RETRY_STATUSES = (408, 429, 500, 502, 503, 504)
+
+
+class SMSError(Exception):
+    pass
+
+
+class SMSUnavailable(SMSError):
+    """Timeouts, connection failures and 5xx responses; worth retrying."""
+
+
+class SMSRejected(SMSError):
+    """The provider refused the message; retrying will not help."""
+
+
+class BaseSMSBackend:
+    def send_messages(self, messages):
+        """Send ``(phone_number, body)`` pairs and return the number sent."""
+        raise NotImplementedError
+
+
+class ConsoleBackend(BaseSMSBackend):
+    _lock = threading.RLock()
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send_messages(self, messages):
+        with self._lock:
+            for phone_number, body in messages:
+                self.stream.write(f"SMS to {phone_number}:\n{body}\n{'-' * 40}\n")
+            self.stream.flush()
+        return len(messages)
+
+
+class LocmemBackend(BaseSMSBackend):
+    def send_messages(self, messages):
+        outbox.extend(messages)
+        return len(messages)
+
+
+class TwilioBackend(BaseSMSBackend):
+    api_url = 'https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json'
+
+    def __init__(self, account_sid=None, auth_token=None, from_number=None, timeout=None):
+        self.account_sid = account_sid or settings.TWILIO_ACCOUNT_SID
+        self.auth_token = auth_token or settings.TWILIO_AUTH_TOKEN
+        self.from_number = from_number or settings.TWILIO_PHONE_NUMBER
+        self.timeout = timeout or settings.SMS_TIMEOUT
+
+    def send_messages(self, messages):
+        credentials = f"{self.account_sid}:{self.auth_token}".encode()
+        headers = {
+            'Authorization': 'Basic ' + base64.b64encode(credentials).decode(),
+            'Content-Type': 'application/x-www-form-urlencoded',
+        }
+        url = self.api_url.format(sid=self.account_sid)
+        sent = 0
+        for phone_number, body in messages:
+            data = urlencode({'To': phone_number, 'From': self.from_number, 'Body': body})
+            request = Request(url, data=data.encode(), headers=headers, method='POST')
+            try:
+                with urlopen(request, timeout=self.timeout) as response:
+                    json.load(response)
+            except HTTPError as exc:
+                error = SMSUnavailable if exc.code in RETRY_STATUSES else SMSRejected
+                raise error(f"{phone_number}: provider returned {exc.code}") from exc
+            except OSError as exc:
+                raise SMSUnavailable(f"{phone_number}: {exc}") from exc
+            sent += 1
+        return sent
+
+
+def get_sms_backend(backend=None, **kwargs):
+    return import_string(backend or settings.SMS_BACKEND)(**kwargs)
+
+
+def send_sms(phone_number, body):
+    return get_sms_backend().send_messages([(phone_number, body)])
@@ -0,0 +1,94 @@
+import logging
+import smtplib
+
+from celery import shared_task
+from django.conf import settings
+from django.core.mail import get_connection
+
+from . import maintenance
+from .notifications import build_messages
+from .sms import SMSUnavailable, get_sms_backend
+
+logger = logging.getLogger(__name__)
+
+EMAIL_ERRORS = (smtplib.SMTPException, OSError)
+
+
+def _is_permanent(exc):
+    """Refused recipients and other 5xx replies fail the same way on every retry."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+def _send_emails(kind, emails):
+    """Send ``(object_id, message)`` pairs over one connection; return the ids worth retrying.
+
+    Each message is sent on its own, so one failure does not hold back the
+    rest; permanent failures are logged and dropped.
+    """
+    if not emails:
+        return []
+    connection = get_connection()
+    try:
+        connection.open()
+    except EMAIL_ERRORS:
+        return [object_id for object_id, _ in emails]
+
+    unsent = []
+    try:
+        for object_id, message in emails:
+            try:
+                connection.send_messages([message])
+            except EMAIL_ERRORS as exc:
+                if _is_permanent(exc):
+                    logger.warning("Dropping %s email for %s to %s: %r",
+                                   kind, object_id, ', '.join(message.to), exc)
+                else:
+                    unsent.append(object_id)
+    finally:
+        try:
+            connection.close()
+        except EMAIL_ERRORS:
+            pass
+    return unsent
+
+
+@shared_task(ignore_result=True)
+def send_notifications(kind, object_ids):
+    """Deliver a batch once: one task per SMS, emails on one SMTP connection.
+
+    The batch itself is never retried, so a failure cannot re-send what was
+    already delivered; unsent emails go to ``retry_notification_emails``.
+    """
+    emails, sms = build_messages(kind, object_ids)
+
+    for phone_number, body in sms:
+        send_sms.delay(phone_number, body)
+
+    unsent = _send_emails(kind, emails)
+    if unsent:
+        retry_notification_emails.apply_async((kind, unsent), countdown=1)
+
+
+@shared_task(bind=True, ignore_result=True, max_retries=5)
+def retry_notification_emails(self, kind, object_ids):
+    emails, _ = build_messages(kind, object_ids)
+    unsent = _send_emails(kind, emails)
+    if not unsent:
+        return
+    if self.request.retries >= self.max_retries:
+        logger.error("Giving up on %s emails for %s", kind, unsent)
+        return
+    raise self.retry(args=(kind, unsent), countdown=2 ** (self.request.retries + 1))
+
+
+@shared_task(ignore_result=True, rate_limit=settings.SMS_RATE_LIMIT,
+             autoretry_for=(SMSUnavailable,), retry_backoff=True, max_retries=5)
+def send_sms(phone_number, body):
+    get_sms_backend().send_messages([(phone_number, body)])
+
+
+@shared_task(ignore_result=True)
+def purge_expired_sessions():
+    maintenance.purge_expired_sessions()
@@ -1,3 +1,226 @@
-from django.test import TestCase
+import asyncio
+import io
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.error import HTTPError
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+                         override_settings)
+from django.utils import timezone
+
+from apps.orders.models import Coupon
+from apps.store.models import Product
+from . import benchmarks, events, pricing, routers, sms, tasks
+from .ratelimit import SlidingWindowCounter
+from .sequences import BlockSequence
+from .maintenance import purge_expired_sessions
+from .middleware import ReplicaPinMiddleware
+
+
+class PricingEngineTests(TestCase):
+    def setUp(self):
+        pricing.invalidate_pricing()
+        self.addCleanup(pricing.invalidate_pricing)
+
+    def test_prices_lines_in_one_pass(self):
+        quote = pricing.get_engine().price_lines([
+            (1, 1, Decimal('100.00'), Decimal('15'), 2),
+            (2, 2, Decimal('10.50'), Decimal('0'), 1),
+        ])
+        self.assertEqual(quote.subtotal, Decimal('210.50'))
+        self.assertEqual(quote.tax_total, Decimal('30.00'))
+        self.assertEqual(quote.shipping_cost, Decimal('25.00'))
+        self.assertEqual(quote.total, Decimal('265.50'))
+
+    @override_settings(FREE_SHIPPING_THRESHOLD=100.0)
+    def test_free_shipping_threshold(self):
+        pricing.invalidate_pricing()
+        quote = pricing.get_engine().price_lines([(1, 1, Decimal('100'), Decimal('15'), 1)])
+        self.assertEqual(quote.shipping_cost, Decimal('0'))
+
+    def test_promotion_code_is_applied(self):
+        class TenOff:
+            code = 'TEN'
+
+            def discount(self, quote, now=None):
+                return Decimal('10')
+
+        engine = pricing.PricingEngine(15, 500, 25, promotions=[TenOff()])
+        lines = [(1, 1, Decimal('100'), Decimal('15'), 1)]
+        quote = engine.price_lines(lines, promotion_code='ten')
+        self.assertEqual(quote.discount_amount, Decimal('10.00'))
+        self.assertEqual(quote.total, Decimal('130.00'))
+        self.assertEqual(engine.price_lines(lines, promotion_code='NONE').discount_amount, 0)
+
+    def test_lost_version_key_restarts_from_a_fresh_value(self):
+        pricing.get_engine()
+        compiled = cache.get(pricing.VERSION_KEY)
+        cache.delete(pricing.VERSION_KEY)
+        pricing.invalidate_pricing()
+        self.assertNotIn(cache.get(pricing.VERSION_KEY), (1, compiled))
+
+    def test_listing_prices(self):
+        products = [
+            Product(pk=1, price=Decimal('80'), compare_price=Decimal('100'), tax_rate=Decimal('15')),
+            Product(pk=2, price=Decimal('50'), tax_rate=Decimal('15')),
+        ]
+        prices = pricing.get_engine().price_products(products)
+        self.assertEqual(prices[1].price_with_tax, Decimal('92'))
+        self.assertEqual(prices[1].discount_percentage, Decimal('20.0'))
+        self.assertEqual(prices[2].discount_percentage, 0)
+        self.assertEqual(products[0].price_with_tax, prices[1].price_with_tax)
+
+
+class BlockSequenceTests(TestCase):
+    def test_numbers_are_handed_out_from_reserved_blocks(self):
+        sequence = BlockSequence('test', block_size=3)
+        other = BlockSequence('test', block_size=3)
+
+        numbers = [sequence.next() for _ in range(4)] + [other.next() for _ in range(2)]
+
+        self.assertEqual(numbers, [1, 2, 3, 4, 7, 8])
+        self.assertEqual(sequence.reservations, 2)
+        self.assertEqual(other.reservations, 1)
+
+
+class SessionPurgeTests(TestCase):
+    def test_expired_sessions_are_purged_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            [Session(session_key=f'old{i}', session_data='', expire_date=now - timedelta(days=1))
+             for i in range(5)]
+            + [Session(session_key='live', session_data='', expire_date=now + timedelta(days=1))]
+        )
+        self.assertEqual(purge_expired_sessions(batch_size=2), 5)
+        self.assertEqual(list(Session.objects.values_list('pk', flat=True)), ['live'])
+
+
+# TestCase's wrapping transaction would keep every read on the primary.
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        routers.reset_write_tracking()
+        self.addCleanup(routers.reset_write_tracking)
+
+    def test_catalog_reads_use_replica_until_a_write(self):
+        Product.objects.create(name='ساعة', sku='WATCH', description='-',
+                               short_description='-', price=10)
+        routers.reset_write_tracking()
+        with self.assertNumQueries(1, using='replica'):
+            self.assertEqual(Product.objects.get().sku, 'WATCH')
+        self.assertEqual(Coupon.objects.all().db, 'default')
+
+        Coupon.objects.create(code='pin', value=5)
+        self.assertEqual(Product.objects.all().db, 'default')
+
+    def test_middleware_pins_client_after_write(self):
+        def write(request):
+            Coupon.objects.create(code='mw', value=5)
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(write)(RequestFactory().post('/'))
+        self.assertEqual(response.cookies['db_pin']['max-age'], 5)
+
+        def read(request):
+            return HttpResponse(Product.objects.all().db)
+
+        request = RequestFactory().get('/')
+        self.assertEqual(ReplicaPinMiddleware(read)(request).content, b'replica')
+        request.COOKIES['db_pin'] = '1'
+        self.assertEqual(ReplicaPinMiddleware(read)(request).content, b'default')
+
+
+class SlidingWindowCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_blocks_hits_over_the_limit(self):
+        limiter = SlidingWindowCounter('test', 3, 3600)
+        self.assertEqual([limiter.hit('key') for _ in range(5)], [True] * 3 + [False] * 2)
+        self.assertTrue(limiter.hit('other-key'))
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    }})
+    def test_backend_without_counters_lets_hits_through(self):
+        limiter = SlidingWindowCounter('test', 1, 3600)
+        self.assertEqual([limiter.hit('key') for _ in range(3)], [True] * 3)
+
+
+class SMSRetryTests(TestCase):
+    def twilio_error(self, code):
+        error = HTTPError('https://api.twilio.com', code, 'error', {}, io.BytesIO(b'{}'))
+        backend = sms.TwilioBackend(account_sid='AC1', auth_token='t', from_number='+1')
+        with mock.patch('apps.core.sms.urlopen', side_effect=error):
+            backend.send_messages([('+966500000000', 'x')])
+
+    def test_provider_errors_are_classified(self):
+        with self.assertRaises(sms.SMSRejected):
+            self.twilio_error(400)
+        with self.assertRaises(sms.SMSUnavailable):
+            self.twilio_error(503)
+
+    def test_rejected_messages_are_not_retried(self):
+        backend = mock.Mock()
+        backend.send_messages.side_effect = sms.SMSRejected('invalid number')
+        with mock.patch('apps.core.tasks.get_sms_backend', return_value=backend):
+            with self.assertRaises(sms.SMSRejected):
+                tasks.send_sms.delay('+1', 'x')
+        backend.send_messages.assert_called_once()
+
+
+class RedisBrokerTests(SimpleTestCase):
+    async def test_listener_resubscribes_after_connection_loss(self):
+        messages = [
+            ConnectionError('connection lost'),
+            {'type': 'pmessage', 'channel': b'events:staff', 'data': b'{"event": "x"}'},
+        ]
+
+        class PubSub:
+            async def psubscribe(self, pattern):
+                pass
+
+            async def listen(self):
+                message = messages.pop(0)
+                if isinstance(message, Exception):
+                    raise message
+                yield message
+                await asyncio.Event().wait()
+
+            async def reset(self):
+                pass
+
+        redis = mock.Mock()
+        redis.pubsub.side_effect = PubSub
+        broker = events.RedisBroker()
+        with mock.patch('apps.core.events.get_async_redis', return_value=redis), \
+                mock.patch('apps.core.events.RECONNECT_DELAY', 0):
+            async with broker.subscribe([events.STAFF_CHANNEL]) as queue:
+                message = await asyncio.wait_for(queue.get(), 1)
+            broker._fanout().listener.cancel()
+        self.assertEqual(message, '{"event": "x"}')
+        self.assertEqual(redis.pubsub.call_count, 2)
+
+
+class HotPathBenchmarkTests(TestCase):
+    def test_seeds_and_measures_every_hot_path(self):
+        from .management.commands.bench_hotpaths import Command
+
+        command = Command()
+        data = command.seed(30, cart_items=5)
+        self.assertEqual(len(data['products']), 30)
+        self.assertEqual(data['full_cart'].cart_items.count(), 5)
+
+        cart_lines = data['full_cart'].cart_items.count()
+        for name, run in command.benchmarks(data).items():
+            result = benchmarks.measure(run, repeat=1, warmup=0)
+            self.assertGreater(result['queries'], 0, name)
+        # Mutating benchmarks roll back
+        self.assertEqual(data['full_cart'].cart_items.count(), cart_lines)
+        self.assertFalse(data['user_cart'].cart_items.exists())
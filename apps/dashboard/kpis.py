@@ -0,0 +1,126 @@
+"""
+Dashboard KPIs served from cached counters.
+
+Model signals (see ``apps.dashboard.signals``) adjust the counters with
+``cache.incr`` once the writing transaction commits, so a dashboard refresh
+reads a handful of cache keys instead of running aggregates on the primary.
+Bulk ``QuerySet.update()`` calls and lost increments are corrected by
+``reconcile``, which recomputes every KPI from the database on a schedule
+(``DASHBOARD_KPI_RECONCILE_INTERVAL``) and whenever a key is missing.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+ORDERS_TODAY = 'orders_today'
+# Stored in the currency's minor unit: cache.incr only handles integers.
+REVENUE_TODAY = 'revenue_today'
+PENDING_QUICK_ORDERS = 'pending_quick_orders'
+LOW_STOCK = 'low_stock'
+ACTIVE_CARTS = 'active_carts'
+
+KPIS = [ORDERS_TODAY, REVENUE_TODAY, PENDING_QUICK_ORDERS, LOW_STOCK, ACTIVE_CARTS]
+DAILY_KPIS = {ORDERS_TODAY, REVENUE_TODAY}
+
+LOW_STOCK_STATUSES = ('low_stock', 'out_of_stock')
+
+
+def cache_key(name, day=None):
+    if name in DAILY_KPIS:
+        return f"dashboard:kpi:{name}:{(day or timezone.localdate()).isoformat()}"
+    return f"dashboard:kpi:{name}"
+
+
+def minor_units(amount):
+    return int((Decimal(amount or 0) * 100).quantize(Decimal('1')))
+
+
+def adjust(name, delta, day=None):
+    """Add ``delta`` to a counter once the current transaction commits.
+
+    Missing counters are left alone: the next read recomputes them, and that
+    value already includes this change.
+    """
+    if delta:
+        key = cache_key(name, day)
+        transaction.on_commit(lambda: _incr(key, delta))
+
+
+def _incr(key, delta):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+# Reconciliation
+
+def _orders_today(day):
+    from apps.orders.models import Order
+
+    return Order.objects.filter(created_at__date=day).count()
+
+
+def _revenue_today(day):
+    from apps.orders.models import Order
+
+    total = (Order.objects.filter(created_at__date=day)
+             .exclude(status=Order.Status.CANCELLED).aggregate(total=Sum('total'))['total'])
+    return minor_units(total)
+
+
+def _pending_quick_orders(day):
+    from apps.orders.models import QuickOrder
+
+    return QuickOrder.objects.filter(status=QuickOrder.OrderStatus.PENDING).count()
+
+
+def _low_stock(day):
+    from apps.store.models import Product
+
+    return Product.objects.filter(manage_stock=True,
+                                  stock_status__in=LOW_STOCK_STATUSES).count()
+
+
+def _active_carts(day):
+    from apps.cart.models import Cart
+
+    # A sliding window can't be kept as a counter; this is a range scan on
+    # the updated_at index instead.
+    since = timezone.now() - timedelta(seconds=settings.DASHBOARD_ACTIVE_CART_WINDOW)
+    return Cart.objects.filter(updated_at__gte=since).count()
+
+
+CALCULATORS = {
+    ORDERS_TODAY: _orders_today,
+    REVENUE_TODAY: _revenue_today,
+    PENDING_QUICK_ORDERS: _pending_quick_orders,
+    LOW_STOCK: _low_stock,
+    ACTIVE_CARTS: _active_carts,
+}
+
+
+def reconcile(names=None):
+    """Recompute KPIs from the database and store them; returns ``{name: value}``."""
+    day = timezone.localdate()
+    values = {name: CALCULATORS[name](day) for name in names or KPIS}
+    cache.set_many({cache_key(name, day): value for name, value in values.items()},
+                   timeout=settings.DASHBOARD_KPI_TTL)
+    return values
+
+
+def get_kpis():
+    day = timezone.localdate()
+    keys = {cache_key(name, day): name for name in KPIS}
+    values = {keys[key]: value for key, value in cache.get_many(keys).items()}
+    missing = [name for name in KPIS if name not in values]
+    if missing:
+        values.update(reconcile(missing))
+    values[REVENUE_TODAY] = Decimal(values[REVENUE_TODAY]) / 100
+    return values
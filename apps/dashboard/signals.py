@@ -0,0 +1,90 @@
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.orders.models import Order, QuickOrder
+from apps.store.models import Product
+from . import kpis
+
+# Each receiver pair keeps the KPI-relevant state of an instance in
+# ``_kpi_state``: pre_save captures it before any post_save receiver updates
+# the ``_loaded_*`` snapshots taken in ``from_db``, post_save applies the
+# difference. ``None`` means unknown (e.g. deferred fields); no adjustment
+# is made then and reconciliation catches up.
+
+
+def _previous_state(instance, loaded):
+    if instance._state.adding:
+        return None
+    if not hasattr(instance, '_kpi_state'):
+        instance._kpi_state = loaded(instance)
+    return instance._kpi_state
+
+
+def _loaded(instance, *attributes):
+    values = tuple(getattr(instance, attribute, None) for attribute in attributes)
+    return None if None in values else values
+
+
+def _order_revenue(state):
+    status, total = state
+    return 0 if status == Order.Status.CANCELLED else kpis.minor_units(total)
+
+
+@receiver(pre_save, sender=Order)
+def order_pre_save(sender, instance, **kwargs):
+    instance._kpi_previous = _previous_state(instance, lambda order: _loaded(
+        order, '_loaded_status', '_loaded_total'))
+
+
+@receiver(post_save, sender=Order)
+def order_kpis(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_kpi_previous', None)
+    instance._kpi_state = current = (instance.status, instance.total)
+    day = timezone.localdate(instance.created_at)
+    if day != timezone.localdate():
+        return
+    if created:
+        kpis.adjust(kpis.ORDERS_TODAY, 1, day)
+        kpis.adjust(kpis.REVENUE_TODAY, _order_revenue(current), day)
+    elif previous is not None:
+        kpis.adjust(kpis.REVENUE_TODAY, _order_revenue(current) - _order_revenue(previous), day)
+
+
+@receiver(pre_save, sender=QuickOrder)
+def quick_order_pre_save(sender, instance, **kwargs):
+    instance._kpi_previous = _previous_state(instance, lambda order: getattr(
+        order, '_loaded_status', None))
+
+
+@receiver(post_save, sender=QuickOrder)
+def quick_order_kpis(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_kpi_previous', None)
+    instance._kpi_state = instance.status
+    pending = QuickOrder.OrderStatus.PENDING
+    if created:
+        kpis.adjust(kpis.PENDING_QUICK_ORDERS, int(instance.status == pending))
+    elif previous is not None:
+        kpis.adjust(kpis.PENDING_QUICK_ORDERS,
+                    int(instance.status == pending) - int(previous == pending))
+
+
+def _is_low(product_state):
+    manage_stock, stock_status = product_state
+    return int(bool(manage_stock) and stock_status in kpis.LOW_STOCK_STATUSES)
+
+
+@receiver(pre_save, sender=Product)
+def product_pre_save(sender, instance, **kwargs):
+    instance._kpi_previous = _previous_state(instance, lambda product: _loaded(
+        product, '_loaded_manage_stock', '_loaded_stock_status'))
+
+
+@receiver(post_save, sender=Product)
+def product_kpis(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_kpi_previous', None)
+    instance._kpi_state = current = (instance.manage_stock, instance.stock_status)
+    if created:
+        kpis.adjust(kpis.LOW_STOCK, _is_low(current))
+    elif previous is not None:
+        kpis.adjust(kpis.LOW_STOCK, _is_low(current) - _is_low(previous))
@@ -0,0 +1,8 @@
+from celery import shared_task
+
+from . import kpis
+
+
+@shared_task(ignore_result=True)
+def reconcile_kpis():
+    kpis.reconcile()
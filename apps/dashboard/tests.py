@@ -1,3 +1,84 @@
+from decimal import Decimal
+
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.accounts.models import User
+from apps.cart.models import Cart
+from apps.orders.models import Order, QuickOrder
+from apps.payment.models import PaymentMethod
+from apps.store.models import Product
+from . import kpis
+
+
+class KPITests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.payment_method = PaymentMethod.objects.create(
+            name='الدفع عند الاستلام', code='cod',
+            type=PaymentMethod.PaymentType.CASH_ON_DELIVERY,
+        )
+        cls.product = Product.objects.create(
+            name='منتج', sku='SKU-1', description='-', short_description='-',
+            price=100, quantity=50, low_stock_threshold=5,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def create_order(self, total):
+        return Order.objects.create(customer_name='عميل', customer_phone='+966500000000',
+                                    shipping_city='الرياض', shipping_address='شارع 1',
+                                    payment_method=self.payment_method, total=total)
+
+    def test_counters_follow_signals_without_queries(self):
+        self.assertEqual(kpis.reconcile()[kpis.ORDERS_TODAY], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order(100)
+            self.create_order(50)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.get(pk=order.pk)
+            order.status = Order.Status.CANCELLED
+            order.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            QuickOrder.objects.create(product=self.product, phone_number='+966500000001',
+                                      name='عميل', city='الرياض')
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.get(pk=self.product.pk)
+            product.quantity = 3
+            product.save()
+        Cart.objects.create(session_key='guest')
+
+        with self.assertNumQueries(0):
+            values = kpis.get_kpis()
+        self.assertEqual(values[kpis.ORDERS_TODAY], 2)
+        self.assertEqual(values[kpis.REVENUE_TODAY], Decimal('50'))
+        self.assertEqual(values[kpis.PENDING_QUICK_ORDERS], 1)
+        self.assertEqual(values[kpis.LOW_STOCK], 1)
+        # Sliding window: refreshed by reconciliation only
+        self.assertEqual(values[kpis.ACTIVE_CARTS], 0)
+
+        self.assertEqual(kpis.reconcile(), {**values, kpis.REVENUE_TODAY: 5000,
+                                            kpis.ACTIVE_CARTS: 1})
+
+    def test_reconcile_corrects_bulk_updates(self):
+        kpis.reconcile()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = self.create_order(80)
+        Order.objects.filter(pk=order.pk).update(total=120)
+        self.assertEqual(kpis.get_kpis()[kpis.REVENUE_TODAY], Decimal('80'))
+
+        kpis.reconcile()
+        self.assertEqual(kpis.get_kpis()[kpis.REVENUE_TODAY], Decimal('120'))
+
+    def test_endpoint_is_staff_only(self):
+        url = reverse('dashboard:kpi_summary')
+        self.assertEqual(self.client.get(url).status_code, 302)
 
-# Create your tests here.
+        staff = User.objects.create_user(email='staff@example.com', password='pass', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['kpis'][kpis.ORDERS_TODAY], 0)
@@ -1,3 +1,12 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from . import kpis
+
+
+@staff_member_required
+@require_GET
+def kpi_summary(request):
+    """Live dashboard numbers, read from cached counters."""
+    return JsonResponse({'kpis': kpis.get_kpis()})
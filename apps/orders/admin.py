@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Order, OrderItem, QuickOrder
+from apps.core import notifications
+from .events import publish_status
+from .models import Coupon, CouponRedemption, Order, OrderItem, QuickOrder
 
 
 class OrderItemInline(admin.TabularInline):
@@ -53,16 +55,24 @@ class OrderAdmin(admin.ModelAdmin):
     
     actions = ['mark_as_confirmed', 'mark_as_processing', 'mark_as_shipped']
     
+    def _set_status(self, queryset, status):
+        order_ids = list(queryset.exclude(status=status).values_list('pk', flat=True))
+        changed = Order.objects.filter(pk__in=order_ids)
+        changed.update(status=status)
+        publish_status(changed.only('uuid', 'order_number', 'status'))
+        return order_ids
+    
     def mark_as_confirmed(self, request, queryset):
-        queryset.update(status=Order.Status.CONFIRMED)
+        self._set_status(queryset, Order.Status.CONFIRMED)
     mark_as_confirmed.short_description = 'تأكيد الطلبات المختارة'
     
     def mark_as_processing(self, request, queryset):
-        queryset.update(status=Order.Status.PROCESSING)
+        self._set_status(queryset, Order.Status.PROCESSING)
     mark_as_processing.short_description = 'تحديد كـ قيد المعالجة'
     
     def mark_as_shipped(self, request, queryset):
-        queryset.update(status=Order.Status.SHIPPED)
+        order_ids = self._set_status(queryset, Order.Status.SHIPPED)
+        notifications.notify(notifications.ORDER_SHIPPED, order_ids)
     mark_as_shipped.short_description = 'تحديد كـ تم الشحن'
 
 
@@ -84,3 +94,21 @@ class QuickOrderAdmin(admin.ModelAdmin):
     def mark_as_processing(self, request, queryset):
         queryset.update(status=QuickOrder.OrderStatus.PROCESSING)
     mark_as_processing.short_description = 'تحديد كـ قيد المعالجة'
+
+
+class CouponRedemptionInline(admin.TabularInline):
+    model = CouponRedemption
+    extra = 0
+    readonly_fields = ['order', 'user', 'amount', 'created_at']
+    can_delete = False
+
+
+@admin.register(Coupon)
+class CouponAdmin(admin.ModelAdmin):
+    list_display = ['code', 'discount_type', 'value', 'used_count', 'usage_limit',
+                    'valid_until', 'is_active']
+    list_filter = ['discount_type', 'is_active']
+    search_fields = ['code', 'description']
+    readonly_fields = ['used_count', 'created_at', 'updated_at']
+    filter_horizontal = ['products', 'categories', 'brands']
+    inlines = [CouponRedemptionInline]
@@ -0,0 +1,197 @@
+"""
+Coupon engine.
+
+Active coupons are compiled into ``CompiledCoupon`` rules holding frozen
+sets of eligible product, brand and category ids (category sets include
+descendants). The rules live in the pricing engine snapshot, so checking a
+cart against every active coupon costs one taxonomy query for the cart's
+products and no per-rule queries. Usage limits are enforced at redemption
+time with a single conditional ``UPDATE``.
+"""
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from apps.core.pricing import HUNDRED, ZERO, get_engine, register_promotion_source
+from apps.store.models import Category, Product
+from .models import Coupon, CouponRedemption, Order
+
+
+class CouponError(Exception):
+    pass
+
+
+class CompiledCoupon:
+    __slots__ = ('id', 'code', 'discount_type', 'value', 'max_discount_amount',
+                 'min_order_amount', 'valid_from', 'valid_until', 'usage_limit',
+                 'used_count', 'product_ids', 'brand_ids', 'category_ids')
+
+    def __init__(self, coupon, product_ids, brand_ids, category_ids):
+        for field in ('id', 'code', 'discount_type', 'value', 'max_discount_amount',
+                      'min_order_amount', 'valid_from', 'valid_until', 'usage_limit',
+                      'used_count'):
+            setattr(self, field, getattr(coupon, field))
+        self.product_ids = frozenset(product_ids)
+        self.brand_ids = frozenset(brand_ids)
+        self.category_ids = frozenset(category_ids)
+
+    @property
+    def applies_to_everything(self):
+        return not (self.product_ids or self.brand_ids or self.category_ids)
+
+    def is_current(self, now):
+        if self.valid_from and now < self.valid_from:
+            return False
+        if self.valid_until and now > self.valid_until:
+            return False
+        if self.usage_limit is not None and self.used_count >= self.usage_limit:
+            return False
+        return True
+
+    def is_eligible(self, product_id, brand_id, category_ids):
+        return (self.applies_to_everything
+                or product_id in self.product_ids
+                or brand_id in self.brand_ids
+                or not self.category_ids.isdisjoint(category_ids))
+
+    def discount(self, quote, now=None):
+        """Discount on ``quote``; raises ``CouponError`` when the coupon does not apply."""
+        now = now or timezone.now()
+        if not self.is_current(now):
+            raise CouponError(_('كود الخصم منتهي الصلاحية'))
+        if quote.subtotal < self.min_order_amount:
+            raise CouponError(_('لم يتم الوصول إلى الحد الأدنى للطلب'))
+
+        eligible = eligible_subtotals(quote, [self], now)[self.id]
+        if eligible <= ZERO:
+            raise CouponError(_('كود الخصم لا ينطبق على منتجات السلة'))
+        return self.discount_for(eligible)
+
+    def discount_for(self, eligible_subtotal):
+        if self.discount_type == Coupon.DiscountType.PERCENTAGE:
+            discount = eligible_subtotal * self.value / HUNDRED
+        else:
+            discount = min(self.value, eligible_subtotal)
+        if self.max_discount_amount is not None:
+            discount = min(discount, self.max_discount_amount)
+        # Guards percentages over 100 saved before Coupon.clean rejected them
+        return min(discount, eligible_subtotal)
+
+
+def _descendants(category_ids, children):
+    result = set()
+    stack = list(category_ids)
+    while stack:
+        category_id = stack.pop()
+        if category_id not in result:
+            result.add(category_id)
+            stack.extend(children.get(category_id, ()))
+    return result
+
+
+def compile_coupons():
+    """Compile all active coupons with a fixed number of queries."""
+    coupons = list(Coupon.objects.filter(is_active=True))
+    if not coupons:
+        return []
+    coupon_ids = [coupon.pk for coupon in coupons]
+
+    def targets(through, column):
+        mapping = {}
+        rows = through.objects.filter(coupon_id__in=coupon_ids).values_list('coupon_id', column)
+        for coupon_id, target_id in rows:
+            mapping.setdefault(coupon_id, []).append(target_id)
+        return mapping
+
+    products = targets(Coupon.products.through, 'product_id')
+    brands = targets(Coupon.brands.through, 'brand_id')
+    categories = targets(Coupon.categories.through, 'category_id')
+
+    children = {}
+    if categories:
+        for category_id, parent_id in Category.objects.values_list('id', 'parent_id'):
+            children.setdefault(parent_id, []).append(category_id)
+
+    return [
+        CompiledCoupon(
+            coupon,
+            products.get(coupon.pk, ()),
+            brands.get(coupon.pk, ()),
+            _descendants(categories.get(coupon.pk, ()), children),
+        )
+        for coupon in coupons
+    ]
+
+
+register_promotion_source(compile_coupons)
+
+
+def product_taxonomy(product_ids):
+    """Map product id to ``(brand_id, category ids)`` in one query."""
+    taxonomy = {}
+    rows = Product.objects.filter(pk__in=product_ids).values_list('id', 'brand_id', 'categories')
+    for product_id, brand_id, category_id in rows:
+        _, category_ids = taxonomy.setdefault(product_id, (brand_id, set()))
+        if category_id is not None:
+            category_ids.add(category_id)
+    return taxonomy
+
+
+def eligible_subtotals(quote, coupons=None, now=None):
+    """Eligible subtotal per current coupon id, in one pass over the quote lines."""
+    now = now or timezone.now()
+    if coupons is None:
+        coupons = get_engine().promotions
+    coupons = [coupon for coupon in coupons if coupon.is_current(now)]
+    subtotals = {coupon.id: ZERO for coupon in coupons}
+    if not coupons:
+        return subtotals
+
+    taxonomy = product_taxonomy({line.product_id for line in quote.lines})
+    for line in quote.lines:
+        brand_id, category_ids = taxonomy.get(line.product_id, (None, set()))
+        for coupon in coupons:
+            if coupon.is_eligible(line.product_id, brand_id, category_ids):
+                subtotals[coupon.id] += line.total_price
+    return subtotals
+
+
+def apply_coupon(quote, code, now=None):
+    """Return ``(coupon, quote)`` with the coupon's discount applied."""
+    coupon, quote = get_engine().apply_promotion(quote, code, now)
+    if coupon is None:
+        raise CouponError(_('كود الخصم غير صالح'))
+    return coupon, quote
+
+
+def redeem(coupon_id, amount, order=None, user=None):
+    """Consume one use of a coupon; raises ``CouponError`` once the limit is reached.
+
+    With ``order`` the coupon and discount are stored on it and its totals
+    recalculated in the same transaction; an order that already has a coupon
+    raises ``CouponError``, even when this instance has not seen it yet.
+    """
+    with transaction.atomic():
+        if order is not None:
+            claimed = (Order.objects
+                       .filter(pk=order.pk, coupon__isnull=True)
+                       .update(coupon_id=coupon_id, discount_amount=Decimal(amount)))
+            if not claimed:
+                raise CouponError(_('تم تطبيق كوبون على هذا الطلب بالفعل'))
+        updated = (Coupon.objects
+                   .filter(pk=coupon_id, is_active=True)
+                   .filter(Q(usage_limit__isnull=True) | Q(used_count__lt=F('usage_limit')))
+                   .update(used_count=F('used_count') + 1))
+        if not updated:
+            raise CouponError(_('تم استنفاد كود الخصم'))
+        redemption = CouponRedemption.objects.create(coupon_id=coupon_id, order=order,
+                                                     user=user, amount=Decimal(amount))
+        if order is not None:
+            order.coupon_id = coupon_id
+            order.discount_amount = redemption.amount
+            order.calculate_totals()
+        return redemption
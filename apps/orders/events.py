@@ -0,0 +1,31 @@
+"""
+Order status events pushed to customers and staff over SSE.
+"""
+
+from django.db import transaction
+
+from apps.core import events
+
+ORDER_STATUS = 'order.status'
+
+
+def publish_status(orders):
+    """Publish the current status of ``orders`` once the transaction commits."""
+    payloads = [
+        {
+            'order': str(order.uuid),
+            'order_number': order.order_number,
+            'status': order.status,
+            'status_display': str(order.get_status_display()),
+        }
+        for order in orders
+    ]
+    if not payloads:
+        return
+
+    def send():
+        for payload in payloads:
+            events.publish([events.order_channel(payload['order']), events.STAFF_CHANNEL],
+                           ORDER_STATUS, payload)
+
+    transaction.on_commit(send)
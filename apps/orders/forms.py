@@ -0,0 +1,19 @@
+from django import forms
+from django.utils.translation import gettext_lazy as _
+
+from .models import QuickOrder
+
+
+class QuickOrderForm(forms.ModelForm):
+    class Meta:
+        model = QuickOrder
+        fields = ['phone_number', 'name', 'email', 'product', 'variant', 'quantity',
+                  'city', 'district', 'address', 'notes']
+
+    def clean(self):
+        cleaned_data = super().clean()
+        product = cleaned_data.get('product')
+        variant = cleaned_data.get('variant')
+        if product and variant and variant.product_id != product.pk:
+            self.add_error('variant', _('المتغير لا يتبع هذا المنتج'))
+        return cleaned_data
@@ -0,0 +1,227 @@
+"""
+PDF invoice rendering for orders.
+
+Rendering works on plain dicts produced by ``invoice_payload`` so it can run in
+a Celery worker or a process pool without touching the database. Fonts,
+shaped labels and the page layout are loaded once per process and reused
+across invoices.
+"""
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+FONT_NAME = 'InvoiceFont'
+# How long a requested invoice counts as being rendered
+PENDING_TIMEOUT = 5 * 60
+
+LABELS = {
+    'title': 'فاتورة ضريبية',
+    'order_number': 'رقم الطلب',
+    'date': 'التاريخ',
+    'customer': 'العميل',
+    'phone': 'الهاتف',
+    'address': 'عنوان الشحن',
+    'product': 'المنتج',
+    'sku': 'الكود',
+    'quantity': 'الكمية',
+    'price': 'السعر',
+    'total': 'الإجمالي',
+    'subtotal': 'المجموع الفرعي',
+    'tax': 'الضريبة',
+    'shipping': 'الشحن',
+    'discount': 'الخصم',
+    'grand_total': 'المجموع الكلي',
+}
+
+
+def shape(text):
+    """Shape and reorder Arabic text for left-to-right PDF drawing."""
+    import arabic_reshaper
+    from bidi.algorithm import get_display
+
+    return get_display(arabic_reshaper.reshape(str(text)))
+
+
+@lru_cache(maxsize=None)
+def load_resources():
+    """Register fonts and pre-shape labels once per process."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    # The built-in PDF fonts have no Arabic glyphs and would print empty boxes.
+    font_path = settings.INVOICE_FONT_PATH
+    if not font_path or not os.path.exists(font_path):
+        raise ImproperlyConfigured(f"INVOICE_FONT_PATH {font_path!r} is not a font file")
+    pdfmetrics.registerFont(TTFont(FONT_NAME, font_path))
+
+    width, height = A4
+    return {
+        'font': FONT_NAME,
+        'page_size': A4,
+        'labels': {key: shape(value) for key, value in LABELS.items()},
+        'site_name': shape(settings.SITE_NAME),
+        'currency': settings.DEFAULT_CURRENCY,
+        # x positions of item table columns, right to left
+        'columns': {
+            'product': width - 40,
+            'sku': width - 250,
+            'quantity': width - 340,
+            'price': width - 410,
+            'total': width - 490,
+        },
+    }
+
+
+def invoice_payload(order):
+    """Return a picklable invoice payload for an order with prefetched items."""
+    return {
+        'order_number': order.order_number,
+        'date': timezone.localtime(order.created_at).strftime('%Y-%m-%d'),
+        'customer_name': order.customer_name,
+        'customer_phone': order.customer_phone,
+        'address': ', '.join(filter(None, [
+            order.shipping_city, order.shipping_district, order.shipping_address,
+        ])),
+        'items': [
+            (item.product_name, item.product_sku, item.quantity,
+             item.price, item.total_price)
+            for item in order.items.all()
+        ],
+        'subtotal': order.subtotal,
+        'tax_amount': order.tax_amount,
+        'shipping_cost': order.shipping_cost,
+        'discount_amount': order.discount_amount,
+        'total': order.total,
+    }
+
+
+MISSING_INVOICE = Q(invoice='') | Q(invoice__isnull=True)
+
+
+def orders_without_invoice(order_ids):
+    from .models import Order
+
+    return list(Order.objects.filter(MISSING_INVOICE, pk__in=order_ids)
+                .prefetch_related('items')
+                .order_by('pk'))
+
+
+def render_invoice(data):
+    """Render one invoice payload to PDF bytes."""
+    from reportlab.pdfgen import canvas
+
+    resources = load_resources()
+    labels = resources['labels']
+    columns = resources['columns']
+    font = resources['font']
+    width, height = resources['page_size']
+    right = width - 40
+
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=resources['page_size'], pageCompression=1)
+    pdf.setTitle(data['order_number'])
+
+    def header():
+        pdf.setFont(font, 16)
+        pdf.drawRightString(right, height - 50, resources['site_name'])
+        pdf.drawString(40, height - 50, labels['title'])
+        pdf.setFont(font, 10)
+        rows = [
+            ('order_number', data['order_number']),
+            ('date', data['date']),
+            ('customer', shape(data['customer_name'])),
+            ('phone', data['customer_phone']),
+            ('address', shape(data['address'])),
+        ]
+        y = height - 80
+        for key, value in rows:
+            pdf.drawRightString(right, y, f"{value} :{labels[key]}")
+            y -= 15
+        y -= 10
+        for key, x in columns.items():
+            pdf.drawRightString(x, y, labels[key])
+        pdf.line(40, y - 5, right, y - 5)
+        return y - 20
+
+    y = header()
+    for name, sku, quantity, price, total in data['items']:
+        if y < 120:
+            pdf.showPage()
+            y = header()
+        pdf.drawRightString(columns['product'], y, shape(name)[:60])
+        pdf.drawRightString(columns['sku'], y, sku)
+        pdf.drawRightString(columns['quantity'], y, str(quantity))
+        pdf.drawRightString(columns['price'], y, f"{price:.2f}")
+        pdf.drawRightString(columns['total'], y, f"{total:.2f}")
+        y -= 15
+
+    pdf.line(40, y + 5, right, y + 5)
+    y -= 10
+    totals = [
+        ('subtotal', data['subtotal']),
+        ('tax', data['tax_amount']),
+        ('shipping', data['shipping_cost']),
+        ('discount', data['discount_amount']),
+        ('grand_total', data['total']),
+    ]
+    for key, amount in totals:
+        pdf.drawRightString(right, y, labels[key])
+        pdf.drawRightString(right - 150, y, f"{amount:.2f} {resources['currency']}")
+        y -= 15
+
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def pending_key(order_id):
+    return f"invoice:pending:{order_id}"
+
+
+def invoice_filename(order_number):
+    return f"invoice-{order_number}.pdf"
+
+
+def store_invoice(order, pdf_bytes):
+    order.invoice.save(invoice_filename(order.order_number), ContentFile(pdf_bytes), save=False)
+    order.save(update_fields=['invoice'])
+
+
+def generate_invoices(order_ids):
+    """Render and store invoices for orders that do not have one yet."""
+    orders = orders_without_invoice(order_ids)
+    for order in orders:
+        store_invoice(order, render_invoice(invoice_payload(order)))
+    return len(orders)
+
+
+def _warm_up():
+    load_resources()
+
+
+def render_invoices_parallel(order_ids, workers=None, chunk_size=20):
+    """Render invoices for ``order_ids`` across ``workers`` processes.
+
+    Only the calling process uses the database: payloads are built here,
+    rendered in the pool and stored as the results come back.
+    """
+    orders = orders_without_invoice(order_ids)
+    payloads = [invoice_payload(order) for order in orders]
+
+    # Forked workers must not share the parent's database connections.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_up) as pool:
+        results = pool.map(render_invoice, payloads, chunksize=chunk_size)
+        for order, pdf_bytes in zip(orders, results):
+            store_invoice(order, pdf_bytes)
+    return len(orders)
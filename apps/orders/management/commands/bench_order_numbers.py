@@ -0,0 +1,92 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models.signals import post_save
+
+from apps.core.benchmarks import environment_info, latency_stats, write_results
+from apps.orders.models import Order, next_order_number, order_numbers
+from apps.orders.signals import order_saved
+from apps.payment.models import PaymentMethod
+
+BENCH_CUSTOMER = 'bench-order-numbers'
+
+
+class Command(BaseCommand):
+    help = 'Create orders from parallel threads and report orders/s and order number blocks used'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--orders', type=int, default=200, help='Orders per thread')
+        parser.add_argument('--keep', action='store_true', help='Keep the created orders')
+        parser.add_argument('--output', help='Write the result as JSON to this file')
+
+    def _allocate(self, count):
+        started = time.perf_counter()
+        numbers = [next_order_number() for _ in range(count)]
+        return numbers, time.perf_counter() - started
+
+    def _create(self, payment_method, count):
+        latencies = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                with transaction.atomic():
+                    Order.objects.create(customer_name=BENCH_CUSTOMER, customer_phone='0500000000',
+                                         shipping_city='-', shipping_address='-',
+                                         payment_method=payment_method)
+                latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+        return latencies
+
+    def handle(self, *args, **options):
+        threads, per_thread = options['threads'], options['orders']
+        payment_method = PaymentMethod.objects.first()
+        if payment_method is None:
+            raise CommandError('Create a payment method first')
+
+        # Number allocation alone
+        reservations = order_numbers.reservations
+        with ThreadPoolExecutor(threads) as pool:
+            results = list(pool.map(self._allocate, [per_thread] * threads))
+        numbers = [number for batch, _ in results for number in batch]
+        if len(set(numbers)) != len(numbers):
+            raise CommandError('Duplicate order numbers allocated')
+        allocation_s = max(elapsed for _, elapsed in results)
+
+        # Full inserts; notifications are muted so only the insert path is measured.
+        post_save.disconnect(order_saved, sender=Order)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(threads) as pool:
+                latencies = [latency for batch in pool.map(
+                    self._create, [payment_method] * threads, [per_thread] * threads)
+                    for latency in batch]
+            elapsed = time.perf_counter() - started
+        finally:
+            post_save.connect(order_saved, sender=Order)
+            if not options['keep']:
+                Order.objects.filter(customer_name=BENCH_CUSTOMER).delete()
+
+        result = {
+            'threads': threads,
+            'orders': len(latencies),
+            'numbers_per_s': round(len(numbers) / allocation_s, 1) if allocation_s else 0.0,
+            'orders_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            'block_reservations': order_numbers.reservations - reservations,
+            'block_size': order_numbers.block_size,
+            **latency_stats(latencies),
+            'environment': environment_info(),
+        }
+        self.stdout.write(
+            f"{result['orders_per_s']} orders/s over {threads} threads "
+            f"(p50 {result['p50_ms']}ms, p99 {result['p99_ms']}ms), "
+            f"{result['numbers_per_s']} numbers/s, {result['block_reservations']} blocks reserved"
+        )
+        if options['output']:
+            write_results(options['output'], result)
+        else:
+            self.stdout.write(json.dumps(result, indent=2))
@@ -0,0 +1,31 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.orders.invoices import MISSING_INVOICE, render_invoices_parallel
+from apps.orders.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Render missing PDF invoices for one day in parallel across CPU cores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat,
+                            help='Order date (YYYY-MM-DD), defaults to yesterday')
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Worker processes, defaults to the CPU count')
+
+    def handle(self, *args, **options):
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        order_ids = list(Order.objects.filter(MISSING_INVOICE, created_at__date=day)
+                         .values_list('pk', flat=True))
+
+        started = time.perf_counter()
+        rendered = render_invoices_parallel(order_ids, workers=options['workers'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{rendered} invoices rendered for {day} in {elapsed:.2f}s"
+        ))
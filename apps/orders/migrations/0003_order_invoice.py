@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-19 00:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="invoice",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                upload_to="orders/invoices/",
+                verbose_name="الفاتورة",
+            ),
+        ),
+    ]
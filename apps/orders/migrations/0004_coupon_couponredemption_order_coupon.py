@@ -0,0 +1,214 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:01
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("store", "0001_initial"),
+        ("orders", "0003_order_invoice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Coupon",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(max_length=50, unique=True, verbose_name="الكود"),
+                ),
+                (
+                    "description",
+                    models.CharField(blank=True, max_length=255, verbose_name="الوصف"),
+                ),
+                (
+                    "discount_type",
+                    models.CharField(
+                        choices=[("percentage", "نسبة مئوية"), ("fixed", "مبلغ ثابت")],
+                        default="percentage",
+                        max_length=20,
+                        verbose_name="نوع الخصم",
+                    ),
+                ),
+                (
+                    "value",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        validators=[django.core.validators.MinValueValidator(0)],
+                        verbose_name="قيمة الخصم",
+                    ),
+                ),
+                (
+                    "max_discount_amount",
+                    models.DecimalField(
+                        blank=True,
+                        decimal_places=2,
+                        max_digits=10,
+                        null=True,
+                        verbose_name="الحد الأقصى للخصم",
+                    ),
+                ),
+                (
+                    "min_order_amount",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=10,
+                        verbose_name="الحد الأدنى للطلب",
+                    ),
+                ),
+                (
+                    "usage_limit",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="حد الاستخدام"
+                    ),
+                ),
+                (
+                    "used_count",
+                    models.PositiveIntegerField(
+                        default=0, editable=False, verbose_name="مرات الاستخدام"
+                    ),
+                ),
+                (
+                    "valid_from",
+                    models.DateTimeField(blank=True, null=True, verbose_name="صالح من"),
+                ),
+                (
+                    "valid_until",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="صالح حتى"
+                    ),
+                ),
+                ("is_active", models.BooleanField(default=True, verbose_name="نشط")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="تاريخ الإنشاء"
+                    ),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث"),
+                ),
+                (
+                    "brands",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="coupons",
+                        to="store.brand",
+                        verbose_name="الماركات",
+                    ),
+                ),
+                (
+                    "categories",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="coupons",
+                        to="store.category",
+                        verbose_name="الفئات",
+                    ),
+                ),
+                (
+                    "products",
+                    models.ManyToManyField(
+                        blank=True,
+                        related_name="coupons",
+                        to="store.product",
+                        verbose_name="المنتجات",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "كوبون خصم",
+                "verbose_name_plural": "كوبونات الخصم",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="CouponRedemption",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, max_digits=10, verbose_name="قيمة الخصم"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="تاريخ الاستخدام"
+                    ),
+                ),
+                (
+                    "coupon",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="redemptions",
+                        to="orders.coupon",
+                        verbose_name="الكوبون",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="coupon_redemptions",
+                        to="orders.order",
+                        verbose_name="الطلب",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="المستخدم",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "استخدام كوبون",
+                "verbose_name_plural": "استخدامات الكوبونات",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="coupon",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="orders",
+                to="orders.coupon",
+                verbose_name="الكوبون",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from apps.core.sequences import create_database_sequence, drop_database_sequence
+
+
+def create_sequence(apps, schema_editor):
+    create_database_sequence(schema_editor, 'order_number')
+
+
+def drop_sequence(apps, schema_editor):
+    drop_database_sequence(schema_editor, 'order_number')
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0001_initial"),
+        ("orders", "0004_coupon_couponredemption_order_coupon"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_sequence, drop_sequence),
+    ]
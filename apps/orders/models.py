@@ -1,10 +1,24 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
-from django.core.validators import RegexValidator
+from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, RegexValidator
 import uuid
 from decimal import Decimal
 
+from apps.core.sequences import BlockSequence
+
+ORDER_NUMBER_PREFIX = 'ORD-'
+
+order_numbers = BlockSequence('order_number')
+
+
+def next_order_number():
+    """Short, increasing order number such as ``ORD-0001234``."""
+    # Seven digits keep these apart from the legacy ``ORD-<8 hex>`` numbers
+    # until the ten millionth order.
+    return f"{ORDER_NUMBER_PREFIX}{order_numbers.next():07d}"
+
 
 class Order(models.Model):
     class Status(models.TextChoices):
@@ -53,6 +67,9 @@ class Order(models.Model):
                                        decimal_places=2, default=0)
     discount_amount = models.DecimalField(_('الخصم'), max_digits=10, 
                                          decimal_places=2, default=0)
+    coupon = models.ForeignKey('orders.Coupon', on_delete=models.SET_NULL,
+                               null=True, blank=True, related_name='orders',
+                               verbose_name=_('الكوبون'))
     total = models.DecimalField(_('المجموع الكلي'), max_digits=12, 
                                decimal_places=2, default=0)
     
@@ -66,6 +83,9 @@ class Order(models.Model):
     
     notes = models.TextField(_('ملاحظات'), blank=True)
     
+    invoice = models.FileField(_('الفاتورة'), upload_to='orders/invoices/',
+                               blank=True, null=True)
+    
     created_at = models.DateTimeField(_('تاريخ الإنشاء'), auto_now_add=True)
     updated_at = models.DateTimeField(_('تاريخ التحديث'), auto_now=True)
     confirmed_at = models.DateTimeField(_('تاريخ التأكيد'), null=True, blank=True)
@@ -77,21 +97,120 @@ class Order(models.Model):
         verbose_name_plural = _('الطلبات')
         ordering = ['-created_at']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_total = instance.__dict__.get('total')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.order_number:
-            import random
-            import string
-            self.order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+            self.order_number = next_order_number()
         super().save(*args, **kwargs)
     
     def __str__(self):
         return f"طلب #{self.order_number}"
     
     def calculate_totals(self):
-        self.subtotal = sum(item.total_price for item in self.items.all())
-        self.tax_amount = sum(item.tax_amount for item in self.items.all())
-        self.total = self.subtotal + self.tax_amount + self.shipping_cost - self.discount_amount
+        from apps.core.pricing import get_engine
+        
+        quote = get_engine().price_order_items(self.items.all(),
+                                               shipping_cost=self.shipping_cost,
+                                               discount_amount=self.discount_amount)
+        self.subtotal = quote.subtotal
+        self.tax_amount = quote.tax_total
+        self.total = quote.total
         self.save()
+    
+    def apply_coupon(self, code, user=None):
+        """Redeem coupon ``code`` for this order; its discount goes into the totals."""
+        from apps.core.pricing import get_engine
+        from .coupons import CouponError, apply_coupon, redeem
+        
+        if self.coupon_id:
+            raise CouponError(_('تم تطبيق كوبون على هذا الطلب بالفعل'))
+        quote = get_engine().price_order_items(self.items.all(), shipping_cost=self.shipping_cost)
+        coupon, quote = apply_coupon(quote, code)
+        return redeem(coupon.id, quote.discount_amount, order=self, user=user)
+
+
+class Coupon(models.Model):
+    class DiscountType(models.TextChoices):
+        PERCENTAGE = 'percentage', _('نسبة مئوية')
+        FIXED = 'fixed', _('مبلغ ثابت')
+    
+    code = models.CharField(_('الكود'), max_length=50, unique=True)
+    description = models.CharField(_('الوصف'), max_length=255, blank=True)
+    discount_type = models.CharField(_('نوع الخصم'), max_length=20,
+                                     choices=DiscountType.choices,
+                                     default=DiscountType.PERCENTAGE)
+    value = models.DecimalField(_('قيمة الخصم'), max_digits=10, decimal_places=2,
+                                validators=[MinValueValidator(0)])
+    max_discount_amount = models.DecimalField(_('الحد الأقصى للخصم'), max_digits=10,
+                                              decimal_places=2, null=True, blank=True)
+    min_order_amount = models.DecimalField(_('الحد الأدنى للطلب'), max_digits=10,
+                                           decimal_places=2, default=0)
+    
+    products = models.ManyToManyField('store.Product', blank=True,
+                                      related_name='coupons',
+                                      verbose_name=_('المنتجات'))
+    categories = models.ManyToManyField('store.Category', blank=True,
+                                        related_name='coupons',
+                                        verbose_name=_('الفئات'))
+    brands = models.ManyToManyField('store.Brand', blank=True,
+                                    related_name='coupons',
+                                    verbose_name=_('الماركات'))
+    
+    usage_limit = models.PositiveIntegerField(_('حد الاستخدام'), null=True, blank=True)
+    used_count = models.PositiveIntegerField(_('مرات الاستخدام'), default=0,
+                                             editable=False)
+    
+    valid_from = models.DateTimeField(_('صالح من'), null=True, blank=True)
+    valid_until = models.DateTimeField(_('صالح حتى'), null=True, blank=True)
+    is_active = models.BooleanField(_('نشط'), default=True)
+    
+    created_at = models.DateTimeField(_('تاريخ الإنشاء'), auto_now_add=True)
+    updated_at = models.DateTimeField(_('تاريخ التحديث'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('كوبون خصم')
+        verbose_name_plural = _('كوبونات الخصم')
+        ordering = ['-created_at']
+    
+    def clean(self):
+        super().clean()
+        if (self.discount_type == self.DiscountType.PERCENTAGE
+                and self.value is not None and self.value > 100):
+            raise ValidationError({'value': _('لا يمكن أن تتجاوز نسبة الخصم 100%')})
+    
+    def save(self, *args, **kwargs):
+        self.code = self.code.strip().upper()
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return self.code
+
+
+class CouponRedemption(models.Model):
+    coupon = models.ForeignKey(Coupon, on_delete=models.CASCADE,
+                               related_name='redemptions',
+                               verbose_name=_('الكوبون'))
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='coupon_redemptions',
+                              verbose_name=_('الطلب'))
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL,
+                             null=True, blank=True, verbose_name=_('المستخدم'))
+    amount = models.DecimalField(_('قيمة الخصم'), max_digits=10, decimal_places=2)
+    created_at = models.DateTimeField(_('تاريخ الاستخدام'), auto_now_add=True)
+    
+    class Meta:
+        verbose_name = _('استخدام كوبون')
+        verbose_name_plural = _('استخدامات الكوبونات')
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.coupon.code} - {self.amount}"
 
 
 class OrderItem(models.Model):
@@ -125,7 +244,9 @@ class OrderItem(models.Model):
     
     @property
     def tax_amount(self):
-        return (self.price * self.tax_rate / 100) * self.quantity
+        from apps.core.pricing import get_engine
+        
+        return self.price * get_engine().tax_factor(self.tax_rate) * self.quantity
     
     @property
     def total_with_tax(self):
@@ -177,5 +298,11 @@ class QuickOrder(models.Model):
         verbose_name_plural = _('الطلبات السريعة')
         ordering = ['-created_at']
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
+    
     def __str__(self):
         return f"طلب سريع #{self.id} - {self.name}"
@@ -0,0 +1,129 @@
+"""
+Quick order intake.
+
+Submissions are checked against cache-side dedupe keys and sliding-window
+throttles, then buffered and written to the database in batches by
+``flush_quick_orders``. A flood of submissions costs cache operations, not
+database inserts.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.core import notifications
+from apps.core.queues import BufferedQueue
+from apps.core.ratelimit import SlidingWindowCounter
+from apps.dashboard import kpis
+from .models import QuickOrder
+
+ACCEPTED = 'accepted'
+DUPLICATE = 'duplicate'
+THROTTLED = 'throttled'
+
+FIELDS = ['phone_number', 'name', 'email', 'quantity', 'city', 'district',
+          'address', 'notes']
+
+FLUSH_SCHEDULED_KEY = 'quick-order:flush-scheduled'
+
+queue = BufferedQueue('quick_orders')
+ip_limiter = SlidingWindowCounter('quick-order-ip', *settings.QUICK_ORDER_IP_RATE)
+phone_limiter = SlidingWindowCounter('quick-order-phone', *settings.QUICK_ORDER_PHONE_RATE)
+
+
+def get_client_ip(request):
+    """Client address for throttling.
+
+    ``X-Forwarded-For`` is only read behind ``TRUSTED_PROXY_COUNT`` proxies,
+    and then only the entry the outermost of them appended; anything to its
+    left is whatever the client sent.
+    """
+    proxies = settings.TRUSTED_PROXY_COUNT
+    if proxies:
+        forwarded_for = [address.strip() for address
+                         in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')
+                         if address.strip()]
+        if len(forwarded_for) >= proxies:
+            return forwarded_for[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def dedupe_key(phone_number, product_id, variant_id):
+    return f"quick-order:dedupe:{phone_number}:{product_id}:{variant_id or 0}"
+
+
+def submit(cleaned_data, ip_address=None, user_agent=''):
+    """Accept, dedupe or throttle a validated quick order submission."""
+    phone_number = cleaned_data['phone_number']
+    if ip_address and not ip_limiter.hit(ip_address):
+        return THROTTLED
+    if not phone_limiter.hit(phone_number):
+        return THROTTLED
+
+    product = cleaned_data['product']
+    variant = cleaned_data.get('variant')
+    key = dedupe_key(phone_number, product.pk, variant.pk if variant else None)
+    if not cache.add(key, 1, timeout=settings.QUICK_ORDER_DEDUPE_WINDOW):
+        return DUPLICATE
+
+    item = {field: cleaned_data.get(field) or '' for field in FIELDS}
+    item.update({
+        'quantity': cleaned_data.get('quantity') or 1,
+        'product_id': product.pk,
+        'variant_id': variant.pk if variant else None,
+        'ip_address': ip_address,
+        'user_agent': user_agent[:1000],
+    })
+    queue.push(item)
+    schedule_flush()
+    return ACCEPTED
+
+
+def schedule_flush():
+    """Queue one flush per ``QUICK_ORDER_FLUSH_DELAY`` however many orders arrive."""
+    from .tasks import flush_quick_orders
+
+    delay = settings.QUICK_ORDER_FLUSH_DELAY
+    if cache.add(FLUSH_SCHEDULED_KEY, 1, timeout=delay):
+        flush_quick_orders.apply_async(countdown=delay)
+
+
+def _existing(items):
+    """Drop items whose product was deleted while buffered and clear deleted variants."""
+    from apps.store.models import Product, ProductVariant
+
+    product_ids = set(Product.objects.filter(pk__in={item['product_id'] for item in items})
+                      .order_by().values_list('pk', flat=True))
+    variant_ids = {item['variant_id'] for item in items if item['variant_id']}
+    if variant_ids:
+        variant_ids = set(ProductVariant.objects.filter(pk__in=variant_ids)
+                          .order_by().values_list('pk', flat=True))
+    items = [item for item in items if item['product_id'] in product_ids]
+    for item in items:
+        if item['variant_id'] not in variant_ids:
+            item['variant_id'] = None
+    return items
+
+
+def flush(batch_size=None):
+    """Write buffered quick orders with one bulk insert per batch."""
+    batch_size = batch_size or settings.QUICK_ORDER_BATCH_SIZE
+    cache.delete(FLUSH_SCHEDULED_KEY)
+    written = 0
+    while True:
+        items = queue.drain(batch_size)
+        if not items:
+            return written
+        try:
+            with transaction.atomic():
+                orders = QuickOrder.objects.bulk_create(
+                    [QuickOrder(**item) for item in _existing(items)])
+        except Exception:
+            # Nothing was written; keep the batch for the next flush.
+            queue.requeue(items)
+            raise
+        notifications.notify(notifications.QUICK_ORDER_RECEIVED,
+                             [order.pk for order in orders if order.pk])
+        # bulk_create sends no post_save, so the dashboard counter is bumped here.
+        kpis.adjust(kpis.PENDING_QUICK_ORDERS, len(orders))
+        written += len(orders)
@@ -0,0 +1,44 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core import notifications
+from apps.core.pricing import invalidate_pricing
+from apps.store.models import Category
+from . import coupons  # noqa: F401  registers the coupon promotion source
+from .events import publish_status
+from .models import Coupon, Order, QuickOrder
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    previous_status = getattr(instance, '_loaded_status', None)
+    instance._loaded_status = instance.status
+
+    if created:
+        notifications.notify(notifications.ORDER_CONFIRMATION, [instance.pk])
+        return
+    if instance.status == previous_status:
+        return
+
+    publish_status([instance])
+    if instance.status == Order.Status.SHIPPED:
+        notifications.notify(notifications.ORDER_SHIPPED, [instance.pk])
+
+
+@receiver(post_save, sender=QuickOrder)
+def quick_order_saved(sender, instance, created, **kwargs):
+    if created:
+        notifications.notify(notifications.QUICK_ORDER_RECEIVED, [instance.pk])
+
+
+@receiver(post_save, sender=Coupon)
+@receiver(post_delete, sender=Coupon)
+@receiver(m2m_changed, sender=Coupon.products.through)
+@receiver(m2m_changed, sender=Coupon.categories.through)
+@receiver(m2m_changed, sender=Coupon.brands.through)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def coupon_rules_changed(sender, **kwargs):
+    action = kwargs.get('action')
+    if action is None or action.startswith('post_'):
+        invalidate_pricing()
@@ -0,0 +1,36 @@
+from datetime import date as date_cls, timedelta
+
+from celery import group, shared_task
+from django.utils import timezone
+
+from . import invoices, quick_orders
+from .models import Order
+
+INVOICE_CHUNK_SIZE = 50
+
+
+@shared_task(ignore_result=True)
+def generate_invoice(order_id):
+    invoices.generate_invoices([order_id])
+
+
+@shared_task(ignore_result=True)
+def generate_invoices(order_ids):
+    invoices.generate_invoices(order_ids)
+
+
+@shared_task(ignore_result=True)
+def generate_daily_invoices(day=None):
+    """Fan a day's invoices out across the worker pool in chunks."""
+    day = date_cls.fromisoformat(day) if day else timezone.localdate() - timedelta(days=1)
+    order_ids = list(Order.objects.filter(invoices.MISSING_INVOICE, created_at__date=day)
+                     .values_list('pk', flat=True))
+    chunks = [order_ids[i:i + INVOICE_CHUNK_SIZE]
+              for i in range(0, len(order_ids), INVOICE_CHUNK_SIZE)]
+    if chunks:
+        group(generate_invoices.s(chunk) for chunk in chunks).apply_async()
+
+
+@shared_task(ignore_result=True)
+def flush_quick_orders():
+    quick_orders.flush()
@@ -1,3 +1,466 @@
-from django.test import TestCase
+import asyncio
+import re
+import shutil
+import smtplib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.mail.backends import locmem
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import connection
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from apps.accounts.models import User
+
+from apps.core import events, notifications, sms
+from apps.core.pricing import get_engine, invalidate_pricing
+from apps.payment.models import PaymentMethod
+from apps.store.models import Brand, Category, Product
+from . import coupons, invoices, quick_orders
+from .events import ORDER_STATUS
+from .models import Coupon, Order, OrderItem, QuickOrder
+
+
+class OrderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.payment_method = PaymentMethod.objects.create(
+            name='الدفع عند الاستلام', code='cod',
+            type=PaymentMethod.PaymentType.CASH_ON_DELIVERY,
+        )
+        cls.product = Product.objects.create(
+            name='منتج', sku='SKU-1', description='-', short_description='-',
+            price=100, quantity=10,
+        )
+
+    def create_order(self, **kwargs):
+        defaults = {
+            'customer_name': 'عميل', 'customer_email': 'customer@example.com',
+            'customer_phone': '+966500000000', 'shipping_city': 'الرياض',
+            'shipping_address': 'شارع 1', 'payment_method': self.payment_method,
+        }
+        defaults.update(kwargs)
+        return Order.objects.create(**defaults)
+
+
+class OrderNotificationTests(OrderTestCase):
+    def setUp(self):
+        sms.outbox.clear()
+
+    def test_order_confirmation_is_sent_after_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            order = self.create_order()
+        self.assertEqual(len(mail.outbox), 0)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(order.order_number, mail.outbox[0].subject)
+        self.assertEqual(sms.outbox, [('+966500000000', sms.outbox[0][1])])
+
+    def test_shipped_notification_only_on_transition(self):
+        order = self.create_order()
+        order = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = Order.Status.SHIPPED
+            order.save()
+            order.save()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(order.order_number, mail.outbox[0].subject)
+
+    def test_batch_uses_single_connection(self):
+        orders = [self.create_order(customer_email=f'c{i}@example.com') for i in range(3)]
+        with mock.patch('apps.core.tasks.get_connection', wraps=mail.get_connection) as get_connection:
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.notify(notifications.ORDER_SHIPPED, [order.pk for order in orders])
+        get_connection.assert_called_once()
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(len(sms.outbox), 3)
+
+    def test_only_failed_emails_are_retried(self):
+        orders = [self.create_order(customer_email=f'c{i}@example.com') for i in range(3)]
+        send_messages = locmem.EmailBackend.send_messages
+        attempts = []
+
+        def flaky(backend, messages):
+            attempts.append(messages[0].to[0])
+            if len(attempts) == 2:
+                raise smtplib.SMTPServerDisconnected('connection dropped')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', flaky):
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.notify(notifications.ORDER_SHIPPED, [order.pk for order in orders])
+        self.assertEqual(len(attempts), 4)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['c0@example.com', 'c1@example.com', 'c2@example.com'])
+        self.assertEqual(len(sms.outbox), 3)
+
+    def test_rejected_recipient_does_not_block_the_batch(self):
+        orders = [self.create_order(customer_email=f'c{i}@example.com') for i in range(3)]
+        send_messages = locmem.EmailBackend.send_messages
+        attempts = []
+
+        def rejecting(backend, messages):
+            recipient = messages[0].to[0]
+            attempts.append(recipient)
+            if recipient == 'c0@example.com':
+                raise smtplib.SMTPRecipientsRefused({recipient: (550, b'no such user')})
+            return send_messages(backend, messages)
+
+        with mock.patch.object(locmem.EmailBackend, 'send_messages', rejecting), \
+                self.assertLogs('apps.core.tasks', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.notify(notifications.ORDER_SHIPPED, [order.pk for order in orders])
+        self.assertEqual(attempts.count('c0@example.com'), 1)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['c1@example.com', 'c2@example.com'])
+
+    def test_quick_order_notification(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            QuickOrder.objects.create(
+                phone_number='+966511111111', name='عميل', product=self.product,
+                city='جدة',
+            )
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(len(sms.outbox), 1)
+        self.assertIn(self.product.name, sms.outbox[0][1])
+
+
+class OrderEventTests(OrderTestCase):
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            email='buyer@example.com', password='x', first_name='a', last_name='b')
+        self.order = Order.objects.get(pk=self.create_order(customer=self.customer).pk)
+
+    def test_status_transition_is_published_after_commit(self):
+        with mock.patch('apps.core.events.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.order.status = Order.Status.CONFIRMED
+                self.order.save()
+                self.order.save()
+        publish.assert_called_once()
+        channels, event, payload = publish.call_args.args
+        self.assertEqual(channels, [events.order_channel(self.order.uuid), events.STAFF_CHANNEL])
+        self.assertEqual(event, ORDER_STATUS)
+        self.assertEqual(payload['status'], Order.Status.CONFIRMED)
+
+    async def test_long_poll_returns_published_event(self):
+        await sync_to_async(self.async_client.force_login)(self.customer)
+        url = reverse('orders:order_events', args=[self.order.uuid])
+        request = asyncio.ensure_future(self.async_client.get(url, {'poll': 1}))
+        # Publish until the view has subscribed and answered.
+        while not request.done():
+            events.publish([events.order_channel(self.order.uuid)], ORDER_STATUS,
+                           {'status': Order.Status.SHIPPED})
+            await asyncio.sleep(0.01)
+
+        response = await request
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['events'][0],
+                         {'event': ORDER_STATUS, 'data': {'status': 'shipped'}})
+
+    async def test_other_customers_cannot_subscribe(self):
+        other = await sync_to_async(User.objects.create_user)(
+            email='other@example.com', password='x', first_name='a', last_name='b')
+        await sync_to_async(self.async_client.force_login)(other)
+        response = await self.async_client.get(
+            reverse('orders:order_events', args=[self.order.uuid]), {'poll': 1})
+        self.assertEqual(response.status_code, 404)
+
+
+class InvoiceTests(OrderTestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.order = self.create_order(customer=User.objects.create_user(
+            email='buyer@example.com', password='x', first_name='a', last_name='b'))
+        OrderItem.objects.create(order=self.order, product=self.product,
+                                 product_name='منتج تجريبي', product_sku='SKU-1',
+                                 price=100, quantity=2)
+
+    def test_render_invoice(self):
+        order = invoices.orders_without_invoice([self.order.pk])[0]
+        pdf = invoices.render_invoice(invoices.invoice_payload(order))
+        self.assertTrue(pdf.startswith(b'%PDF'))
+
+    def test_font_covers_shaped_labels(self):
+        from reportlab.pdfbase import pdfmetrics
+
+        resources = invoices.load_resources()
+        glyphs = pdfmetrics.getFont(resources['font']).face.charToGlyph
+        text = ''.join(resources['labels'].values()) + invoices.shape('منتج تجريبي')
+        self.assertEqual({char for char in text if ord(char) not in glyphs} - {' '}, set())
+
+    def test_missing_font_is_a_configuration_error(self):
+        invoices.load_resources.cache_clear()
+        self.addCleanup(invoices.load_resources.cache_clear)
+        with self.settings(INVOICE_FONT_PATH='/nonexistent.ttf'):
+            with self.assertRaises(ImproperlyConfigured):
+                invoices.load_resources()
+
+    def test_polling_queues_one_render(self):
+        cache.clear()
+        self.client.force_login(self.order.customer)
+        url = reverse('orders:invoice_download', args=[self.order.uuid])
+        with mock.patch('apps.orders.views.generate_invoice.delay') as delay:
+            for _ in range(3):
+                self.assertEqual(self.client.get(url).status_code, 202)
+        delay.assert_called_once_with(self.order.pk)
+
+    def test_invoice_is_stored_once(self):
+        self.assertEqual(invoices.generate_invoices([self.order.pk]), 1)
+        self.assertEqual(invoices.generate_invoices([self.order.pk]), 0)
+        self.order.refresh_from_db()
+        self.assertTrue(self.order.invoice.name.endswith('.pdf'))
+
+    def test_download_renders_in_background_then_serves_cached_file(self):
+        cache.clear()
+        self.client.force_login(self.order.customer)
+        url = reverse('orders:invoice_download', args=[self.order.uuid])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+
+        with mock.patch('apps.orders.invoices.render_invoice') as render:
+            response = self.client.get(url)
+        render.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+class QuickOrderIntakeTests(OrderTestCase):
+    url = reverse('orders:quick_order_create')
+
+    def setUp(self):
+        cache.clear()
+        quick_orders.queue.drain(1000)
+
+    def post(self, phone_number='+966500000001', ip='10.0.0.1'):
+        return self.client.post(self.url, {
+            'phone_number': phone_number, 'name': 'عميل', 'product': self.product.pk,
+            'quantity': 1, 'city': 'الرياض',
+        }, REMOTE_ADDR=ip)
+
+    def test_accepted_orders_are_written_in_bulk(self):
+        with mock.patch('apps.orders.quick_orders.schedule_flush'):
+            self.assertEqual(self.post().status_code, 202)
+            self.assertEqual(self.post(phone_number='+966500000002').status_code, 202)
+        self.assertEqual(QuickOrder.objects.count(), 0)
+
+        # Savepoint, product check, insert, release
+        with self.assertNumQueries(4):
+            with mock.patch('apps.core.notifications.notify'):
+                self.assertEqual(quick_orders.flush(), 2)
+        order = QuickOrder.objects.get(phone_number='+966500000001')
+        self.assertEqual(order.ip_address, '10.0.0.1')
+
+    def test_orders_for_deleted_products_are_dropped(self):
+        gone = Product.objects.create(name='محذوف', sku='SKU-GONE', description='-',
+                                      short_description='-', price=5, quantity=1)
+        with mock.patch('apps.orders.quick_orders.schedule_flush'):
+            self.post()
+            self.client.post(self.url, {'phone_number': '+966500000002', 'name': 'عميل',
+                                        'product': gone.pk, 'quantity': 1, 'city': 'الرياض'})
+        gone.delete()
+        with mock.patch('apps.core.notifications.notify'):
+            self.assertEqual(quick_orders.flush(), 1)
+        self.assertEqual(QuickOrder.objects.get().product, self.product)
+
+    def test_failed_insert_keeps_the_batch(self):
+        with mock.patch('apps.orders.quick_orders.schedule_flush'):
+            self.post()
+            self.post(phone_number='+966500000002')
+        with mock.patch.object(QuickOrder.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                quick_orders.flush()
+        self.assertEqual(len(quick_orders.queue), 2)
+        with mock.patch('apps.core.notifications.notify'):
+            self.assertEqual(quick_orders.flush(), 2)
+        self.assertEqual(list(QuickOrder.objects.order_by('pk').values_list('phone_number', flat=True)),
+                         ['+966500000001', '+966500000002'])
+
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        request = RequestFactory().post(self.url, REMOTE_ADDR='10.0.0.9',
+                                        HTTP_X_FORWARDED_FOR='1.2.3.4')
+        self.assertEqual(quick_orders.get_client_ip(request), '10.0.0.9')
+        with self.settings(TRUSTED_PROXY_COUNT=1):
+            request.META['HTTP_X_FORWARDED_FOR'] = '6.6.6.6, 1.2.3.4'
+            self.assertEqual(quick_orders.get_client_ip(request), '1.2.3.4')
+
+    def test_duplicate_submission_is_rejected(self):
+        self.assertEqual(self.post().status_code, 202)
+        self.assertEqual(self.post().status_code, 409)
+        self.assertEqual(QuickOrder.objects.count(), 1)
+
+    def test_ip_flood_is_throttled(self):
+        limit = quick_orders.ip_limiter.limit
+        statuses = [self.post(phone_number=f'+9665000010{i:02d}').status_code
+                    for i in range(limit + 3)]
+        self.assertEqual(statuses[:limit], [202] * limit)
+        self.assertEqual(statuses[limit:], [429] * 3)
+
+
+class CouponTests(OrderTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.brand = Brand.objects.create(name='ماركة')
+        cls.parent = Category.objects.create(name='أزياء')
+        cls.child = Category.objects.create(name='أحذية', parent=cls.parent)
+        cls.shoe = Product.objects.create(
+            name='حذاء', sku='SHOE', description='-', short_description='-',
+            price=200, quantity=10, brand=cls.brand,
+        )
+        cls.shoe.categories.add(cls.child)
+
+    def setUp(self):
+        invalidate_pricing()
+        self.addCleanup(invalidate_pricing)
+
+    def quote(self):
+        return get_engine().price_lines([
+            (1, self.product.pk, Decimal('100'), Decimal('15'), 1),
+            (2, self.shoe.pk, Decimal('200'), Decimal('15'), 1),
+        ])
+
+    def test_category_coupon_covers_descendants(self):
+        coupon = Coupon.objects.create(code='fashion10', value=10)
+        coupon.categories.add(self.parent)
+
+        compiled, quote = coupons.apply_coupon(self.quote(), 'FASHION10')
+        self.assertEqual(compiled.id, coupon.pk)
+        self.assertEqual(quote.discount_amount, Decimal('20.00'))
+
+    def test_all_coupons_checked_in_one_query(self):
+        Coupon.objects.create(code='ALL', value=5)
+        Coupon.objects.create(code='BRAND', value=50,
+                              discount_type=Coupon.DiscountType.FIXED).brands.add(self.brand)
+        Coupon.objects.create(code='OTHER', value=10).products.add(self.product)
+        quote = self.quote()
+        engine = get_engine()
+
+        with self.assertNumQueries(1):
+            subtotals = coupons.eligible_subtotals(quote, engine.promotions)
+        by_code = {coupon.code: subtotals[coupon.id] for coupon in engine.promotions}
+        self.assertEqual(by_code, {'ALL': 300, 'BRAND': 200, 'OTHER': 100})
+
+    def test_ineligible_coupon_is_rejected(self):
+        Coupon.objects.create(code='BRANDONLY', value=10).brands.add(
+            Brand.objects.create(name='أخرى'))
+        with self.assertRaises(coupons.CouponError):
+            coupons.apply_coupon(self.quote(), 'BRANDONLY')
+        with self.assertRaises(coupons.CouponError):
+            coupons.apply_coupon(self.quote(), 'MISSING')
+
+    def test_redemption_discounts_the_order(self):
+        coupon = Coupon.objects.create(code='FASHION10', value=10)
+        coupon.categories.add(self.parent)
+        order = self.create_order(shipping_cost=25)
+        for product in (self.product, self.shoe):
+            OrderItem.objects.create(order=order, product=product, product_name=product.name,
+                                     product_sku=product.sku, price=product.price, quantity=1)
+
+        redemption = order.apply_coupon('fashion10')
+        order.refresh_from_db()
+        self.assertEqual((order.coupon_id, redemption.order_id), (coupon.pk, order.pk))
+        self.assertEqual(order.discount_amount, Decimal('20.00'))
+        # 300 + 45 tax + 25 shipping - 20
+        self.assertEqual(order.total, Decimal('350.00'))
+        with self.assertRaises(coupons.CouponError):
+            order.apply_coupon('FASHION10')
+
+    def test_stale_order_cannot_take_a_second_coupon(self):
+        coupon = Coupon.objects.create(code='FASHION10', value=10)
+        order = self.create_order()
+        OrderItem.objects.create(order=order, product=self.product, product_name=self.product.name,
+                                 product_sku=self.product.sku, price=self.product.price, quantity=1)
+        # Two requests holding the order before either applied a coupon
+        first, second = Order.objects.get(pk=order.pk), Order.objects.get(pk=order.pk)
+
+        first.apply_coupon('FASHION10')
+        with self.assertRaises(coupons.CouponError):
+            second.apply_coupon('FASHION10')
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+        self.assertEqual(coupon.redemptions.count(), 1)
+
+    def test_percentage_over_100_is_invalid(self):
+        with self.assertRaises(ValidationError):
+            Coupon(code='TOO-MUCH', value=150).full_clean()
+        Coupon(code='FIXED-150', value=150, discount_type=Coupon.DiscountType.FIXED).full_clean()
+
+    def test_usage_limit(self):
+        coupon = Coupon.objects.create(code='ONCE', value=10, usage_limit=1)
+        coupons.redeem(coupon.pk, 10)
+        with self.assertRaises(coupons.CouponError):
+            coupons.redeem(coupon.pk, 10)
+        coupon.refresh_from_db()
+        self.assertEqual(coupon.used_count, 1)
+
+
+class OrderNumberTests(TransactionTestCase):
+    threads = 8
+    orders_per_thread = 25
+
+    def test_concurrent_orders_get_unique_increasing_numbers(self):
+        payment_method = PaymentMethod.objects.create(name='نقد', code='cash', type='cod')
+
+        def create_orders(_):
+            try:
+                return [
+                    Order.objects.create(
+                        customer_name='عميل', customer_phone='+966500000000',
+                        shipping_city='الرياض', shipping_address='شارع 1',
+                        payment_method=payment_method,
+                    ).order_number
+                    for _ in range(self.orders_per_thread)
+                ]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            per_thread = list(pool.map(create_orders, range(self.threads)))
+
+        numbers = [number for thread_numbers in per_thread for number in thread_numbers]
+        self.assertEqual(len(set(numbers)), self.threads * self.orders_per_thread)
+        self.assertTrue(all(re.fullmatch(r'ORD-\d{7}', number) for number in numbers))
+        for thread_numbers in per_thread:
+            sequence = [int(number.removeprefix('ORD-')) for number in thread_numbers]
+            self.assertEqual(sequence, sorted(set(sequence)))
+
+
+class CouponRedemptionLoadTest(TransactionTestCase):
+    redemptions = 1000
+    usage_limit = 100
+
+    def test_concurrent_redemptions_respect_usage_limit(self):
+        coupon = Coupon.objects.create(code='LIMITED', value=10, usage_limit=self.usage_limit)
+
+        def redeem(_):
+            try:
+                coupons.redeem(coupon.pk, 10)
+                return True
+            except coupons.CouponError:
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            results = list(pool.map(redeem, range(self.redemptions)))
+
+        coupon.refresh_from_db()
+        self.assertEqual(results.count(True), self.usage_limit)
+        self.assertEqual(coupon.used_count, self.usage_limit)
+        self.assertEqual(coupon.redemptions.count(), self.usage_limit)
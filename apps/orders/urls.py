@@ -0,0 +1,12 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'orders'
+
+urlpatterns = [
+    path('quick/', views.quick_order_create, name='quick_order_create'),
+    path('events/', views.staff_events, name='staff_events'),
+    path('<uuid:uuid>/invoice/', views.invoice_download, name='invoice_download'),
+    path('<uuid:uuid>/events/', views.order_events, name='order_events'),
+]
@@ -1,3 +1,78 @@
-from django.shortcuts import render
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
 
-# Create your views here.
+from apps.core import events
+from . import invoices, quick_orders
+from .forms import QuickOrderForm
+from .invoices import invoice_filename
+from .models import Order
+from .tasks import generate_invoice
+
+QUICK_ORDER_STATUS_CODES = {
+    quick_orders.ACCEPTED: 202,
+    quick_orders.DUPLICATE: 409,
+    quick_orders.THROTTLED: 429,
+}
+
+
+@login_required
+def invoice_download(request, uuid):
+    order = get_object_or_404(Order, uuid=uuid)
+    if not (request.user.is_staff or order.customer_id == request.user.pk):
+        raise Http404
+
+    if not order.invoice:
+        # Polls while the invoice renders must not queue another render.
+        if cache.add(invoices.pending_key(order.pk), 1, timeout=invoices.PENDING_TIMEOUT):
+            generate_invoice.delay(order.pk)
+        return JsonResponse({'status': 'pending'}, status=202)
+
+    return FileResponse(order.invoice.open('rb'), as_attachment=True,
+                        filename=invoice_filename(order.order_number),
+                        content_type='application/pdf')
+
+
+@require_POST
+def quick_order_create(request):
+    form = QuickOrderForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'status': 'invalid', 'errors': form.errors}, status=400)
+
+    result = quick_orders.submit(
+        form.cleaned_data,
+        ip_address=quick_orders.get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+    )
+    return JsonResponse({'status': result}, status=QUICK_ORDER_STATUS_CODES[result])
+
+
+def _can_view_order(user, uuid):
+    if not user.is_authenticated:
+        return False
+    orders = Order.objects.filter(uuid=uuid)
+    if not user.is_staff:
+        orders = orders.filter(customer=user)
+    return orders.exists()
+
+
+async def order_events(request, uuid):
+    """Status changes of one order, as SSE or long-poll (``?poll=1``)."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    if not await sync_to_async(_can_view_order)(request.user, uuid):
+        raise Http404
+    return await events.event_response(request, [events.order_channel(uuid)])
+
+
+async def staff_events(request):
+    """All order status changes and low-stock alerts, for staff screens."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    is_staff = await sync_to_async(lambda: request.user.is_staff)()
+    if not is_staff:
+        raise Http404
+    return await events.event_response(request, [events.STAFF_CHANNEL])
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import PaymentMethod, Payment
+from .gateways import enqueue_capture
+from .models import PaymentMethod, Payment, WebhookEvent
 
 
 @admin.register(PaymentMethod)
@@ -17,5 +18,25 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ['status', 'payment_method', 'currency', 'created_at']
     search_fields = ['order__order_number', 'transaction_id']
     readonly_fields = ['uuid', 'created_at', 'updated_at', 'authorized_at', 
-                       'captured_at']
+                       'captured_at', 'gateway_response']
+    list_select_related = ['order', 'payment_method']
     date_hierarchy = 'created_at'
+    actions = ['capture_payments']
+    
+    def capture_payments(self, request, queryset):
+        for payment in queryset.filter(status=Payment.PaymentStatus.AUTHORIZED):
+            enqueue_capture(payment)
+    capture_payments.short_description = 'تحصيل الدفعات المصرح بها'
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['event_id', 'gateway', 'type', 'received_at', 'processed_at']
+    list_filter = ['gateway', 'type', 'processed_at']
+    search_fields = ['event_id']
+    readonly_fields = ['gateway', 'event_id', 'type', 'payload', 'received_at',
+                       'processed_at', 'error']
+    date_hierarchy = 'received_at'
+    
+    def has_add_permission(self, request):
+        return False
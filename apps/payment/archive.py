@@ -0,0 +1,75 @@
+"""
+Compressed storage for gateway payloads.
+
+``Payment.gateway_response`` reads and writes through these helpers, so the
+JSON blobs live zlib-compressed in ``PaymentGatewayResponse`` and are only
+fetched when a payment's payload is actually needed, not on every changelist
+or order/payment join. ``archive_responses`` moves payloads still stored
+inline on ``payment_payment`` in batches.
+"""
+
+import json
+import time
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Payment, PaymentGatewayResponse
+
+COMPRESSION_LEVEL = 6
+
+
+def compress(value):
+    raw = json.dumps(value, cls=DjangoJSONEncoder, separators=(',', ':')).encode()
+    return zlib.compress(raw, COMPRESSION_LEVEL), len(raw)
+
+
+def decompress(data):
+    return json.loads(zlib.decompress(bytes(data)))
+
+
+def load_response(payment):
+    data = (PaymentGatewayResponse.objects.filter(payment_id=payment.pk)
+            .values_list('data', flat=True).first())
+    return None if data is None else decompress(data)
+
+
+def store_response(payment, value):
+    if value is None:
+        PaymentGatewayResponse.objects.filter(payment_id=payment.pk).delete()
+        return
+    data, size = compress(value)
+    PaymentGatewayResponse.objects.update_or_create(payment_id=payment.pk,
+                                                    defaults={'data': data, 'size': size})
+
+
+def archive_responses(batch_size=500, pause=0.0):
+    """Move inline payloads to the archive; returns ``(payments, bytes before, bytes after)``."""
+    moved = raw_bytes = stored_bytes = 0
+    pending = (Payment.objects.filter(legacy_gateway_response__isnull=False)
+               .order_by('pk').values_list('pk', flat=True))
+    last_pk = 0
+    while True:
+        batch_ids = list(pending.filter(pk__gt=last_pk)[:batch_size])
+        if not batch_ids:
+            return moved, raw_bytes, stored_bytes
+        last_pk = batch_ids[-1]
+        with transaction.atomic():
+            rows = list(Payment.objects.filter(pk__in=batch_ids,
+                                               legacy_gateway_response__isnull=False)
+                        .select_for_update(skip_locked=True)
+                        .values_list('pk', 'legacy_gateway_response'))
+            archives = []
+            for pk, value in rows:
+                data, size = compress(value)
+                archives.append(PaymentGatewayResponse(payment_id=pk, data=data, size=size))
+                raw_bytes += size
+                stored_bytes += len(data)
+            # A payload archived since the row was read is newer; keep it.
+            PaymentGatewayResponse.objects.bulk_create(archives, ignore_conflicts=True)
+            Payment.objects.filter(pk__in=[pk for pk, _ in rows]).update(
+                legacy_gateway_response=None)
+        moved += len(rows)
+        if pause:
+            time.sleep(pause)
@@ -0,0 +1,237 @@
+"""
+Payment gateway clients, modelled on the SMS backends.
+
+The active gateway is selected with the ``PAYMENT_GATEWAY`` setting. Every
+call carries an idempotency key derived from ``Payment.uuid`` and the
+operation, so a retried request (by the HTTP adapter or by Celery) can never
+charge a customer twice. Captures run in Celery workers (see
+``apps.payment.tasks``) so a slow gateway never holds up a web worker.
+"""
+
+import os
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+# Operations that fail with these HTTP statuses are safe to retry.
+RETRY_STATUSES = (409, 429, 500, 502, 503, 504)
+
+
+class GatewayError(Exception):
+    def __init__(self, message, response=None):
+        super().__init__(message)
+        self.response = response or {}
+
+
+class GatewayUnavailable(GatewayError):
+    """Timeouts, connection failures and 5xx responses; worth retrying."""
+
+
+class PaymentDeclined(GatewayError):
+    """The gateway refused the operation; retrying will not help."""
+
+
+def idempotency_key(payment, operation):
+    return f"{payment.uuid}:{operation}"
+
+
+def refund_key(payment, amount, sequence):
+    """Key for the ``sequence``-th refund of ``payment``.
+
+    A payment can be refunded in parts, so the key also carries the amount
+    and a sequence number; a retry of the same refund must reuse both.
+    """
+    amount = 'full' if amount is None else minor_units(amount)
+    return idempotency_key(payment, f"refund:{sequence}:{amount}")
+
+
+def minor_units(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal('1')))
+
+
+class BaseGateway:
+    def authorize(self, payment):
+        """Reserve the payment amount; returns the gateway response dict."""
+        raise NotImplementedError
+
+    def capture(self, payment):
+        raise NotImplementedError
+
+    def refund(self, payment, amount=None, sequence=1):
+        """Refund ``amount`` (everything by default) as the ``sequence``-th refund."""
+        raise NotImplementedError
+
+
+class FakeGateway(BaseGateway):
+    """In-process gateway for development and tests.
+
+    Responses are remembered per idempotency key, like a real gateway, and
+    ``decline`` / ``unavailable`` make the next calls fail.
+    """
+
+    responses = {}
+    calls = []
+    _lock = threading.Lock()
+
+    def __init__(self, decline=False, unavailable=False):
+        self.decline = decline
+        self.unavailable = unavailable
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls.responses.clear()
+            cls.calls.clear()
+
+    def _call(self, payment, operation, status, amount=None, key=None):
+        key = key or idempotency_key(payment, operation)
+        with self._lock:
+            self.calls.append(key)
+            if key in self.responses:
+                return self.responses[key]
+            if self.unavailable:
+                raise GatewayUnavailable('fake gateway unavailable')
+            if self.decline:
+                raise PaymentDeclined('card_declined', {'error': {'code': 'card_declined'}})
+            response = {
+                'id': payment.transaction_id or f"fake_{payment.uuid.hex}",
+                'object': operation,
+                'status': status,
+                'amount': minor_units(payment.amount if amount is None else amount),
+                'currency': payment.currency.lower(),
+            }
+            self.responses[key] = response
+            return response
+
+    def authorize(self, payment):
+        return self._call(payment, 'authorize', 'requires_capture')
+
+    def capture(self, payment):
+        return self._call(payment, 'capture', 'succeeded')
+
+    def refund(self, payment, amount=None, sequence=1):
+        return self._call(payment, 'refund', 'succeeded', amount,
+                          key=refund_key(payment, amount, sequence))
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session():
+    """Pooled ``requests.Session`` shared by the gateway clients of this process.
+
+    Keyed by pid so forked workers never share sockets with their parent.
+    """
+    pid = os.getpid()
+    session = _sessions.get(pid)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(pid)
+            if session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                # Gateway POSTs carry idempotency keys, so they are safe to
+                # retry on connection errors and transient statuses.
+                retry = Retry(total=settings.PAYMENT_GATEWAY_RETRIES, backoff_factor=0.5,
+                              status_forcelist=RETRY_STATUSES, allowed_methods=None,
+                              raise_on_status=False, respect_retry_after_header=True)
+                adapter = HTTPAdapter(pool_connections=4,
+                                      pool_maxsize=settings.PAYMENT_GATEWAY_POOL_SIZE,
+                                      max_retries=retry)
+                session = requests.Session()
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _sessions.clear()
+                _sessions[pid] = session
+    return session
+
+
+class StripeGateway(BaseGateway):
+    """Stripe PaymentIntents with manual capture."""
+
+    def __init__(self, secret_key=None, api_url=None, timeout=None, session=None):
+        self.secret_key = secret_key or settings.STRIPE_SECRET_KEY
+        self.api_url = (api_url or settings.STRIPE_API_URL).rstrip('/')
+        self.timeout = timeout or (settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT,
+                                   settings.PAYMENT_GATEWAY_READ_TIMEOUT)
+        self.session = session or get_session()
+
+    def _post(self, path, data, key):
+        import requests
+
+        try:
+            response = self.session.post(
+                f"{self.api_url}{path}", data=data, timeout=self.timeout,
+                headers={'Authorization': f"Bearer {self.secret_key}", 'Idempotency-Key': key},
+            )
+        except requests.RequestException as exc:
+            raise GatewayUnavailable(str(exc)) from exc
+
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        if response.status_code in RETRY_STATUSES:
+            raise GatewayUnavailable(f"gateway returned {response.status_code}", body)
+        if response.status_code >= 400:
+            error = body.get('error', {})
+            raise PaymentDeclined(error.get('code') or error.get('message')
+                                  or f"gateway returned {response.status_code}", body)
+        return body
+
+    def authorize(self, payment):
+        return self._post('/v1/payment_intents', {
+            'amount': minor_units(payment.amount),
+            'currency': payment.currency.lower(),
+            'capture_method': 'manual',
+            'metadata[order_number]': payment.order.order_number,
+            'metadata[payment]': str(payment.uuid),
+        }, idempotency_key(payment, 'authorize'))
+
+    def capture(self, payment):
+        return self._post(f"/v1/payment_intents/{payment.transaction_id}/capture", {},
+                          idempotency_key(payment, 'capture'))
+
+    def refund(self, payment, amount=None, sequence=1):
+        data = {'payment_intent': payment.transaction_id}
+        if amount is not None:
+            data['amount'] = minor_units(amount)
+        return self._post('/v1/refunds', data, refund_key(payment, amount, sequence))
+
+
+def get_gateway(backend=None, **kwargs):
+    return import_string(backend or settings.PAYMENT_GATEWAY)(**kwargs)
+
+
+def capture_payment(payment, gateway=None):
+    """Capture an authorized payment and confirm its order.
+
+    Safe to call repeatedly: captured payments are left alone and the
+    gateway deduplicates the request by its idempotency key. Anything else
+    that was never authorized is refused before calling the gateway.
+    """
+    if payment.status == payment.PaymentStatus.CAPTURED:
+        return payment
+    if payment.status != payment.PaymentStatus.AUTHORIZED or not payment.transaction_id:
+        raise GatewayError(f"payment {payment.uuid} is {payment.status}, not authorized")
+    gateway = gateway or get_gateway()
+    try:
+        response = gateway.capture(payment)
+    except PaymentDeclined as exc:
+        payment.mark_as_failed(exc.response)
+        raise
+    payment.mark_as_paid(response.get('id', payment.transaction_id), response)
+    return payment
+
+
+def enqueue_capture(payment):
+    """Capture ``payment`` in a worker once the current transaction commits."""
+    from .tasks import capture_payment as capture_task
+
+    transaction.on_commit(lambda: capture_task.delay(payment.pk))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.payment.archive import archive_responses
+
+
+class Command(BaseCommand):
+    help = 'Move inline Payment.gateway_response payloads to the compressed archive table in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Payments moved per transaction')
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help='Seconds to sleep between batches')
+
+    def handle(self, *args, **options):
+        moved, raw_bytes, stored_bytes = archive_responses(batch_size=options['batch_size'],
+                                                           pause=options['pause'])
+        ratio = stored_bytes / raw_bytes if raw_bytes else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"{moved} payloads archived, {raw_bytes} bytes stored as {stored_bytes} ({ratio:.0%})"
+        ))
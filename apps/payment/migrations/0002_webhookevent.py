@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WebhookEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("gateway", models.CharField(max_length=20, verbose_name="البوابة")),
+                (
+                    "event_id",
+                    models.CharField(max_length=255, verbose_name="معرف الحدث"),
+                ),
+                ("type", models.CharField(max_length=100, verbose_name="النوع")),
+                ("payload", models.JSONField(verbose_name="البيانات")),
+                (
+                    "received_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="تاريخ الاستلام"
+                    ),
+                ),
+                (
+                    "processed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="تاريخ المعالجة"
+                    ),
+                ),
+                ("error", models.TextField(blank=True, verbose_name="الخطأ")),
+            ],
+            options={
+                "verbose_name": "حدث بوابة الدفع",
+                "verbose_name_plural": "أحداث بوابة الدفع",
+                "ordering": ["-received_at"],
+                "indexes": [
+                    models.Index(
+                        condition=models.Q(("processed_at__isnull", True)),
+                        fields=["received_at"],
+                        name="payment_webhook_pending_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="webhookevent",
+            constraint=models.UniqueConstraint(
+                fields=("gateway", "event_id"), name="payment_webhook_event_unique"
+            ),
+        ),
+    ]
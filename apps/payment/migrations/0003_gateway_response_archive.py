@@ -0,0 +1,61 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("payment", "0002_webhookevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PaymentGatewayResponse",
+            fields=[
+                (
+                    "payment",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="archived_response",
+                        serialize=False,
+                        to="payment.payment",
+                        verbose_name="الدفعة",
+                    ),
+                ),
+                ("data", models.BinaryField(verbose_name="البيانات المضغوطة")),
+                ("size", models.PositiveIntegerField(verbose_name="الحجم الأصلي")),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="تاريخ التحديث"),
+                ),
+            ],
+            options={
+                "verbose_name": "رد بوابة الدفع",
+                "verbose_name_plural": "ردود بوابة الدفع",
+            },
+        ),
+        # Same column, new attribute name: Payment.gateway_response is now a
+        # property backed by PaymentGatewayResponse.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RenameField(
+                    model_name="payment",
+                    old_name="gateway_response",
+                    new_name="legacy_gateway_response",
+                ),
+                migrations.AlterField(
+                    model_name="payment",
+                    name="legacy_gateway_response",
+                    field=models.JSONField(
+                        blank=True,
+                        db_column="gateway_response",
+                        editable=False,
+                        null=True,
+                        verbose_name="رد بوابة الدفع (قديم)",
+                    ),
+                ),
+            ],
+        ),
+    ]
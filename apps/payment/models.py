@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils.translation import gettext_lazy as _
 from django.core.validators import MinValueValidator
 from django.utils import timezone
@@ -81,7 +81,11 @@ class Payment(models.Model):
     
     transaction_id = models.CharField(_('رقم المعاملة'), max_length=100, 
                                      blank=True, db_index=True)
-    gateway_response = models.JSONField(_('رد بوابة الدفع'), blank=True, null=True)
+    # Responses are archived compressed in PaymentGatewayResponse; this column
+    # only holds rows not yet moved by ``archive_gateway_responses``.
+    legacy_gateway_response = models.JSONField(_('رد بوابة الدفع (قديم)'), blank=True,
+                                               null=True, editable=False,
+                                               db_column='gateway_response')
     
     authorized_at = models.DateTimeField(_('تاريخ التصريح'), null=True, blank=True)
     captured_at = models.DateTimeField(_('تاريخ التحصيل'), null=True, blank=True)
@@ -101,6 +105,60 @@ class Payment(models.Model):
     def __str__(self):
         return f"دفعة #{self.id} - {self.amount} {self.currency}"
     
+    @property
+    def gateway_response(self):
+        """Last gateway payload, loaded from the archive on first access."""
+        if not hasattr(self, '_gateway_response'):
+            self._gateway_response = self.legacy_gateway_response
+            if self._gateway_response is None and self.pk:
+                from .archive import load_response
+                self._gateway_response = load_response(self)
+        return self._gateway_response
+    
+    @gateway_response.setter
+    def gateway_response(self, value):
+        self._gateway_response = value
+        self._gateway_response_changed = True
+    
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('_gateway_response', None)
+        self._gateway_response_changed = False
+    
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        archive = getattr(self, '_gateway_response_changed', False) and (
+            update_fields is None or 'gateway_response' in update_fields)
+        if update_fields is not None and 'gateway_response' in update_fields:
+            kwargs['update_fields'] = [field for field in update_fields
+                                       if field != 'gateway_response']
+            kwargs['update_fields'].append('legacy_gateway_response')
+        if not archive:
+            return super().save(*args, **kwargs)
+        
+        from .archive import store_response
+        
+        self.legacy_gateway_response = None
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            store_response(self, self._gateway_response)
+        self._gateway_response_changed = False
+    
+    def authorize(self, gateway=None):
+        from .gateways import get_gateway
+        
+        response = (gateway or get_gateway()).authorize(self)
+        self.mark_as_authorized(response.get('id', ''), response)
+        return response
+    
+    def mark_as_authorized(self, transaction_id='', gateway_response=None):
+        self.status = self.PaymentStatus.AUTHORIZED
+        self.transaction_id = transaction_id
+        self.gateway_response = gateway_response or {}
+        self.authorized_at = timezone.now()
+        self.save(update_fields=['status', 'transaction_id', 'gateway_response',
+                                 'authorized_at', 'updated_at'])
+    
     def mark_as_paid(self, transaction_id='', gateway_response=None):
         from apps.orders.models import Order
         
@@ -108,14 +166,66 @@ class Payment(models.Model):
         self.transaction_id = transaction_id
         self.gateway_response = gateway_response or {}
         self.captured_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'transaction_id', 'gateway_response',
+                                 'captured_at', 'updated_at'])
         
         self.order.status = Order.Status.CONFIRMED
         self.order.payment_status = True
-        self.order.save()
+        self.order.save(update_fields=['status', 'payment_status', 'updated_at'])
+    
+    def mark_as_failed(self, gateway_response=None):
+        self.status = self.PaymentStatus.FAILED
+        self.gateway_response = gateway_response or {}
+        self.save(update_fields=['status', 'gateway_response', 'updated_at'])
     
     def can_refund(self):
         return self.status in [
             self.PaymentStatus.CAPTURED,
             self.PaymentStatus.PARTIALLY_REFUNDED
         ]
+
+
+class PaymentGatewayResponse(models.Model):
+    """zlib-compressed gateway payload of a payment, kept off the hot table."""
+    
+    payment = models.OneToOneField(Payment, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='archived_response',
+                                   verbose_name=_('الدفعة'))
+    data = models.BinaryField(_('البيانات المضغوطة'))
+    size = models.PositiveIntegerField(_('الحجم الأصلي'))
+    updated_at = models.DateTimeField(_('تاريخ التحديث'), auto_now=True)
+    
+    class Meta:
+        verbose_name = _('رد بوابة الدفع')
+        verbose_name_plural = _('ردود بوابة الدفع')
+    
+    def __str__(self):
+        return str(self.payment_id)
+
+
+class WebhookEvent(models.Model):
+    """Raw gateway callbacks, stored once per event id and processed in batches."""
+    
+    gateway = models.CharField(_('البوابة'), max_length=20)
+    event_id = models.CharField(_('معرف الحدث'), max_length=255)
+    type = models.CharField(_('النوع'), max_length=100)
+    payload = models.JSONField(_('البيانات'))
+    received_at = models.DateTimeField(_('تاريخ الاستلام'), auto_now_add=True)
+    processed_at = models.DateTimeField(_('تاريخ المعالجة'), null=True, blank=True)
+    error = models.TextField(_('الخطأ'), blank=True)
+    
+    class Meta:
+        verbose_name = _('حدث بوابة الدفع')
+        verbose_name_plural = _('أحداث بوابة الدفع')
+        ordering = ['-received_at']
+        constraints = [
+            models.UniqueConstraint(fields=['gateway', 'event_id'],
+                                    name='payment_webhook_event_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['received_at'], name='payment_webhook_pending_idx',
+                         condition=models.Q(processed_at__isnull=True)),
+        ]
+    
+    def __str__(self):
+        return f"{self.gateway}:{self.event_id}"
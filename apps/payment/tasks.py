@@ -0,0 +1,19 @@
+from celery import shared_task
+
+from . import gateways, webhooks
+from .models import Payment
+
+
+@shared_task(ignore_result=True, autoretry_for=(gateways.GatewayUnavailable,),
+             retry_backoff=True, max_retries=5)
+def capture_payment(payment_id):
+    payment = Payment.objects.select_related('order').get(pk=payment_id)
+    try:
+        gateways.capture_payment(payment)
+    except gateways.PaymentDeclined:
+        pass  # recorded on the payment; nothing to retry
+
+
+@shared_task(ignore_result=True)
+def process_webhook_events():
+    webhooks.process_pending()
@@ -1,3 +1,194 @@
-from django.test import TestCase
+import hashlib
+import hmac
+import json
+import time
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from apps.orders.models import Order
+from . import archive, gateways, webhooks
+from .models import Payment, PaymentGatewayResponse, PaymentMethod, WebhookEvent
+
+
+class PaymentTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.payment_method = PaymentMethod.objects.create(
+            name='بطاقة', code='card', type=PaymentMethod.PaymentType.CREDIT_CARD,
+            requires_online_payment=True,
+        )
+
+    def setUp(self):
+        gateways.FakeGateway.reset()
+        self.order = Order.objects.create(
+            customer_name='عميل', customer_email='customer@example.com',
+            customer_phone='+966500000000', shipping_city='الرياض',
+            shipping_address='شارع 1', payment_method=self.payment_method, total=150,
+        )
+        self.payment = Payment.objects.create(order=self.order, payment_method=self.payment_method,
+                                              amount='150.00')
+
+
+class GatewayTests(PaymentTestCase):
+    def test_capture_is_idempotent_per_payment(self):
+        gateway = gateways.FakeGateway()
+        first = gateway.capture(self.payment)
+        self.assertIs(gateway.capture(self.payment), first)
+        self.assertEqual(first['amount'], 15000)
+        self.assertEqual(gateways.FakeGateway.calls,
+                         [f"{self.payment.uuid}:capture", f"{self.payment.uuid}:capture"])
+
+    def test_capture_task_confirms_order(self):
+        self.payment.authorize()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.AUTHORIZED)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            gateways.enqueue_capture(self.payment)
+
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.CAPTURED)
+        self.assertIsNotNone(self.payment.captured_at)
+        self.assertEqual(self.order.status, Order.Status.CONFIRMED)
+        self.assertTrue(self.order.payment_status)
+
+    def test_declined_capture_marks_payment_failed(self):
+        self.payment.authorize()
+        with self.assertRaises(gateways.PaymentDeclined):
+            gateways.capture_payment(self.payment, gateways.FakeGateway(decline=True))
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.FAILED)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.payment_status)
+
+    def test_only_authorized_payments_are_captured(self):
+        gateway = gateways.FakeGateway()
+        for status in (Payment.PaymentStatus.PENDING, Payment.PaymentStatus.FAILED):
+            with self.subTest(status=status):
+                self.payment.status = status
+                with self.assertRaises(gateways.GatewayError):
+                    gateways.capture_payment(self.payment, gateway)
+        self.assertEqual(gateways.FakeGateway.calls, [])
+
+    def test_partial_refunds_use_distinct_keys(self):
+        gateway = gateways.FakeGateway()
+        first = gateway.refund(self.payment, '50.00', sequence=1)
+        second = gateway.refund(self.payment, '50.00', sequence=2)
+        self.assertIsNot(first, second)
+        # A retry of the first refund is deduplicated
+        self.assertIs(gateway.refund(self.payment, '50.00', sequence=1), first)
+        self.assertEqual(gateways.FakeGateway.calls[:2], [f"{self.payment.uuid}:refund:1:5000",
+                                                          f"{self.payment.uuid}:refund:2:5000"])
+
+    def test_mark_as_paid_only_writes_payment_state(self):
+        stale = Order.objects.get(pk=self.order.pk)
+        Order.objects.filter(pk=self.order.pk).update(notes='اتصل قبل التوصيل')
+        self.payment.order = stale
+        self.payment.mark_as_paid('pi_1', {'id': 'pi_1'})
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.notes, 'اتصل قبل التوصيل')
+        self.assertEqual(self.order.status, Order.Status.CONFIRMED)
+
+    def test_stripe_requests_use_timeouts_and_idempotency_keys(self):
+        session = mock.Mock()
+        session.post.return_value = mock.Mock(status_code=200, json=lambda: {'id': 'pi_1'})
+        gateway = gateways.StripeGateway(secret_key='sk_test', session=session)
+
+        gateway.authorize(self.payment)
+
+        _, kwargs = session.post.call_args
+        self.assertEqual(kwargs['headers']['Idempotency-Key'], f"{self.payment.uuid}:authorize")
+        self.assertEqual(kwargs['data']['amount'], 15000)
+        self.assertIsInstance(kwargs['timeout'], tuple)
+
+        session.post.return_value = mock.Mock(status_code=503, json=lambda: {})
+        with self.assertRaises(gateways.GatewayUnavailable):
+            gateway.capture(self.payment)
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+class WebhookTests(PaymentTestCase):
+    def post_event(self, event, secret='whsec_test'):
+        body = json.dumps(event).encode()
+        timestamp = str(int(time.time()))
+        signature = hmac.new(secret.encode(), timestamp.encode() + b'.' + body,
+                             hashlib.sha256).hexdigest()
+        return self.client.post(reverse('payment:stripe_webhook'), body,
+                                content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}")
+
+    def event(self, event_id, type, created, **obj):
+        obj.setdefault('id', 'pi_1')
+        obj.setdefault('metadata', {'payment': str(self.payment.uuid)})
+        return {'id': event_id, 'type': type, 'created': created, 'data': {'object': obj}}
+
+    def test_rejects_bad_signature(self):
+        response = self.post_event(self.event('evt_1', 'payment_intent.succeeded', 1),
+                                   secret='wrong')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_replays_are_stored_once(self):
+        event = self.event('evt_1', 'payment_intent.succeeded', 1)
+        with mock.patch('apps.payment.webhooks.schedule_processing'):
+            for _ in range(3):
+                self.assertEqual(self.post_event(event).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.count(), 1)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.PENDING)
+
+    def test_batch_applies_latest_state_per_payment(self):
+        with mock.patch('apps.payment.webhooks.schedule_processing'):
+            # Delivered out of order: the capture arrives before the authorization.
+            self.post_event(self.event('evt_2', 'payment_intent.succeeded', 2))
+            self.post_event(self.event('evt_1', 'payment_intent.amount_capturable_updated', 1))
+            self.post_event(self.event('evt_3', 'payment_intent.succeeded', 3, id='pi_unknown',
+                                       metadata={}))
+
+        self.assertEqual(webhooks.process_pending(), 3)
+
+        self.payment.refresh_from_db()
+        self.order.refresh_from_db()
+        self.assertEqual(self.payment.status, Payment.PaymentStatus.CAPTURED)
+        self.assertEqual(self.payment.transaction_id, 'pi_1')
+        self.assertTrue(self.order.payment_status)
+        self.assertFalse(WebhookEvent.objects.filter(processed_at__isnull=True).exists())
+        self.assertEqual(WebhookEvent.objects.get(event_id='evt_3').error, 'unknown payment')
+
+
+class GatewayResponseArchiveTests(PaymentTestCase):
+    response = {'id': 'pi_1', 'charges': [{'id': f"ch_{i}", 'outcome': 'authorized'}
+                                          for i in range(20)]}
+
+    def test_response_is_stored_compressed_and_loaded_lazily(self):
+        self.payment.mark_as_paid('pi_1', self.response)
+
+        archived = PaymentGatewayResponse.objects.get(payment=self.payment)
+        self.assertLess(len(archived.data), archived.size)
+        self.assertIsNone(Payment.objects.values_list('legacy_gateway_response', flat=True)
+                          .get(pk=self.payment.pk))
+
+        with self.assertNumQueries(1):
+            payment = Payment.objects.get(pk=self.payment.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(payment.gateway_response, self.response)
+            self.assertEqual(payment.gateway_response, self.response)
+
+    def test_command_moves_inline_payloads(self):
+        Payment.objects.filter(pk=self.payment.pk).update(legacy_gateway_response=self.response)
+        payment = Payment.objects.get(pk=self.payment.pk)
+        self.assertEqual(payment.gateway_response, self.response)
+
+        output = StringIO()
+        call_command('archive_gateway_responses', batch_size=1, stdout=output)
+        self.assertIn('1 payloads archived', output.getvalue())
+
+        payment = Payment.objects.get(pk=self.payment.pk)
+        self.assertIsNone(payment.legacy_gateway_response)
+        self.assertEqual(payment.gateway_response, self.response)
+        self.assertEqual(archive.archive_responses(), (0, 0, 0))
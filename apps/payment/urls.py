@@ -0,0 +1,9 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'payment'
+
+urlpatterns = [
+    path('webhooks/stripe/', views.stripe_webhook, name='stripe_webhook'),
+]
@@ -1,3 +1,23 @@
-from django.shortcuts import render
+import json
 
-# Create your views here.
+from django.http import HttpResponseBadRequest, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from . import webhooks
+
+
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """Verify and store a Stripe event; processing happens in a worker."""
+    try:
+        webhooks.verify_stripe_signature(request.body, request.headers.get('Stripe-Signature', ''))
+        event = json.loads(request.body)
+    except (webhooks.InvalidSignature, ValueError):
+        return HttpResponseBadRequest()
+    if not isinstance(event, dict) or 'id' not in event:
+        return HttpResponseBadRequest()
+
+    webhooks.ingest(webhooks.STRIPE, [event])
+    return JsonResponse({'received': True})
@@ -0,0 +1,176 @@
+"""
+Payment gateway webhook intake.
+
+The endpoint only verifies the signature and inserts the raw event into
+``WebhookEvent``; the unique ``(gateway, event_id)`` constraint turns the
+gateway's retries and replays into no-op inserts. ``process_pending`` then
+applies events to payments in batches from a Celery worker, collapsing
+bursts for the same payment into a single state change.
+"""
+
+import hashlib
+import hmac
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Payment, WebhookEvent
+
+STRIPE = 'stripe'
+
+PROCESS_SCHEDULED_KEY = 'payment:webhooks:process-scheduled'
+
+Status = Payment.PaymentStatus
+
+# Stripe event type -> payment status
+STRIPE_EVENT_STATUSES = {
+    'payment_intent.amount_capturable_updated': Status.AUTHORIZED,
+    'payment_intent.succeeded': Status.CAPTURED,
+    'payment_intent.payment_failed': Status.FAILED,
+    'payment_intent.canceled': Status.CANCELLED,
+    'charge.refunded': Status.REFUNDED,
+}
+
+# Late or out-of-order events never move a payment backwards.
+STATUS_RANK = {
+    Status.PENDING: 0,
+    Status.PROCESSING: 1,
+    # Not final: the customer can retry with another card.
+    Status.FAILED: 1,
+    Status.AUTHORIZED: 2,
+    Status.CANCELLED: 3,
+    Status.CAPTURED: 4,
+    Status.PARTIALLY_REFUNDED: 5,
+    Status.REFUNDED: 6,
+}
+
+
+class InvalidSignature(Exception):
+    pass
+
+
+def verify_stripe_signature(payload, header, secret=None, tolerance=None, now=None):
+    """Check a ``Stripe-Signature`` header against the raw request body."""
+    secret = secret or settings.STRIPE_WEBHOOK_SECRET
+    tolerance = settings.PAYMENT_WEBHOOK_TOLERANCE if tolerance is None else tolerance
+    if not secret:
+        raise InvalidSignature('webhook secret is not configured')
+
+    parts = [item.split('=', 1) for item in header.split(',') if '=' in item]
+    timestamps = [value for key, value in parts if key == 't']
+    signatures = [value for key, value in parts if key == 'v1']
+    if not timestamps or not timestamps[0].isdigit() or not signatures:
+        raise InvalidSignature('malformed signature header')
+
+    signed = timestamps[0].encode() + b'.' + payload
+    expected = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise InvalidSignature('signature mismatch')
+    if abs((now or time.time()) - int(timestamps[0])) > tolerance:
+        raise InvalidSignature('timestamp outside tolerance')
+
+
+def ingest(gateway, events):
+    """Store raw events, ignoring ones already received; one insert per call."""
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(gateway=gateway, event_id=event['id'], type=event.get('type', ''),
+                     payload=event)
+        for event in events
+    ], ignore_conflicts=True)
+    transaction.on_commit(schedule_processing)
+
+
+def schedule_processing():
+    """Queue one processing run per ``PAYMENT_WEBHOOK_DELAY`` however many events arrive."""
+    from .tasks import process_webhook_events
+
+    delay = settings.PAYMENT_WEBHOOK_DELAY
+    if cache.add(PROCESS_SCHEDULED_KEY, 1, timeout=delay):
+        process_webhook_events.apply_async(countdown=delay)
+
+
+def _stripe_change(event):
+    """``(payment reference, status, object)`` for a Stripe event, or ``None``."""
+    status = STRIPE_EVENT_STATUSES.get(event.get('type'))
+    if status is None:
+        return None
+    obj = event.get('data', {}).get('object', {})
+    if event['type'].startswith('charge.'):
+        if not obj.get('refunded'):
+            status = Status.PARTIALLY_REFUNDED
+        return obj.get('payment_intent'), status, obj
+    return obj.get('id'), status, obj
+
+
+def _apply(events):
+    """Apply a batch of events; returns ``{event pk: error}`` for unmatched ones."""
+    changes = {}
+    errors = {}
+    for event in sorted(events, key=lambda event: (event.payload.get('created', 0), event.pk)):
+        change = _stripe_change(event.payload) if event.gateway == STRIPE else None
+        if change is None:
+            continue
+        reference, status, obj = change
+        if not reference:
+            errors[event.pk] = 'missing payment reference'
+            continue
+        current = changes.setdefault(reference, {'status': None, 'event_ids': []})
+        current['event_ids'].append(event.pk)
+        if current['status'] is None or STATUS_RANK[status] >= STATUS_RANK[current['status']]:
+            current.update(status=status, object=obj,
+                           uuid=(obj.get('metadata') or {}).get('payment'))
+
+    if not changes:
+        return errors
+    uuids = [change['uuid'] for change in changes.values() if change['uuid']]
+    payments = (Payment.objects.select_related('order')
+                .filter(Q(transaction_id__in=changes) | Q(uuid__in=uuids)))
+    by_reference = {}
+    for payment in payments:
+        by_reference[payment.transaction_id] = payment
+        by_reference[str(payment.uuid)] = payment
+
+    for reference, change in changes.items():
+        payment = by_reference.get(reference) or by_reference.get(change['uuid'])
+        if payment is None:
+            errors.update({pk: 'unknown payment' for pk in change['event_ids']})
+        elif STATUS_RANK[change['status']] > STATUS_RANK[payment.status]:
+            _set_status(payment, change['status'], reference, change['object'])
+    return errors
+
+
+def _set_status(payment, status, transaction_id, response):
+    if status == Status.CAPTURED:
+        payment.mark_as_paid(transaction_id, response)
+    elif status == Status.AUTHORIZED:
+        payment.mark_as_authorized(transaction_id, response)
+    elif status == Status.FAILED:
+        payment.mark_as_failed(response)
+    else:
+        payment.status = status
+        payment.gateway_response = response
+        payment.save(update_fields=['status', 'gateway_response', 'updated_at'])
+
+
+def process_pending(batch_size=None):
+    """Apply unprocessed webhook events in batches; returns the number handled."""
+    batch_size = batch_size or settings.PAYMENT_WEBHOOK_BATCH_SIZE
+    cache.delete(PROCESS_SCHEDULED_KEY)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            events = list(WebhookEvent.objects.filter(processed_at__isnull=True)
+                          .select_for_update(skip_locked=True)
+                          .order_by('received_at', 'pk')[:batch_size])
+            if not events:
+                return processed
+            errors = _apply(events)
+            WebhookEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                processed_at=timezone.now())
+            for pk, error in errors.items():
+                WebhookEvent.objects.filter(pk=pk).update(error=error)
+        processed += len(events)
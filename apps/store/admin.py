@@ -46,7 +46,7 @@ class ProductAdmin(admin.ModelAdmin):
     search_fields = ['name', 'sku', 'barcode', 'description']
     prepopulated_fields = {'slug': ('name',)}
     list_editable = ['price', 'quantity', 'is_active']
-    readonly_fields = ['uuid', 'views', 'sales_count', 'created_at', 'updated_at']
+    readonly_fields = ['uuid', 'views', 'sales_count', 'rank_score', 'created_at', 'updated_at']
     filter_horizontal = ['categories']
     
     fieldsets = (
@@ -78,7 +78,8 @@ class ProductAdmin(admin.ModelAdmin):
                       'is_new', 'ordering')
         }),
         ('إحصائيات', {
-            'fields': ('views', 'sales_count', 'wishlist_count', 'created_at', 'updated_at'),
+            'fields': ('views', 'sales_count', 'wishlist_count', 'rank_score',
+                       'created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
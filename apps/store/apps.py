@@ -5,3 +5,6 @@ class StoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.store'
     verbose_name = 'إدارة المتجر'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,331 @@
+"""
+Sitemaps and shopping feeds for the whole catalog.
+
+Published products are split into shards by primary-key range
+(``SITEMAP_SHARD_SIZE`` ids each, within the sitemap protocol's 50,000 URL
+limit). Each shard is read once with ``.values().iterator()`` and written
+straight to three gzip files: a sitemap, a Google Shopping XML part and a
+CSV part. ``generate_feeds`` compares every shard's row count and latest
+``updated_at`` with the manifest of the previous run and only rewrites the
+shards that changed.
+
+The full feeds are assembled by concatenating a header member, the shard
+parts and a footer member: a gzip file may hold several members, so parts
+are copied as bytes without recompressing. Memory use is bounded by one
+fetch chunk whatever the catalog size.
+
+Files are written to ``FEED_ROOT`` (served under ``FEED_URL``); the sitemap
+index is also served at ``/sitemap.xml``.
+"""
+
+import csv
+import gzip
+import json
+import os
+import shutil
+import time
+from datetime import timezone
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.db.models import Count, ExpressionWrapper, F, IntegerField, Max, OuterRef, Subquery
+from django.urls import reverse
+
+from .models import Category, Product, ProductImage
+
+MANIFEST = 'manifest.json'
+SITEMAP_INDEX = 'sitemap.xml'
+PAGES_SITEMAP = 'sitemap-pages.xml.gz'
+PRODUCT_FEED_XML = 'products.xml.gz'
+PRODUCT_FEED_CSV = 'products.csv.gz'
+PARTS_DIR = 'parts'
+FETCH_CHUNK_SIZE = 2000
+# Nearly the size of level 9 in a fraction of the time
+COMPRESS_LEVEL = 6
+
+SITEMAP_NS = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+URLSET_OPEN = f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">\n'
+CSV_COLUMNS = ['id', 'title', 'description', 'link', 'image_link', 'availability',
+               'price', 'sale_price', 'brand', 'gtin', 'condition']
+AVAILABILITY = {'in_stock': 'in_stock', 'low_stock': 'in_stock', 'out_of_stock': 'out_of_stock'}
+
+PRODUCT_FIELDS = ['pk', 'slug', 'sku', 'barcode', 'name', 'meta_title', 'short_description',
+                  'meta_description', 'price', 'compare_price', 'tax_rate', 'stock_status',
+                  'updated_at', 'brand_name', 'image']
+
+
+class FeedStats:
+    def __init__(self):
+        self.shards = 0
+        self.written = 0
+        self.removed = 0
+        self.products = 0
+        self.pages_written = False
+        self.elapsed = 0.0
+
+    def as_dict(self):
+        return dict(vars(self), elapsed=round(self.elapsed, 3))
+
+
+def base_url():
+    return f"{settings.SITE_SCHEME}://{settings.SITE_DOMAIN}"
+
+
+def _path(*parts):
+    return os.path.join(settings.FEED_ROOT, *parts)
+
+
+def _shard_files(shard):
+    return {
+        'sitemap': f'sitemap-products-{shard}.xml.gz',
+        'xml': os.path.join(PARTS_DIR, f'products-{shard}.xml.gz'),
+        'csv': os.path.join(PARTS_DIR, f'products-{shard}.csv.gz'),
+    }
+
+
+def _url_builder(viewname):
+    """Fast ``reverse`` for slug URLs: reverse once, then fill in each slug."""
+    marker = 'SLUG-PLACEHOLDER'
+    prefix, suffix = reverse(viewname, kwargs={'slug': marker}).split(marker)
+    root = base_url() + prefix
+    return lambda slug: f"{root}{quote(slug)}{suffix}"
+
+
+def _lastmod(value):
+    # W3C datetime; microseconds also make it precise enough for change detection
+    return value.astimezone(timezone.utc).isoformat() if value else ''
+
+
+def _replace(target, write):
+    """Write ``target`` through a temporary file so readers never see a partial file."""
+    tmp = f'{target}.tmp'
+    write(tmp)
+    os.replace(tmp, target)
+
+
+def _open_gzip(path):
+    return gzip.open(path, 'wt', encoding='utf-8', newline='', compresslevel=COMPRESS_LEVEL)
+
+
+def published_products():
+    return Product.objects.published()
+
+
+# Change detection
+
+def shard_signatures(shard_size=None):
+    """``{shard: [count, latest updated_at]}`` of published products, one query."""
+    shard_size = shard_size or settings.SITEMAP_SHARD_SIZE
+    rows = (published_products()
+            .annotate(shard=ExpressionWrapper(F('pk') / shard_size, output_field=IntegerField()))
+            .order_by().values('shard')
+            .annotate(count=Count('pk'), last=Max('updated_at'))
+            .values_list('shard', 'count', 'last'))
+    return {str(shard): [count, _lastmod(last)] for shard, count, last in rows}
+
+
+def pages_signature():
+    categories = Category.objects.filter(is_active=True).aggregate(
+        count=Count('pk'), last=Max('updated_at'))
+    return [categories['count'], _lastmod(categories['last'])]
+
+
+def _read_manifest():
+    try:
+        with open(_path(MANIFEST)) as manifest:
+            return json.load(manifest)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest):
+    def write(tmp):
+        with open(tmp, 'w') as out:
+            json.dump(manifest, out, sort_keys=True)
+
+    _replace(_path(MANIFEST), write)
+
+
+# Writers
+
+def _product_rows(shard, shard_size):
+    image = (ProductImage.objects.filter(product=OuterRef('pk'))
+             .order_by('-is_primary', 'ordering').values('image')[:1])
+    return (published_products()
+            .filter(pk__gte=shard * shard_size, pk__lt=(shard + 1) * shard_size)
+            .annotate(brand_name=F('brand__name'), image=Subquery(image))
+            .order_by('pk').values(*PRODUCT_FIELDS)
+            .iterator(chunk_size=FETCH_CHUNK_SIZE))
+
+
+def _feed_item(row, product_url, engine):
+    price = engine.price_with_tax(row['price'], row['tax_rate'])
+    compare = row['compare_price']
+    on_sale = compare is not None and compare > row['price']
+    regular = engine.price_with_tax(compare, row['tax_rate']) if on_sale else price
+    currency = settings.DEFAULT_CURRENCY
+    return {
+        'id': row['sku'],
+        'title': row['meta_title'] or row['name'],
+        'description': row['meta_description'] or row['short_description'],
+        'link': product_url(row['slug']),
+        'image_link': (f"{base_url()}{settings.MEDIA_URL}{quote(row['image'])}"
+                       if row['image'] else ''),
+        'availability': AVAILABILITY.get(row['stock_status'], 'in_stock'),
+        'price': f"{regular:.2f} {currency}",
+        'sale_price': f"{price:.2f} {currency}" if on_sale else '',
+        'brand': row['brand_name'] or '',
+        'gtin': row['barcode'],
+        'condition': 'new',
+    }
+
+
+def _xml_item(item):
+    fields = ''.join(
+        f"<{tag}>{escape(item[key])}</{tag}>"
+        for key, tag in [('id', 'g:id'), ('title', 'title'), ('description', 'description'),
+                         ('link', 'link'), ('image_link', 'g:image_link'),
+                         ('availability', 'g:availability'), ('price', 'g:price'),
+                         ('sale_price', 'g:sale_price'), ('brand', 'g:brand'),
+                         ('gtin', 'g:gtin'), ('condition', 'g:condition')]
+        if item[key]
+    )
+    return f"<item>{fields}</item>\n"
+
+
+def write_shard(shard, shard_size=None):
+    """Write one shard's sitemap and feed parts; returns the number of products."""
+    from apps.core.pricing import get_engine
+
+    shard_size = shard_size or settings.SITEMAP_SHARD_SIZE
+    files = {kind: _path(name) for kind, name in _shard_files(shard).items()}
+    tmp = {kind: f'{path}.tmp' for kind, path in files.items()}
+    product_url = _url_builder('store:product_detail')
+    engine = get_engine()
+    count = 0
+    with _open_gzip(tmp['sitemap']) as sitemap, _open_gzip(tmp['xml']) as feed, \
+            _open_gzip(tmp['csv']) as table:
+        sitemap.write(URLSET_OPEN)
+        writer = csv.DictWriter(table, CSV_COLUMNS)
+        for row in _product_rows(shard, shard_size):
+            item = _feed_item(row, product_url, engine)
+            sitemap.write(f"<url><loc>{escape(item['link'])}</loc>"
+                          f"<lastmod>{_lastmod(row['updated_at'])}</lastmod></url>\n")
+            feed.write(_xml_item(item))
+            writer.writerow(item)
+            count += 1
+        sitemap.write('</urlset>\n')
+    for kind, path in files.items():
+        os.replace(tmp[kind], path)
+    return count
+
+
+def remove_shard(shard):
+    for name in _shard_files(shard).values():
+        try:
+            os.remove(_path(name))
+        except FileNotFoundError:
+            pass
+
+
+def write_pages():
+    """Sitemap of the home page and category listings."""
+    root = base_url()
+    listing = root + reverse('store:product_list')
+    categories = (Category.objects.filter(is_active=True).order_by('pk')
+                  .values_list('slug', 'updated_at').iterator(chunk_size=FETCH_CHUNK_SIZE))
+
+    def write(tmp):
+        with _open_gzip(tmp) as sitemap:
+            sitemap.write(URLSET_OPEN)
+            sitemap.write(f"<url><loc>{escape(root + reverse('home'))}</loc></url>\n")
+            for slug, updated_at in categories:
+                sitemap.write(f"<url><loc>{escape(f'{listing}?category={quote(slug)}')}</loc>"
+                              f"<lastmod>{_lastmod(updated_at)}</lastmod></url>\n")
+            sitemap.write('</urlset>\n')
+
+    _replace(_path(PAGES_SITEMAP), write)
+
+
+def _assemble(target, header, shards, kind, footer=b''):
+    """Concatenate gzip members into ``target`` without recompressing the parts."""
+    def write(tmp):
+        with open(tmp, 'wb') as out:
+            out.write(gzip.compress(header))
+            for shard in shards:
+                with open(_path(_shard_files(shard)[kind]), 'rb') as part:
+                    shutil.copyfileobj(part, out)
+            if footer:
+                out.write(gzip.compress(footer))
+
+    _replace(_path(target), write)
+
+
+def write_feeds(shards):
+    channel = (f'<?xml version="1.0" encoding="UTF-8"?>\n'
+               f'<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0"><channel>\n'
+               f'<title>{escape(settings.SITE_NAME)}</title><link>{escape(base_url())}</link>\n'
+               f'<description>{escape(settings.SITE_NAME)}</description>\n')
+    _assemble(PRODUCT_FEED_XML, channel.encode(), shards, 'xml', b'</channel></rss>\n')
+    _assemble(PRODUCT_FEED_CSV, (','.join(CSV_COLUMNS) + '\r\n').encode(), shards, 'csv')
+
+
+def write_index(signatures, pages_lastmod):
+    root = f"{base_url()}{settings.FEED_URL}"
+    entries = [(PAGES_SITEMAP, pages_lastmod)] + [
+        (_shard_files(shard)['sitemap'], signatures[str(shard)][1])
+        for shard in sorted(int(shard) for shard in signatures)
+    ]
+
+    def write(tmp):
+        with open(tmp, 'w', encoding='utf-8') as index:
+            index.write(f'<?xml version="1.0" encoding="UTF-8"?>\n'
+                        f'<sitemapindex xmlns="{SITEMAP_NS}">\n')
+            for name, lastmod in entries:
+                index.write(f"<sitemap><loc>{escape(root + name)}</loc>"
+                            + (f"<lastmod>{lastmod}</lastmod>" if lastmod else '')
+                            + "</sitemap>\n")
+            index.write('</sitemapindex>\n')
+
+    _replace(_path(SITEMAP_INDEX), write)
+
+
+def generate_feeds(full=False):
+    """Rewrite changed shards, then the feeds and sitemap index; returns ``FeedStats``."""
+    started = time.perf_counter()
+    stats = FeedStats()
+    os.makedirs(_path(PARTS_DIR), exist_ok=True)
+
+    shard_size = settings.SITEMAP_SHARD_SIZE
+    previous = _read_manifest()
+    # Shard boundaries and URLs change with these; start over if they did.
+    layout = {'shard_size': shard_size, 'base_url': base_url(), 'feed_url': settings.FEED_URL}
+    if full or previous.get('layout') != layout:
+        previous = {}
+    old_shards = previous.get('products', {})
+    signatures = shard_signatures(shard_size)
+    stats.shards = len(signatures)
+
+    for shard, signature in signatures.items():
+        if old_shards.get(shard) != signature:
+            stats.products += write_shard(int(shard), shard_size)
+            stats.written += 1
+    for shard in set(old_shards) - set(signatures):
+        remove_shard(int(shard))
+        stats.removed += 1
+
+    pages = pages_signature()
+    if previous.get('pages') != pages:
+        write_pages()
+        stats.pages_written = True
+
+    if stats.written or stats.removed or not os.path.exists(_path(PRODUCT_FEED_XML)):
+        write_feeds(sorted(int(shard) for shard in signatures))
+    if stats.written or stats.removed or stats.pages_written \
+            or not os.path.exists(_path(SITEMAP_INDEX)):
+        write_index(signatures, pages[1])
+
+    _write_manifest({'layout': layout, 'products': signatures, 'pages': pages})
+    stats.elapsed = time.perf_counter() - started
+    return stats
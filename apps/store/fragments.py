@@ -0,0 +1,206 @@
+"""
+Storefront fragment cache.
+
+A fragment's cache key is built from its name, the ids and ``updated_at`` of
+the model instances it renders, and version counters kept in the cache:
+
+- every instance has a version, bumped by the signals in
+  ``apps.store.signals`` when it (or something it shows, e.g. a product's
+  images or categories) changes or is deleted;
+- every model has a table version, bumped on any change to one of its rows,
+  for fragments that list a whole table (the category menu);
+- every model has a generation included in all its instance keys, bumped by
+  ``invalidate_model`` after ``QuerySet.update()`` calls that bypass signals.
+
+Stale entries are never deleted, they just stop being addressed and expire
+after ``FRAGMENT_CACHE_TIMEOUT``. Hits and misses per fragment name are
+counted in-process and added to cache counters every
+``FRAGMENT_STATS_FLUSH_EVERY`` lookups; ``fragment_stats`` reports them.
+"""
+
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Model, QuerySet
+from django.utils import translation
+
+KEY_PREFIX = 'fragment'
+STATS_NAMES_KEY = f'{KEY_PREFIX}:stats:names'
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def instance_version_key(model, pk):
+    return f"{KEY_PREFIX}:version:{_label(model)}:{pk}"
+
+
+def table_version_key(model):
+    return f"{KEY_PREFIX}:version:{_label(model)}"
+
+
+def generation_key(model):
+    return f"{KEY_PREFIX}:generation:{_label(model)}"
+
+
+def _resolve_model(value):
+    if isinstance(value, type) and issubclass(value, Model):
+        return value
+    if isinstance(value, str) and value.count('.') == 1:
+        try:
+            return apps.get_model(value)
+        except (LookupError, ValueError):
+            return None
+    return None
+
+
+def _flatten(values):
+    for value in values:
+        if isinstance(value, (list, tuple, set, QuerySet)):
+            yield from _flatten(value)
+        else:
+            yield value
+
+
+def _versions(keys):
+    """Current value of every version key, starting missing ones from the clock.
+
+    Starting from a timestamp rather than 0 keeps an evicted counter from
+    coming back at a value that already addressed an older fragment.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns() // 1000, timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def fragment_key(name, *dependencies):
+    """Cache key for fragment ``name`` rendered from ``dependencies``.
+
+    Model instances add their id, ``updated_at`` and version; models (or
+    ``'app_label.model'`` labels) add their table version; anything else is
+    a plain vary-on value.
+    """
+    parts = []
+    version_keys = []
+    for value in _flatten(dependencies):
+        model = _resolve_model(value)
+        if isinstance(value, Model):
+            updated_at = getattr(value, 'updated_at', None)
+            stamp = updated_at.timestamp() if updated_at else ''
+            parts.append(f"{_label(value)}:{value.pk}:{stamp}")
+            version_keys += [instance_version_key(value, value.pk), generation_key(value)]
+        elif model is not None:
+            version_keys.append(table_version_key(model))
+        else:
+            parts.append(repr(value))
+    versions = _versions(version_keys)
+    parts += [f"{key}={versions[key]}" for key in version_keys]
+    parts.append(translation.get_language() or '')
+    digest = hashlib.md5('|'.join(parts).encode(), usedforsecurity=False).hexdigest()
+    return f"{KEY_PREFIX}:{name}:{digest}"
+
+
+def cached_fragment(name, dependencies, render, timeout=None):
+    """Return the cached fragment or call ``render()`` and cache its result."""
+    key = fragment_key(name, *dependencies)
+    content = cache.get(key)
+    record(name, hit=content is not None)
+    if content is None:
+        content = render()
+        cache.set(key, content,
+                  settings.FRAGMENT_CACHE_TIMEOUT if timeout is None else timeout)
+    return content
+
+
+# Invalidation
+
+def _bump(key, delta=1):
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Nothing was keyed on it yet.
+        pass
+
+
+def _bump_on_commit(keys):
+    # Versions move once the change commits, so a concurrent render can't
+    # store the old content under the new key.
+    transaction.on_commit(lambda: [_bump(key) for key in keys])
+
+
+def invalidate(instance):
+    """Drop fragments of ``instance`` and listings of its model."""
+    _bump_on_commit([instance_version_key(instance, instance.pk),
+                     table_version_key(type(instance))])
+
+
+def invalidate_model(model):
+    """Drop every fragment of ``model``, e.g. after a bulk ``update()``."""
+    model = _resolve_model(model)
+    _bump_on_commit([generation_key(model), table_version_key(model)])
+
+
+# Metrics
+
+class _Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.names = set()
+
+    def record(self, name, hit):
+        with self.lock:
+            self.pending[name, 'hits' if hit else 'misses'] += 1
+            flush = sum(self.pending.values()) >= settings.FRAGMENT_STATS_FLUSH_EVERY
+        if flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+        names = {name for name, _ in pending} - self.names
+        if names:
+            cache.set(STATS_NAMES_KEY, sorted(set(cache.get(STATS_NAMES_KEY, [])) | names),
+                      timeout=None)
+            self.names |= names
+        for (name, kind), count in pending.items():
+            key = f"{KEY_PREFIX}:stats:{name}:{kind}"
+            if not cache.add(key, count, timeout=None):
+                _bump(key, count)
+
+
+_stats = _Stats()
+record = _stats.record
+flush_stats = _stats.flush
+
+
+def fragment_stats():
+    """``{name: {'hits', 'misses', 'hit_ratio'}}`` across all processes (flushed counts)."""
+    names = cache.get(STATS_NAMES_KEY, [])
+    keys = [f"{KEY_PREFIX}:stats:{name}:{kind}" for name in names for kind in ('hits', 'misses')]
+    counts = cache.get_many(keys)
+    stats = {}
+    for name in names:
+        hits = counts.get(f"{KEY_PREFIX}:stats:{name}:hits", 0)
+        misses = counts.get(f"{KEY_PREFIX}:stats:{name}:misses", 0)
+        total = hits + misses
+        stats[name] = {'hits': hits, 'misses': misses,
+                       'hit_ratio': round(hits / total, 4) if total else None}
+    return stats
+
+
+def reset_stats():
+    names = cache.get(STATS_NAMES_KEY, [])
+    cache.delete_many([f"{KEY_PREFIX}:stats:{name}:{kind}"
+                       for name in names for kind in ('hits', 'misses')] + [STATS_NAMES_KEY])
+    _stats.names.clear()
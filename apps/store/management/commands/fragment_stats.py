@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from apps.store import fragments
+
+
+class Command(BaseCommand):
+    help = 'Show fragment cache hits, misses and hit ratio per fragment'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Clear the counters afterwards')
+
+    def handle(self, *args, **options):
+        stats = fragments.fragment_stats()
+        if not stats:
+            self.stdout.write('No fragment lookups recorded yet')
+        for name, row in sorted(stats.items()):
+            ratio = '-' if row['hit_ratio'] is None else f"{row['hit_ratio']:.1%}"
+            self.stdout.write(f"{name}: {row['hits']} hits, {row['misses']} misses, {ratio}")
+        if options['reset']:
+            fragments.reset_stats()
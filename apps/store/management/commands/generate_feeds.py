@@ -0,0 +1,23 @@
+import resource
+
+from django.core.management.base import BaseCommand
+
+from apps.store.feeds import generate_feeds
+
+
+class Command(BaseCommand):
+    help = 'Write the sitemap index, product sitemaps and shopping feeds, rewriting changed shards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rewrite every shard')
+
+    def handle(self, *args, **options):
+        stats = generate_feeds(full=options['full'])
+        # ru_maxrss is in KiB on Linux
+        peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.written}/{stats.shards} shards rewritten ({stats.products} products), "
+            f"{stats.removed} removed, pages {'rewritten' if stats.pages_written else 'unchanged'}, "
+            f"in {stats.elapsed:.2f}s, peak RSS {peak_mb:.0f} MB"
+        ))
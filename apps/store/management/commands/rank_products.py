@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.store.ranking import rank_products
+
+
+class Command(BaseCommand):
+    help = 'Recompute product rank scores, bestseller/new flags and the cached top-N lists'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        stats = rank_products()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats.products} products ranked ({stats.sold} with sales), "
+            f"{stats.updated} scores updated, {stats.bestsellers} bestsellers, "
+            f"{stats.categories} category lists cached, in {elapsed:.2f}s"
+        ))
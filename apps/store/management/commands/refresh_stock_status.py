@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.store.stock import refresh_stock_status
+
+
+class Command(BaseCommand):
+    help = 'Recompute stock status for all products and variants and send the low-stock digest'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        updated, digest = refresh_stock_status()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{updated} rows updated, {len(digest['products'])} products and "
+            f"{len(digest['variants'])} variants low or out of stock, in {elapsed:.2f}s"
+        ))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productvariant",
+            name="stock_status",
+            field=models.CharField(
+                choices=[
+                    ("in_stock", "متوفر"),
+                    ("low_stock", "مخزون منخفض"),
+                    ("out_of_stock", "غير متوفر"),
+                ],
+                default="in_stock",
+                max_length=20,
+                verbose_name="حالة المخزون",
+            ),
+        ),
+    ]
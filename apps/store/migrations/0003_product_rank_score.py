@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0002_productvariant_stock_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="product",
+            name="rank_score",
+            field=models.FloatField(
+                default=0, editable=False, verbose_name="درجة الترتيب"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["-rank_score"], name="store_produ_rank_sc_22f818_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-19 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("store", "0003_product_rank_score"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "ordering", "-created_at", "-id"],
+                name="store_prod_list_default_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "created_at", "id"], name="store_prod_list_newest_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "price", "id"], name="store_prod_list_price_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "sales_count", "id"], name="store_prod_list_sales_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(
+                fields=["status", "rank_score", "id"], name="store_prod_list_rank_idx"
+            ),
+        ),
+    ]
@@ -6,6 +6,13 @@ from django.urls import reverse
 import uuid
 
 
+STOCK_STATUS_CHOICES = [
+    ('in_stock', _('متوفر')),
+    ('low_stock', _('مخزون منخفض')),
+    ('out_of_stock', _('غير متوفر')),
+]
+
+
 class TimeStampedModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -45,6 +52,20 @@ class Category(TimeStampedModel):
     @property
     def active_products_count(self):
         return self.products.filter(is_active=True, status='published').count()
+    
+    @classmethod
+    def tree_ids(cls, category_id):
+        """``category_id`` and the ids of all its active descendants, in one query."""
+        children = {}
+        for pk, parent_id in cls.objects.filter(is_active=True).values_list('pk', 'parent_id'):
+            children.setdefault(parent_id, []).append(pk)
+        ids, pending = {category_id}, [category_id]
+        while pending:
+            for child in children.get(pending.pop(), ()):
+                if child not in ids:
+                    ids.add(child)
+                    pending.append(child)
+        return ids
 
 
 class Brand(TimeStampedModel):
@@ -67,6 +88,53 @@ class Brand(TimeStampedModel):
         return self.name
 
 
+class ProductQuerySet(models.QuerySet):
+    # Fields a product card (and ProductSerializer) needs; updated_at keys
+    # the cached card fragments.
+    CARD_FIELDS = ('id', 'uuid', 'name', 'slug', 'sku', 'short_description', 'price',
+                   'compare_price', 'tax_rate', 'stock_status', 'is_featured',
+                   'is_bestseller', 'is_new', 'created_at', 'updated_at')
+    # Every sort ends on the primary key so pages are stable, and each one
+    # matches a (status, <sort columns>) index, read backwards for descending
+    # sorts: published() pins status, so the index also yields the order and
+    # a page stops after LIMIT rows instead of sorting every match.
+    SORTS = {
+        'default': ('ordering', '-created_at', '-id'),
+        'newest': ('-created_at', '-id'),
+        'price_asc': ('price', 'id'),
+        'price_desc': ('-price', '-id'),
+        'bestselling': ('-sales_count', '-id'),
+        'popular': ('-rank_score', '-id'),
+    }
+
+    def published(self):
+        return self.filter(status=self.model.Status.PUBLISHED, is_active=True)
+
+    def in_category_tree(self, category):
+        """Products in ``category`` (instance or id) or any of its subcategories."""
+        category_ids = Category.tree_ids(getattr(category, 'pk', category))
+        # A semi-join rather than a JOIN: no duplicates for products listed
+        # in several categories of the tree, so no DISTINCT.
+        links = Product.categories.through.objects.filter(category_id__in=category_ids)
+        return self.filter(pk__in=links.values('product_id'))
+
+    def priced_between(self, low=None, high=None):
+        queryset = self
+        if low is not None:
+            queryset = queryset.filter(price__gte=low)
+        if high is not None:
+            queryset = queryset.filter(price__lte=high)
+        return queryset
+
+    def sorted_by(self, key):
+        if key not in self.SORTS:
+            raise ValueError(f"unknown product sort {key!r}")
+        return self.order_by(*self.SORTS[key])
+
+    def for_listing(self):
+        return self.only(*self.CARD_FIELDS)
+
+
 class Product(TimeStampedModel):
     class Status(models.TextChoices):
         DRAFT = 'draft', _('مسودة')
@@ -113,11 +181,7 @@ class Product(TimeStampedModel):
     low_stock_threshold = models.IntegerField(_('حد المخزون المنخفض'), default=5)
     manage_stock = models.BooleanField(_('إدارة المخزون'), default=True)
     stock_status = models.CharField(_('حالة المخزون'), max_length=20,
-                                   choices=[
-                                       ('in_stock', _('متوفر')),
-                                       ('low_stock', _('مخزون منخفض')),
-                                       ('out_of_stock', _('غير متوفر'))
-                                   ], default='in_stock')
+                                   choices=STOCK_STATUS_CHOICES, default='in_stock')
     
     weight = models.DecimalField(_('الوزن (كجم)'), max_digits=8, 
                                 decimal_places=3, blank=True, null=True)
@@ -143,6 +207,10 @@ class Product(TimeStampedModel):
     is_bestseller = models.BooleanField(_('الأكثر مبيعاً'), default=False)
     is_new = models.BooleanField(_('جديد'), default=False)
     ordering = models.IntegerField(_('الترتيب'), default=0)
+    # Time-decayed sales velocity plus a newness boost, set by the ranking job
+    rank_score = models.FloatField(_('درجة الترتيب'), default=0, editable=False)
+    
+    objects = ProductQuerySet.as_manager()
     
     class Meta:
         verbose_name = _('المنتج')
@@ -153,8 +221,23 @@ class Product(TimeStampedModel):
             models.Index(fields=['status', 'is_active']),
             models.Index(fields=['price']),
             models.Index(fields=['-sales_count']),
+            models.Index(fields=['-rank_score']),
+            # Storefront listings, see ProductQuerySet.SORTS
+            models.Index(fields=['status', 'ordering', '-created_at', '-id'],
+                         name='store_prod_list_default_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='store_prod_list_newest_idx'),
+            models.Index(fields=['status', 'price', 'id'], name='store_prod_list_price_idx'),
+            models.Index(fields=['status', 'sales_count', 'id'], name='store_prod_list_sales_idx'),
+            models.Index(fields=['status', 'rank_score', 'id'], name='store_prod_list_rank_idx'),
         ]
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_stock_status = instance.__dict__.get('stock_status')
+        instance._loaded_manage_stock = instance.__dict__.get('manage_stock')
+        return instance
+    
     def save(self, *args, **kwargs):
         if not self.slug:
             base_slug = slugify(self.name, allow_unicode=True)
@@ -179,15 +262,15 @@ class Product(TimeStampedModel):
     
     @property
     def discount_percentage(self):
-        if self.compare_price and self.compare_price > self.price:
-            discount = ((self.compare_price - self.price) / self.compare_price) * 100
-            return round(discount, 1)
-        return 0
+        from apps.core.pricing import get_engine
+        
+        return get_engine().discount_percentage(self.price, self.compare_price)
     
     @property
     def price_with_tax(self):
-        tax_amount = (self.price * self.tax_rate) / 100
-        return self.price + tax_amount
+        from apps.core.pricing import get_engine
+        
+        return get_engine().price_with_tax(self.price, self.tax_rate)
     
     def increment_views(self):
         self.views += 1
@@ -197,7 +280,7 @@ class Product(TimeStampedModel):
         self.sales_count += quantity
         if self.manage_stock:
             self.quantity -= quantity
-        self.save(update_fields=['sales_count', 'quantity'])
+        self.save(update_fields=['sales_count', 'quantity', 'stock_status', 'status'])
     
     def get_primary_image(self):
         return self.images.filter(is_primary=True).first() or self.images.first()
@@ -272,6 +355,8 @@ class ProductVariant(TimeStampedModel):
     compare_price = models.DecimalField(_('سعر المقارنة'), max_digits=12, 
                                        decimal_places=2, blank=True, null=True)
     quantity = models.IntegerField(_('الكمية'), default=0)
+    stock_status = models.CharField(_('حالة المخزون'), max_length=20,
+                                   choices=STOCK_STATUS_CHOICES, default='in_stock')
     weight = models.DecimalField(_('الوزن'), max_digits=8, decimal_places=3, 
                                 blank=True, null=True)
     image = models.ForeignKey(ProductImage, on_delete=models.SET_NULL, 
@@ -284,12 +369,16 @@ class ProductVariant(TimeStampedModel):
         verbose_name_plural = _('متغيرات المنتج')
     
     def __str__(self):
-        attributes_str = ' | '.join([str(attr) for attr in self.attributes.all()])
-        return f"{self.product.name} - {attributes_str}"
+        from .variants import get_variant_matrix
+        
+        matrix = get_variant_matrix(self.product_id)
+        return f"{matrix.product_name} - {matrix.label(self.pk)}"
     
     @property
     def final_price(self):
-        return self.price or self.product.price
+        from apps.core.pricing import PricingEngine
+        
+        return PricingEngine.unit_price(self.product, self)
     
     @property
     def final_compare_price(self):
@@ -0,0 +1,215 @@
+"""
+Product ranking from order rollups.
+
+``rank_products`` sums units sold per product and day over the last
+``RANKING_WINDOW_DAYS``, decays each day by ``RANKING_HALF_LIFE_DAYS`` into a
+sales velocity and adds a newness boost for products younger than
+``RANKING_NEW_DAYS``. The result is written to ``Product.rank_score`` (only
+rows whose score changed), ``is_bestseller``/``is_new`` are set with a few
+set-based ``UPDATE``s, and the top-N lists of the home page sections and of
+every category are stored in the cache. Pages then read a list of ids from
+the cache and load those rows by primary key instead of sorting the catalog.
+
+``is_featured`` stays an editorial flag; the job only caches its ordering.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import fragments
+from .models import Category, Product
+
+BESTSELLERS = 'bestsellers'
+NEW = 'new'
+FEATURED = 'featured'
+SECTIONS = (BESTSELLERS, NEW, FEATURED)
+
+STORE_BATCH_SIZE = 1000
+
+
+def cache_key(section):
+    return f"store:ranking:{section}"
+
+
+def category_section(category_id):
+    return f"category:{category_id}"
+
+
+class RankStats:
+    def __init__(self):
+        self.products = 0
+        self.sold = 0
+        self.updated = 0
+        self.bestsellers = 0
+        self.categories = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def sales_velocity(now=None, window_days=None, half_life_days=None):
+    """``{product id: decayed units per day}`` from daily order rollups."""
+    from apps.orders.models import Order, OrderItem
+
+    now = now or timezone.now()
+    window_days = window_days or settings.RANKING_WINDOW_DAYS
+    half_life_days = half_life_days or settings.RANKING_HALF_LIFE_DAYS
+    today = timezone.localdate(now)
+
+    rollups = (OrderItem.objects
+               .filter(order__created_at__gte=now - timedelta(days=window_days))
+               .exclude(order__status=Order.Status.CANCELLED)
+               .annotate(day=TruncDate('order__created_at'))
+               .values('product_id', 'day')
+               .annotate(units=Sum('quantity'))
+               .values_list('product_id', 'day', 'units'))
+    velocity = defaultdict(float)
+    for product_id, day, units in rollups.iterator():
+        age = max((today - day).days, 0)
+        velocity[product_id] += units * 0.5 ** (age / half_life_days)
+    # Normalise to units per day so the boost below keeps the same meaning
+    # whatever the half-life.
+    scale = sum(0.5 ** (age / half_life_days) for age in range(window_days))
+    return {product_id: value / scale for product_id, value in velocity.items()}
+
+
+def newness(created_at, now, new_days):
+    """1 for a product created just now, falling linearly to 0 at ``new_days``."""
+    age = (now - created_at).total_seconds() / 86400
+    return max(0.0, 1 - age / new_days)
+
+
+def _category_ancestors():
+    """``{category id: [category id, parent id, ...]}`` for active categories."""
+    parents = dict(Category.objects.filter(is_active=True).values_list('pk', 'parent_id'))
+    ancestors = {}
+    for category_id in parents:
+        chain, current = [], category_id
+        while current in parents and current not in chain:
+            chain.append(current)
+            current = parents[current]
+        ancestors[category_id] = chain
+    return ancestors
+
+
+def _category_lists(ranked_ids, top_n):
+    """Top ``top_n`` product ids of every category, including its subcategories."""
+    ancestors = _category_ancestors()
+    product_categories = defaultdict(set)
+    links = Product.categories.through.objects.values_list('product_id', 'category_id')
+    for product_id, category_id in links.iterator():
+        if category_id in ancestors:
+            product_categories[product_id].update(ancestors[category_id])
+
+    lists = {category_id: [] for category_id in ancestors}
+    for product_id in ranked_ids:
+        for category_id in product_categories.get(product_id, ()):
+            if len(lists[category_id]) < top_n:
+                lists[category_id].append(product_id)
+    return lists
+
+
+def _set_flag(field, ids):
+    """Make ``field`` true exactly for ``ids`` touching only rows that change."""
+    cleared = Product.objects.filter(**{field: True}).exclude(pk__in=ids).update(**{field: False})
+    set_ = Product.objects.filter(pk__in=ids, **{field: False}).update(**{field: True})
+    return cleared + set_
+
+
+def rank_products(now=None):
+    """Recompute scores, flags and cached top-N lists; returns ``RankStats``."""
+    now = now or timezone.now()
+    top_n = settings.RANKING_TOP_N
+    new_days = settings.RANKING_NEW_DAYS
+    boost = settings.RANKING_NEW_BOOST
+    stats = RankStats()
+
+    velocity = sales_velocity(now)
+    stats.sold = len(velocity)
+
+    changed = []
+    scores = {}
+    rows = Product.objects.values_list('pk', 'rank_score', 'created_at', 'is_active', 'status')
+    for pk, current, created_at, is_active, status in rows.iterator():
+        stats.products += 1
+        score = round(velocity.get(pk, 0.0) + boost * newness(created_at, now, new_days), 4)
+        if score != current:
+            changed.append(Product(pk=pk, rank_score=score))
+        if is_active and status == Product.Status.PUBLISHED:
+            scores[pk] = (score, created_at)
+
+    bestsellers = sorted((pk for pk in velocity if pk in scores),
+                         key=velocity.get, reverse=True)[:settings.RANKING_BESTSELLER_COUNT]
+    new_since = now - timedelta(days=new_days)
+
+    with transaction.atomic():
+        Product.objects.bulk_update(changed, ['rank_score'], batch_size=STORE_BATCH_SIZE)
+        flipped = _set_flag('is_bestseller', bestsellers)
+        flipped += Product.objects.filter(is_new=True, created_at__lt=new_since).update(
+            is_new=False)
+        flipped += Product.objects.filter(is_new=False, created_at__gte=new_since).update(
+            is_new=True)
+        if flipped:
+            # Flags are shown as badges on product cards.
+            fragments.invalidate_model(Product)
+    stats.updated = len(changed)
+    stats.bestsellers = len(bestsellers)
+
+    ranked_ids = sorted(scores, key=lambda pk: (scores[pk][0], scores[pk][1]), reverse=True)
+    newest = sorted((pk for pk in scores if scores[pk][1] >= new_since),
+                    key=lambda pk: scores[pk][1], reverse=True)
+    featured = set(Product.objects.filter(is_featured=True).values_list('pk', flat=True))
+    lists = {
+        BESTSELLERS: bestsellers[:top_n],
+        NEW: newest[:top_n],
+        FEATURED: [pk for pk in ranked_ids if pk in featured][:top_n],
+    }
+    categories = _category_lists(ranked_ids, top_n)
+    lists.update({category_section(pk): ids for pk, ids in categories.items()})
+    stats.categories = len(categories)
+
+    cache.set_many({cache_key(section): ids for section, ids in lists.items()},
+                   timeout=settings.RANKING_CACHE_TTL)
+    return stats
+
+
+# Serving
+
+def _fallback_ids(section, limit):
+    """Ids for ``section`` straight from the indexed columns, used on a cache miss."""
+    products = Product.objects.published()
+    if section == BESTSELLERS:
+        products = products.filter(is_bestseller=True).order_by('-rank_score')
+    elif section == NEW:
+        products = products.filter(is_new=True).order_by('-created_at')
+    elif section == FEATURED:
+        products = products.filter(is_featured=True).order_by('-rank_score')
+    elif section.startswith('category:'):
+        # Direct members only; the ranking job's lists include subcategories.
+        products = products.filter(categories=int(section.split(':', 1)[1])).order_by('-rank_score')
+    else:
+        raise ValueError(f"unknown ranking section {section!r}")
+    return list(products.values_list('pk', flat=True)[:limit])
+
+
+def top_ids(section, limit=None):
+    limit = limit or settings.RANKING_TOP_N
+    ids = cache.get(cache_key(section))
+    if ids is None:
+        ids = _fallback_ids(section, settings.RANKING_TOP_N)
+        cache.set(cache_key(section), ids, timeout=settings.RANKING_CACHE_TTL)
+    return ids[:limit]
+
+
+def top_products(section, limit=None):
+    """Products of a ranked section in rank order: one primary-key query."""
+    ids = top_ids(section, limit)
+    products = Product.objects.published().for_listing().in_bulk(ids)
+    return [products[pk] for pk in ids if pk in products]
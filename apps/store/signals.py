@@ -0,0 +1,128 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from apps.core import events
+from . import fragments
+from .models import (Attribute, AttributeValue, Brand, Category, Product, ProductImage,
+                     ProductVariant)
+from .variants import invalidate_all_variant_matrices, invalidate_variant_matrix
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def variant_changed(sender, instance, **kwargs):
+    invalidate_variant_matrix(instance.product_id)
+
+
+@receiver(m2m_changed, sender=ProductVariant.attributes.through)
+def variant_attributes_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the AttributeValue side: may touch many products.
+        invalidate_all_variant_matrices()
+    else:
+        invalidate_variant_matrix(instance.product_id)
+
+
+# Product fields copied into the matrix
+MATRIX_PRODUCT_FIELDS = {'name', 'price', 'compare_price'}
+
+
+@receiver(post_save, sender=Product)
+def product_changed(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is None or MATRIX_PRODUCT_FIELDS & set(update_fields):
+        invalidate_variant_matrix(instance.pk)
+
+
+STOCK_STATUS = 'stock.status'
+
+
+@receiver(post_save, sender=Product)
+def product_stock_changed(sender, instance, created, update_fields, **kwargs):
+    previous = getattr(instance, '_loaded_stock_status', None)
+    instance._loaded_stock_status = instance.stock_status
+    if created or previous == instance.stock_status:
+        return
+    if update_fields is not None and 'stock_status' not in update_fields:
+        return
+
+    payload = {
+        'product': instance.pk,
+        'name': instance.name,
+        'sku': instance.sku,
+        'stock_status': instance.stock_status,
+        'quantity': instance.quantity,
+        'low_stock_threshold': instance.low_stock_threshold,
+    }
+    channels = [events.product_channel(instance.pk)]
+    if instance.stock_status != 'in_stock':
+        # Low-stock and sold-out alerts also go to staff.
+        channels.append(events.STAFF_CHANNEL)
+    transaction.on_commit(lambda: events.publish(channels, STOCK_STATUS, payload))
+
+
+@receiver(post_save, sender=Attribute)
+@receiver(post_delete, sender=Attribute)
+@receiver(post_save, sender=AttributeValue)
+@receiver(post_delete, sender=AttributeValue)
+def attribute_changed(sender, instance, **kwargs):
+    invalidate_all_variant_matrices()
+
+
+# Fragment cache
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Brand)
+@receiver(post_delete, sender=Brand)
+def fragment_source_changed(sender, instance, **kwargs):
+    fragments.invalidate(instance)
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def product_image_changed(sender, instance, **kwargs):
+    fragments.invalidate(Product(pk=instance.product_id))
+    touch_products(pk=instance.product_id)
+
+
+# Feeds and sitemaps find changed products by ``updated_at``, so changes to
+# what they show from related rows (image, brand name) move it too.
+
+def touch_products(**filters):
+    Product.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Brand)
+def brand_saved(sender, instance, created, **kwargs):
+    if not created:
+        touch_products(brand_id=instance.pk)
+
+
+@receiver(pre_delete, sender=Brand)
+def brand_deleted(sender, instance, **kwargs):
+    # Before SET_NULL detaches the products
+    touch_products(brand_id=instance.pk)
+
+
+@receiver(m2m_changed, sender=Product.categories.through)
+def product_categories_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        # Changed from the Category side
+        fragments.invalidate(instance)
+        if pk_set is None:
+            fragments.invalidate_model(Product)
+        else:
+            for pk in pk_set:
+                fragments.invalidate(Product(pk=pk))
+    else:
+        fragments.invalidate(instance)
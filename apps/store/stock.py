@@ -0,0 +1,101 @@
+"""
+Set-based stock status maintenance.
+
+``refresh_stock_status`` recomputes ``stock_status`` for every stock-managed
+product and every variant with one conditional ``UPDATE`` per table, so
+bulk quantity changes (imports, ``queryset.update``, admin list edits)
+converge without saving rows one by one. Rows that just turned low or ran
+out are collected from the same pass into a digest for staff.
+"""
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, Value, When
+from django.template.loader import render_to_string
+
+from apps.core import events
+from apps.dashboard import kpis
+from . import fragments
+from .models import Product, ProductVariant
+from .signals import STOCK_STATUS
+
+IN_STOCK = 'in_stock'
+LOW_STOCK = 'low_stock'
+OUT_OF_STOCK = 'out_of_stock'
+
+
+def _status_case(threshold):
+    return Case(
+        When(quantity__lte=0, then=Value(OUT_OF_STOCK)),
+        When(quantity__lte=threshold, then=Value(LOW_STOCK)),
+        default=Value(IN_STOCK),
+    )
+
+
+def _stale(threshold):
+    """Rows whose stored status no longer matches their quantity."""
+    return (
+        (Q(quantity__lte=0) & ~Q(stock_status=OUT_OF_STOCK))
+        | (Q(quantity__gt=0, quantity__lte=threshold) & ~Q(stock_status=LOW_STOCK))
+        | (Q(quantity__gt=threshold) & ~Q(stock_status=IN_STOCK))
+    )
+
+
+def _alerts(queryset, threshold, name_field):
+    """Stale rows that are about to become low or out of stock."""
+    return list(queryset.alias(threshold=threshold)
+                .filter(_stale(F('threshold')), quantity__lte=F('threshold'))
+                .values('id', 'sku', 'quantity', product_name=F(name_field),
+                        new_status=_status_case(F('threshold'))))
+
+
+def refresh_stock_status():
+    """Bring every ``stock_status`` up to date; returns ``(updated, digest)``."""
+    product_threshold = F('low_stock_threshold')
+    variant_threshold = Subquery(Product.objects.filter(pk=OuterRef('product_id'))
+                                 .values('low_stock_threshold')[:1])
+    products = Product.objects.filter(manage_stock=True)
+    variants = ProductVariant.objects.all()
+
+    with transaction.atomic():
+        digest = {
+            'products': _alerts(products, product_threshold, 'name'),
+            'variants': _alerts(variants, variant_threshold, 'product__name'),
+        }
+        updated = products.filter(_stale(product_threshold)).update(
+            stock_status=_status_case(product_threshold),
+            status=Case(When(quantity__lte=0, then=Value(Product.Status.OUT_OF_STOCK)),
+                        default=F('status')),
+        )
+        updated += variants.alias(threshold=variant_threshold).filter(
+            _stale(F('threshold'))).update(stock_status=_status_case(variant_threshold))
+        if digest['products'] or digest['variants']:
+            transaction.on_commit(lambda: publish_digest(digest))
+        if updated:
+            # The set-based UPDATE bypasses the signals that keep this counter.
+            transaction.on_commit(lambda: kpis.reconcile([kpis.LOW_STOCK]))
+            fragments.invalidate_model(Product)
+    return updated, digest
+
+
+def publish_digest(digest):
+    for product in digest['products']:
+        events.publish([events.product_channel(product['id']), events.STAFF_CHANNEL],
+                       STOCK_STATUS, {'product': product['id'], 'sku': product['sku'],
+                                      'stock_status': product['new_status'],
+                                      'quantity': product['quantity']})
+
+    recipients = settings.STOCK_DIGEST_RECIPIENTS
+    if not recipients:
+        return
+    context = {'products': digest['products'], 'variants': digest['variants'],
+               'count': len(digest['products']) + len(digest['variants']),
+               'site_name': settings.SITE_NAME}
+    subject = render_to_string('notifications/low_stock_digest/subject.txt', context)
+    EmailMessage(
+        subject=' '.join(subject.split()),
+        body=render_to_string('notifications/low_stock_digest/body.txt', context).strip(),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=recipients,
+    ).send()
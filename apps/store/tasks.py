@@ -0,0 +1,18 @@
+from celery import shared_task
+
+from . import feeds, ranking, stock
+
+
+@shared_task(ignore_result=True)
+def refresh_stock_status():
+    stock.refresh_stock_status()
+
+
+@shared_task(ignore_result=True)
+def rank_products():
+    ranking.rank_products()
+
+
+@shared_task(ignore_result=True)
+def generate_feeds():
+    feeds.generate_feeds()
@@ -0,0 +1,58 @@
+from django import template
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from apps.store import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, dependencies, timeout):
+        self.nodelist = nodelist
+        self.name = name
+        self.dependencies = dependencies
+        self.timeout = timeout
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        dependencies = [dependency.resolve(context) for dependency in self.dependencies]
+        timeout = self.timeout.resolve(context) if self.timeout else None
+        return fragments.cached_fragment(name, dependencies,
+                                         lambda: self.nodelist.render(context), timeout)
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Cache the enclosed template, keyed on the objects it depends on::
+
+        {% fragment 'product_card' product %}...{% endfragment %}
+        {% fragment 'brand_strip' 'store.brand' timeout=3600 %}...{% endfragment %}
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes at least a fragment name")
+    timeout = None
+    dependencies = []
+    for bit in bits[2:]:
+        if bit.startswith('timeout='):
+            timeout = parser.compile_filter(bit[len('timeout='):])
+        else:
+            dependencies.append(parser.compile_filter(bit))
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, parser.compile_filter(bits[1]), dependencies, timeout)
+
+
+@register.simple_tag
+def category_menu():
+    """Header menu of active top-level categories; queried only on a cache miss."""
+    from apps.store.models import Category
+
+    def render():
+        categories = Category.objects.filter(is_active=True, parent__isnull=True)
+        return render_to_string('store/partials/category_menu.html',
+                                {'categories': categories})
+
+    return mark_safe(fragments.cached_fragment('category_menu', ['store.category'], render))
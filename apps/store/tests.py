@@ -1,3 +1,450 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import quote
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.template import Context, Template
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.api.serializers import ProductSerializer
+from apps.core import events
+from apps.orders.models import Order, OrderItem
+from apps.payment.models import PaymentMethod
+from . import feeds, fragments, ranking
+from .models import (Attribute, AttributeValue, Brand, Category, Product, ProductImage,
+                     ProductVariant)
+from .signals import STOCK_STATUS
+from .stock import refresh_stock_status
+from .variants import get_variant_matrix
+from .views import stock_events
+
+
+class VariantMatrixTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='قميص', sku='SHIRT', description='-', short_description='-',
+            price=100, quantity=10, product_type=Product.ProductType.VARIABLE,
+        )
+        size = Attribute.objects.create(name='المقاس')
+        color = Attribute.objects.create(name='اللون')
+        cls.small = AttributeValue.objects.create(attribute=size, value='S')
+        cls.large = AttributeValue.objects.create(attribute=size, value='L')
+        cls.red = AttributeValue.objects.create(attribute=color, value='أحمر')
+
+        cls.small_red = ProductVariant.objects.create(product=cls.product, sku='SHIRT-S-R',
+                                                      quantity=3)
+        cls.small_red.attributes.set([cls.small, cls.red])
+        cls.large_red = ProductVariant.objects.create(product=cls.product, sku='SHIRT-L-R',
+                                                      price=120, quantity=0)
+        cls.large_red.attributes.set([cls.large, cls.red])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matrix_is_built_in_one_query_and_cached(self):
+        with self.assertNumQueries(1):
+            matrix = get_variant_matrix(self.product.pk)
+        with self.assertNumQueries(0):
+            variant = get_variant_matrix(self.product.pk).resolve([self.red.pk, self.small.pk])
+
+        self.assertEqual(variant['id'], self.small_red.pk)
+        self.assertEqual(variant['price'], self.product.price)
+        self.assertEqual(matrix.resolve([self.large.pk, self.red.pk])['price'], 120)
+        self.assertIsNone(matrix.resolve([self.small.pk]))
+
+    def test_str_uses_cached_matrix(self):
+        get_variant_matrix(self.product.pk)
+        variant = ProductVariant.objects.get(pk=self.small_red.pk)
+        with self.assertNumQueries(0):
+            label = str(variant)
+        self.assertIn('قميص', label)
+        self.assertIn('S', label)
+
+    def test_attribute_change_invalidates_matrix(self):
+        get_variant_matrix(self.product.pk)
+        self.small_red.attributes.remove(self.red)
+        matrix = get_variant_matrix(self.product.pk)
+        self.assertEqual(matrix.resolve([self.small.pk])['id'], self.small_red.pk)
+
+    def test_variant_picker(self):
+        url = reverse('store:variant_picker', args=[self.product.pk])
+        options = self.client.get(url).json()['options']
+        self.assertEqual(len(options['المقاس']), 2)
+
+        response = self.client.get(url, {'attributes': f'{self.large.pk},{self.red.pk}'})
+        self.assertEqual(response.json()['variant']['sku'], 'SHIRT-L-R')
+        self.assertFalse(response.json()['variant']['in_stock'])
+
+
+class ProductListTests(TestCase):
+    def test_lists_published_products_with_prices(self):
+        for index, status in enumerate([Product.Status.PUBLISHED, Product.Status.DRAFT]):
+            Product.objects.create(name=f'منتج {index}', sku=f'L{index}', description='-',
+                                   short_description='-', price=100, quantity=10, status=status)
+        response = self.client.get(reverse('store:product_list'))
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertEqual(data['results'][0]['sku'], 'L0')
+        self.assertEqual(data['results'][0]['price_with_tax'], '115.00')
+        self.assertEqual(self.client.get(reverse('store:product_list'), {'page': 9}).status_code, 404)
+
+
+class ProductQuerySetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.clothes = Category.objects.create(name='ملابس')
+        cls.shirts = Category.objects.create(name='قمصان', parent=cls.clothes)
+        cls.shoes = Category.objects.create(name='أحذية')
+        cls.cheap, cls.mid, cls.dear, cls.boots = [
+            Product.objects.create(name=name, sku=name, description='-', short_description='-',
+                                   price=price, quantity=10, status=Product.Status.PUBLISHED)
+            for name, price in [('cheap', 20), ('mid', 50), ('dear', 90), ('boots', 60)]
+        ]
+        cls.cheap.categories.set([cls.clothes])
+        cls.mid.categories.set([cls.shirts, cls.clothes])
+        cls.dear.categories.set([cls.shirts])
+        cls.boots.categories.set([cls.shoes])
+        Product.objects.create(name='draft', sku='draft', description='-', short_description='-',
+                               price=30, status=Product.Status.DRAFT).categories.set([cls.shirts])
+
+    def test_filters_and_sorts(self):
+        products = (Product.objects.published().in_category_tree(self.clothes)
+                    .priced_between(30, None).sorted_by('price_desc'))
+        self.assertEqual(list(products), [self.dear, self.mid])
+        self.assertEqual(list(Product.objects.published().in_category_tree(self.shirts.pk)
+                              .sorted_by('price_asc')), [self.mid, self.dear])
+        with self.assertRaises(ValueError):
+            Product.objects.sorted_by('name')
+
+    def test_listing_view_loads_card_fields_only(self):
+        url = reverse('store:product_list')
+        response = self.client.get(url, {'category': self.clothes.slug, 'max_price': 60,
+                                          'sort': 'price_asc'})
+        self.assertEqual([item['sku'] for item in response.json()['results']], ['cheap', 'mid'])
+        self.assertEqual(self.client.get(url, {'sort': 'name'}).status_code, 400)
+        for price in ('x', 'NaN', 'sNaN', 'Infinity', '-inf'):
+            with self.subTest(price=price):
+                self.assertEqual(self.client.get(url, {'min_price': price}).status_code, 400)
+                self.assertEqual(self.client.get(url, {'max_price': price}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'max_price': '1E+30'}).status_code, 200)
+
+        products = list(Product.objects.published().for_listing().sorted_by('newest'))
+        with self.assertNumQueries(0):
+            ProductSerializer(products, many=True).data
+
+    def test_listing_queries_use_indexes(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan assertions are written against SQLite')
+        indexes = {
+            'default': 'store_prod_list_default_idx',
+            'newest': 'store_prod_list_newest_idx',
+            'price_asc': 'store_prod_list_price_idx',
+            'price_desc': 'store_prod_list_price_idx',
+            'bestselling': 'store_prod_list_sales_idx',
+            'popular': 'store_prod_list_rank_idx',
+        }
+        for sort, index in indexes.items():
+            with self.subTest(sort=sort):
+                plan = Product.objects.published().sorted_by(sort).for_listing()[:24].explain()
+                self.assertIn(f'USING INDEX {index}', plan)
+                # The index yields the order: no sort step over all matches.
+                self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = (Product.objects.published().priced_between(10, 100)
+                .sorted_by('price_asc')[:24].explain())
+        self.assertIn('store_prod_list_price_idx (status=? AND price>? AND price<?)', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+        plan = (Product.objects.published().in_category_tree(self.clothes)
+                .sorted_by('newest')[:24].explain())
+        self.assertIn('USING INDEX store_prod_list_newest_idx', plan)
+        self.assertIn('store_product_categories_category_id', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class StockStatusTests(TestCase):
+    async def test_stock_status(self):
+        product = await Product.objects.acreate(
+            name='كوب', sku='CUP', description='-', short_description='-',
+            price=10, quantity=3,
+        )
+        variant = await ProductVariant.objects.acreate(product=product, sku='CUP-1', quantity=7)
+
+        response = await self.async_client.get(
+            reverse('store:stock_status'),
+            {'products': f'{product.pk},999', 'variants': str(variant.pk)},
+        )
+        data = response.json()
+        self.assertEqual(data['products'], {
+            str(product.pk): {'stock_status': 'low_stock', 'available': 3},
+        })
+        self.assertEqual(data['variants'], {str(variant.pk): {'available': 7}})
+
+
+class StockEventTests(TestCase):
+    def test_low_stock_alert_is_published_to_staff(self):
+        product = Product.objects.create(
+            name='كوب', sku='CUP', description='-', short_description='-',
+            price=10, quantity=10,
+        )
+        product = Product.objects.get(pk=product.pk)
+        with mock.patch('apps.core.events.publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                product.increment_sales(7)
+        channels, event, payload = publish.call_args.args
+        self.assertEqual(channels, [events.product_channel(product.pk), events.STAFF_CHANNEL])
+        self.assertEqual(event, STOCK_STATUS)
+        self.assertEqual((payload['stock_status'], payload['quantity']), ('low_stock', 3))
+
+    async def test_event_stream(self):
+        request = RequestFactory().get(reverse('store:stock_events'), {'products': '7'})
+        response = await stock_events(request)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+        stream = response.streaming_content
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        events.publish([events.product_channel(7)], STOCK_STATUS, {'product': 7})
+        self.assertEqual(await anext(stream),
+                         b'data: {"event": "stock.status", "data": {"product": 7}}\n\n')
+        await stream.aclose()
+
+
+class StockRefreshTests(TestCase):
+    @override_settings(STOCK_DIGEST_RECIPIENTS=['stock@example.com'])
+    def test_bulk_quantity_changes_are_reconciled(self):
+        products = [
+            Product.objects.create(name=f'منتج {i}', sku=f'P{i}', description='-',
+                                   short_description='-', price=10, quantity=50)
+            for i in range(3)
+        ]
+        variant = ProductVariant.objects.create(product=products[0], sku='P0-1', quantity=50)
+        # Bulk updates bypass Product.save().
+        Product.objects.filter(pk=products[0].pk).update(quantity=0)
+        Product.objects.filter(pk=products[1].pk).update(quantity=2)
+        ProductVariant.objects.filter(pk=variant.pk).update(quantity=4)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            updated, digest = refresh_stock_status()
+
+        self.assertEqual(updated, 3)
+        statuses = dict(Product.objects.values_list('sku', 'stock_status'))
+        self.assertEqual(statuses, {'P0': 'out_of_stock', 'P1': 'low_stock', 'P2': 'in_stock'})
+        self.assertEqual(Product.objects.get(sku='P0').status, Product.Status.OUT_OF_STOCK)
+        self.assertEqual(ProductVariant.objects.get(pk=variant.pk).stock_status, 'low_stock')
+        self.assertEqual({row['sku'] for row in digest['products']}, {'P0', 'P1'})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('P0-1', mail.outbox[0].body)
+
+        self.assertEqual(refresh_stock_status(), (0, {'products': [], 'variants': []}))
+
+
+class RankingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.payment_method = PaymentMethod.objects.create(
+            name='الدفع عند الاستلام', code='cod',
+            type=PaymentMethod.PaymentType.CASH_ON_DELIVERY,
+        )
+        cls.electronics = Category.objects.create(name='إلكترونيات')
+        cls.phones = Category.objects.create(name='جوالات', parent=cls.electronics)
+        cls.steady, cls.trending, cls.fresh, cls.hidden = [
+            Product.objects.create(name=name, sku=name, description='-', short_description='-',
+                                   price=10, quantity=100, status=Product.Status.PUBLISHED,
+                                   is_bestseller=name == 'fresh')
+            for name in ['steady', 'trending', 'fresh', 'hidden']
+        ]
+        cls.trending.categories.set([cls.phones])
+        cls.steady.categories.set([cls.electronics])
+        Product.objects.filter(pk=cls.hidden.pk).update(status=Product.Status.DRAFT)
+        Product.objects.exclude(pk=cls.fresh.pk).update(
+            created_at=timezone.now() - timedelta(days=120))
+
+        # More units in total for steady, but weeks ago; trending sold this week.
+        cls._sell(cls.steady, 20, days_ago=40)
+        cls._sell(cls.trending, 5, days_ago=1)
+        cls._sell(cls.hidden, 50, days_ago=1)
+
+    @classmethod
+    def _sell(cls, product, quantity, days_ago):
+        order = Order.objects.create(customer_name='عميل', customer_phone='+966500000000',
+                                     shipping_city='الرياض', shipping_address='شارع 1',
+                                     payment_method=cls.payment_method)
+        OrderItem.objects.create(order=order, product=product, product_name=product.name,
+                                 product_sku=product.sku, price=product.price, quantity=quantity)
+        Order.objects.filter(pk=order.pk).update(
+            created_at=timezone.now() - timedelta(days=days_ago))
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(RANKING_BESTSELLER_COUNT=1, RANKING_NEW_BOOST=10)
+    def test_scores_flags_and_cached_sections(self):
+        stats = ranking.rank_products()
+        self.assertEqual((stats.products, stats.sold), (4, 3))
+
+        scores = dict(Product.objects.values_list('sku', 'rank_score'))
+        self.assertGreater(scores['trending'], scores['steady'])
+        self.assertGreater(scores['fresh'], scores['trending'])  # newness boost
+        flags = dict(Product.objects.values_list('sku', 'is_bestseller'))
+        self.assertEqual(flags, {'steady': False, 'trending': True, 'fresh': False,
+                                 'hidden': False})
+        self.assertEqual(list(Product.objects.filter(is_new=True)), [self.fresh])
+
+        self.assertEqual(ranking.top_ids(ranking.BESTSELLERS), [self.trending.pk])
+        self.assertEqual(ranking.top_ids(ranking.NEW), [self.fresh.pk])
+        # The parent category lists its subcategories' products too.
+        self.assertEqual(ranking.top_ids(ranking.category_section(self.electronics.pk)),
+                         [self.trending.pk, self.steady.pk])
+
+        # One primary-key query per non-empty section (nothing is featured)
+        # and the category menu, cached from then on.
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.context['bestsellers'], [self.trending])
+
+        # Nothing changed: no score rewritten.
+        self.assertEqual(ranking.rank_products().updated, 0)
+
+    def test_cache_miss_falls_back_to_index(self):
+        Product.objects.filter(pk=self.trending.pk).update(rank_score=5, is_featured=True)
+        Product.objects.filter(pk=self.steady.pk).update(rank_score=1, is_featured=True)
+
+        self.assertEqual(ranking.top_products(ranking.FEATURED), [self.trending, self.steady])
+        with self.assertNumQueries(1):
+            ranking.top_products(ranking.FEATURED)
+
+
+@override_settings(FRAGMENT_STATS_FLUSH_EVERY=1)
+class FragmentCacheTests(TestCase):
+    card = Template("{% load storefront %}{% fragment 'card' product %}"
+                    "{{ product.name }} {{ product.images.count }}{% endfragment %}")
+    menu = Template('{% load storefront %}{% category_menu %}')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name='ساعة', sku='WATCH', description='-',
+                                             short_description='-', price=10)
+        cls.category = Category.objects.create(name='إكسسوارات')
+
+    def setUp(self):
+        cache.clear()
+        fragments.reset_stats()
+
+    def render(self, template, **context):
+        return template.render(Context(context))
+
+    def test_product_card_is_invalidated_by_product_and_image_changes(self):
+        self.assertEqual(self.render(self.card, product=self.product), 'ساعة 0')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.render(self.card, product=self.product), 'ساعة 0')
+
+        # self.product still has its old updated_at; the version bump invalidates.
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductImage.objects.create(product=self.product, image='products/watch.jpg')
+        self.assertEqual(self.render(self.card, product=self.product), 'ساعة 1')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.filter(pk=self.product.pk).update(name='ساعة ذكية')
+            fragments.invalidate_model(Product)
+        self.product.refresh_from_db()
+        self.assertEqual(self.render(self.card, product=self.product), 'ساعة ذكية 1')
+
+        self.assertEqual(fragments.fragment_stats()['card'],
+                         {'hits': 1, 'misses': 3, 'hit_ratio': 0.25})
+
+    def test_category_menu_follows_category_table(self):
+        with self.assertNumQueries(1):
+            self.assertIn('إكسسوارات', self.render(self.menu))
+        with self.assertNumQueries(0):
+            self.render(self.menu)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name='أحذية')
+        self.assertIn('أحذية', self.render(self.menu))
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        brand = Brand.objects.create(name='نوكيا')
+        cls.category = Category.objects.create(name='جوالات')
+        cls.products = [
+            Product.objects.create(name=f'جوال {i}', sku=f'PH{i}', description='-',
+                                   short_description='وصف <قصير>', price=100, compare_price=150,
+                                   quantity=5, brand=brand, status=Product.Status.PUBLISHED)
+            for i in range(5)
+        ]
+        Product.objects.create(name='مسودة', sku='DRAFT', description='-', short_description='-',
+                               price=10)
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        override = override_settings(FEED_ROOT=self.root, SITEMAP_SHARD_SIZE=2,
+                                     SITE_SCHEME='https', SITE_DOMAIN='shop.example')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def read(self, name):
+        with open(f'{self.root}/{name}', 'rb') as feed:
+            return gzip.decompress(feed.read()).decode()
+
+    def test_generates_sitemaps_and_feeds_incrementally(self):
+        shards = {product.pk // 2 for product in self.products}
+        stats = feeds.generate_feeds()
+        self.assertEqual((stats.shards, stats.written, stats.products), (len(shards), len(shards), 5))
+
+        channel = ElementTree.fromstring(self.read(feeds.PRODUCT_FEED_XML)).find('channel')
+        items = channel.findall('item')
+        self.assertEqual(len(items), 5)
+        g = '{http://base.google.com/ns/1.0}'
+        self.assertEqual(items[0].find(f'{g}price').text, '172.50 SAR')
+        self.assertEqual(items[0].find(f'{g}sale_price').text, '115.00 SAR')
+        self.assertEqual(items[0].find('description').text, 'وصف <قصير>')
+        rows = list(csv.DictReader(io.StringIO(self.read(feeds.PRODUCT_FEED_CSV))))
+        self.assertEqual([row['id'] for row in rows], [f'PH{i}' for i in range(5)])
+        self.assertEqual(rows[0]['brand'], 'نوكيا')
+        self.assertTrue(rows[0]['link'].startswith('https://shop.example/store/products/'))
+
+        index = ElementTree.fromstring(self.client.get(reverse('sitemap')).getvalue())
+        self.assertEqual(len(index), len(shards) + 1)
+        pages = self.read(feeds.PAGES_SITEMAP)
+        self.assertIn(f'category={quote(self.category.slug)}', pages)
+
+        self.assertEqual(feeds.generate_feeds().written, 0)
+
+        product = self.products[-1]
+        product.name = 'جوال جديد'
+        product.save()
+        stats = feeds.generate_feeds()
+        self.assertEqual((stats.written, stats.products), (1, len(
+            [p for p in self.products if p.pk // 2 == product.pk // 2])))
+        self.assertIn('جوال جديد', self.read(feeds.PRODUCT_FEED_XML))
+
+        ProductImage.objects.create(product=product, image='products/new.jpg')
+        stats = feeds.generate_feeds()
+        self.assertEqual(stats.written, 1)
+        self.assertIn('products/new.jpg', self.read(feeds.PRODUCT_FEED_XML))
+
+        brand = product.brand
+        brand.name = 'نوكيا الجديدة'
+        brand.save()
+        self.assertEqual(feeds.generate_feeds().written, len(shards))
+        self.assertIn('نوكيا الجديدة', self.read(feeds.PRODUCT_FEED_CSV))
+
+        Product.objects.filter(pk__in=[p.pk for p in self.products
+                                       if p.pk // 2 == product.pk // 2]).delete()
+        stats = feeds.generate_feeds()
+        self.assertEqual((stats.written, stats.removed), (0, 1))
+        self.assertNotIn('جوال جديد', self.read(feeds.PRODUCT_FEED_XML))
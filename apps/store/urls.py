@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'store'
+
+urlpatterns = [
+    path('stock/', views.stock_status, name='stock_status'),
+    path('stock/events/', views.stock_events, name='stock_events'),
+    path('products/', views.product_list, name='product_list'),
+    path('products/<int:product_id>/variants/', views.variant_picker, name='variant_picker'),
+    path('products/<int:product_id>/recommendations/', views.product_recommendations,
+         name='product_recommendations'),
+    path('products/<str:slug>/', views.product_detail, name='product_detail'),
+]
@@ -0,0 +1,123 @@
+"""
+Per-product variant matrix.
+
+Maps a frozenset of ``AttributeValue`` ids to the matching variant so the
+variant picker and cart can resolve a selection with a dict lookup instead
+of one JOIN per attribute. The matrix is built with a single query, cached,
+and invalidated by the signals in ``apps.store.signals``.
+
+Stock is left out: quantities change through ``F()`` updates and bulk jobs
+that send no signals, so callers read them with ``variant_quantity``.
+"""
+
+from django.core.cache import cache
+
+CACHE_TIMEOUT = 60 * 60 * 24
+VERSION_KEY = 'variant-matrix:version'
+
+
+def _cache_key(product_id):
+    version = cache.get_or_set(VERSION_KEY, 1, timeout=None)
+    return f"variant-matrix:{version}:{product_id}"
+
+
+class VariantMatrix:
+    def __init__(self, product_id, product_name, variants):
+        self.product_id = product_id
+        self.product_name = product_name
+        self.variants = variants
+        self.by_attributes = {
+            variant['attributes']: variant_id
+            for variant_id, variant in variants.items()
+            if variant['is_active']
+        }
+
+    def resolve(self, attribute_value_ids):
+        """Return the active variant matching exactly ``attribute_value_ids``."""
+        variant_id = self.by_attributes.get(frozenset(int(pk) for pk in attribute_value_ids))
+        if variant_id is None:
+            return None
+        return self.get(variant_id)
+
+    def get(self, variant_id):
+        variant = self.variants.get(variant_id)
+        if variant is None:
+            return None
+        return dict(variant, id=variant_id)
+
+    def label(self, variant_id):
+        variant = self.variants.get(variant_id)
+        return variant['label'] if variant else ''
+
+    def options(self):
+        """Attribute values offered by active variants, grouped by attribute."""
+        options = {}
+        for variant in self.variants.values():
+            if not variant['is_active']:
+                continue
+            for attribute, value_id, value in variant['values']:
+                options.setdefault(attribute, {})[value_id] = value
+        return {
+            attribute: [{'id': value_id, 'value': value} for value_id, value in sorted(values.items())]
+            for attribute, values in options.items()
+        }
+
+
+def build_variant_matrix(product_id):
+    from .models import ProductVariant
+
+    rows = (ProductVariant.objects.filter(product_id=product_id)
+            .values_list('id', 'sku', 'price', 'compare_price', 'is_active',
+                         'product__name', 'product__price', 'product__compare_price',
+                         'attributes__id', 'attributes__attribute__name',
+                         'attributes__value')
+            .order_by('id', 'attributes__attribute__name', 'attributes__id'))
+
+    product_name = None
+    variants = {}
+    for (variant_id, sku, price, compare_price, is_active, product_name,
+         product_price, product_compare_price, value_id, attribute, value) in rows:
+        variant = variants.setdefault(variant_id, {
+            'sku': sku,
+            'price': price or product_price,
+            'compare_price': compare_price or product_compare_price,
+            'is_active': is_active,
+            'values': [],
+        })
+        if value_id is not None:
+            variant['values'].append((attribute, value_id, value))
+
+    for variant in variants.values():
+        variant['attributes'] = frozenset(value_id for _, value_id, _ in variant['values'])
+        variant['label'] = ' | '.join(f"{attribute}: {value}"
+                                      for attribute, _, value in variant['values'])
+
+    return VariantMatrix(product_id, product_name, variants)
+
+
+def get_variant_matrix(product_id):
+    key = _cache_key(product_id)
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_variant_matrix(product_id)
+        cache.set(key, matrix, CACHE_TIMEOUT)
+    return matrix
+
+
+def variant_quantity(variant_id):
+    """Current stock of a variant, read from the database."""
+    from .models import ProductVariant
+
+    return (ProductVariant.objects.filter(pk=variant_id)
+            .values_list('quantity', flat=True).first()) or 0
+
+
+def invalidate_variant_matrix(product_id):
+    cache.delete(_cache_key(product_id))
+
+
+def invalidate_all_variant_matrices():
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, timeout=None)
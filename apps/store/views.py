@@ -1,3 +1,169 @@
-from django.shortcuts import render
+import os
+from decimal import Decimal, InvalidOperation
 
-# Create your views here.
+from django.conf import settings
+from django.core.paginator import InvalidPage, Paginator
+from django.http import FileResponse, Http404, HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.views.decorators.http import require_GET
+
+from apps.core import events
+from . import feeds, ranking
+from .models import Category, Product, ProductQuerySet, ProductVariant
+from .variants import get_variant_matrix, variant_quantity
+
+# Upper bound on ids accepted by one stock poll
+MAX_STOCK_IDS = 100
+CATALOG_PAGE_SIZE = 24
+HOME_SECTION_SIZE = 6
+
+
+def _variant_json(variant, quantity):
+    return {
+        'id': variant['id'],
+        'sku': variant['sku'],
+        'label': variant['label'],
+        'price': str(variant['price']),
+        'compare_price': str(variant['compare_price']) if variant['compare_price'] else None,
+        'quantity': quantity,
+        'in_stock': quantity > 0,
+    }
+
+
+@require_GET
+def home(request):
+    """Home page; each section is a cached list of ids from the ranking job."""
+    return render(request, 'home.html', {
+        'featured_products': ranking.top_products(ranking.FEATURED, HOME_SECTION_SIZE),
+        'bestsellers': ranking.top_products(ranking.BESTSELLERS, HOME_SECTION_SIZE),
+        'new_products': ranking.top_products(ranking.NEW, HOME_SECTION_SIZE),
+    })
+
+
+@require_GET
+def sitemap_index(request):
+    """The sitemap index written by ``feeds.generate_feeds``."""
+    try:
+        index = open(os.path.join(settings.FEED_ROOT, feeds.SITEMAP_INDEX), 'rb')
+    except FileNotFoundError:
+        raise Http404
+    return FileResponse(index, content_type='application/xml')
+
+
+@require_GET
+def product_list(request):
+    """Published catalog page with engine prices.
+
+    ``?page=N&category=<slug>&min_price=&max_price=&sort=<ProductQuerySet.SORTS key>``
+    """
+    from apps.api.serializers import ProductSerializer
+
+    sort = request.GET.get('sort') or 'default'
+    if sort not in ProductQuerySet.SORTS:
+        return JsonResponse({'error': 'sort'}, status=400)
+    try:
+        low, high = (Decimal(request.GET[name]) if request.GET.get(name) else None
+                     for name in ('min_price', 'max_price'))
+    except InvalidOperation:
+        return JsonResponse({'error': 'price'}, status=400)
+    if any(value is not None and not value.is_finite() for value in (low, high)):
+        return JsonResponse({'error': 'price'}, status=400)
+
+    products = Product.objects.published().priced_between(low, high)
+    if request.GET.get('category'):
+        category = Category.objects.filter(slug=request.GET['category'], is_active=True).first()
+        if category is None:
+            return JsonResponse({'error': 'category'}, status=404)
+        products = products.in_category_tree(category)
+    products = products.sorted_by(sort).for_listing()
+    paginator = Paginator(products, CATALOG_PAGE_SIZE)
+    try:
+        page = paginator.page(request.GET.get('page') or 1)
+    except InvalidPage:
+        return JsonResponse({'error': 'page'}, status=404)
+    return JsonResponse({
+        'count': paginator.count,
+        'page': page.number,
+        'results': ProductSerializer(page.object_list, many=True).data,
+    })
+
+
+@require_GET
+def product_detail(request, slug):
+    from apps.api.serializers import ProductSerializer
+
+    product = get_object_or_404(Product.objects.published(), slug=slug)
+    return JsonResponse(ProductSerializer(product).data)
+
+
+@require_GET
+def product_recommendations(request, product_id):
+    """Products frequently bought together with ``product_id``."""
+    from apps.analytics.recommendations import recommended_products
+    from apps.api.serializers import ProductSerializer
+
+    products = recommended_products([product_id])
+    return JsonResponse({'results': ProductSerializer(products, many=True).data})
+
+
+@require_GET
+def variant_picker(request, product_id):
+    """Variant options for a product, or the variant matching ``?attributes=1,2``."""
+    matrix = get_variant_matrix(product_id)
+
+    attributes = request.GET.get('attributes')
+    if attributes is None:
+        return JsonResponse({'options': matrix.options()})
+
+    try:
+        variant = matrix.resolve(attributes.split(',') if attributes else [])
+    except ValueError:
+        variant = None
+    if variant is None:
+        return JsonResponse({'variant': None}, status=404)
+    return JsonResponse({'variant': _variant_json(variant, variant_quantity(variant['id']))})
+
+
+def _ids(value):
+    try:
+        return [int(pk) for pk in value.split(',') if pk][:MAX_STOCK_IDS]
+    except ValueError:
+        return []
+
+
+async def stock_status(request):
+    """Stock levels for ``?products=1,2`` and ``?variants=3,4``, for availability polling."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    product_ids = _ids(request.GET.get('products', ''))
+    variant_ids = _ids(request.GET.get('variants', ''))
+
+    products = {}
+    if product_ids:
+        rows = Product.objects.filter(pk__in=product_ids).values(
+            'id', 'quantity', 'stock_status', 'manage_stock')
+        async for row in rows:
+            products[row['id']] = {
+                'stock_status': row['stock_status'],
+                'available': row['quantity'] if row['manage_stock'] else None,
+            }
+
+    variants = {}
+    if variant_ids:
+        rows = ProductVariant.objects.filter(pk__in=variant_ids, is_active=True).values(
+            'id', 'quantity')
+        async for row in rows:
+            variants[row['id']] = {'available': row['quantity']}
+
+    return JsonResponse({'products': products, 'variants': variants})
+
+
+async def stock_events(request):
+    """Stock status changes for ``?products=1,2``, as SSE or long-poll (``?poll=1``)."""
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    product_ids = _ids(request.GET.get('products', ''))
+    if not product_ids:
+        return JsonResponse({'error': 'products'}, status=400)
+    return await events.event_response(request, [events.product_channel(pk) for pk in product_ids])
@@ -0,0 +1,22 @@
+"""
+Celery application for the ecommerce project.
+"""
+
+import os
+
+from celery import Celery
+from celery.signals import task_prerun
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+
+app = Celery('config')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
+
+
+@task_prerun.connect
+def reset_replica_pinning(**kwargs):
+    # Each task starts reading from replicas again; see apps.core.routers.
+    from apps.core.routers import reset_write_tracking
+
+    reset_write_tracking()
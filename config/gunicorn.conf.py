@@ -0,0 +1,43 @@
+"""
+Gunicorn configuration, driven by environment variables.
+
+    gunicorn -c config/gunicorn.conf.py config.wsgi:application
+
+GUNICORN_WORKER_CLASS picks the worker model:
+
+- ``sync``: one request per process.
+- ``gthread`` (default): GUNICORN_THREADS requests per process. With
+  CONN_MAX_AGE each thread keeps its own PostgreSQL connection, so the
+  connection budget is workers x threads.
+- ``gevent``: GUNICORN_WORKER_CONNECTIONS greenlets per process. psycopg2
+  is made cooperative with psycogreen. Persistent connections are disabled
+  in settings for this class (a greenlet never reuses one), so put
+  PgBouncer in front of PostgreSQL.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers now and then to bound memory growth.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = max_requests // 10
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
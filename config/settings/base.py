@@ -42,10 +42,8 @@ INSTALLED_APPS = [
     'allauth',
     'allauth.account',
     'allauth.socialaccount',
-    'django_extensions',
     'rest_framework',
     'corsheaders',
-    'import_export',
     'django_cleanup.apps.CleanupConfig',
     
     # Custom apps
@@ -64,6 +62,7 @@ MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.core.middleware.ReplicaPinMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -104,6 +103,14 @@ DATABASES = {
     }
 }
 
+# Read replicas: aliases in DATABASES that serve reads for REPLICA_READ_APPS.
+# After a write the client reads from the primary for REPLICA_PIN_SECONDS.
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_READ_APPS = ['store', 'dashboard', 'analytics']
+REPLICA_PIN_COOKIE = 'db_pin'
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=5)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -224,6 +231,41 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'refresh-stock-status': {
+        'task': 'apps.store.tasks.refresh_stock_status',
+        'schedule': env.int('STOCK_REFRESH_INTERVAL', default=900),
+    },
+    'reap-abandoned-carts': {
+        'task': 'apps.cart.tasks.reap_abandoned_carts',
+        'schedule': 60 * 60,
+    },
+    'purge-expired-sessions': {
+        'task': 'apps.core.tasks.purge_expired_sessions',
+        'schedule': 60 * 60 * 24,
+    },
+    'reconcile-dashboard-kpis': {
+        'task': 'apps.dashboard.tasks.reconcile_kpis',
+        'schedule': env.int('DASHBOARD_KPI_RECONCILE_INTERVAL', default=60 * 5),
+    },
+    'rank-products': {
+        'task': 'apps.store.tasks.rank_products',
+        'schedule': env.int('RANKING_INTERVAL', default=60 * 60),
+    },
+    'generate-feeds': {
+        'task': 'apps.store.tasks.generate_feeds',
+        'schedule': env.int('FEED_INTERVAL', default=60 * 60),
+    },
+    'build-recommendations': {
+        'task': 'apps.analytics.tasks.build_recommendations',
+        'schedule': 60 * 60 * 24,
+    },
+    # Safety net for events whose scheduled run was lost
+    'process-payment-webhooks': {
+        'task': 'apps.payment.tasks.process_webhook_events',
+        'schedule': 60 * 5,
+    },
+}
 
 # Cache Configuration
 CACHES = {
@@ -237,6 +279,7 @@ CACHES = {
 SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 SESSION_COOKIE_AGE = 1209600  # 2 weeks
 SESSION_COOKIE_SECURE = env.bool('SESSION_COOKIE_SECURE', default=False)
+SESSION_PURGE_BATCH_SIZE = env.int('SESSION_PURGE_BATCH_SIZE', default=5000)
 CSRF_COOKIE_SECURE = env.bool('CSRF_COOKIE_SECURE', default=False)
 
 # X-Frame-Options
@@ -246,12 +289,30 @@ X_FRAME_OPTIONS = 'SAMEORIGIN'
 STRIPE_PUBLIC_KEY = env('STRIPE_PUBLIC_KEY', default='')
 STRIPE_SECRET_KEY = env('STRIPE_SECRET_KEY', default='')
 STRIPE_WEBHOOK_SECRET = env('STRIPE_WEBHOOK_SECRET', default='')
+STRIPE_API_URL = env('STRIPE_API_URL', default='https://api.stripe.com')
+PAYMENT_GATEWAY = env('PAYMENT_GATEWAY', default='apps.payment.gateways.StripeGateway')
+# Seconds; the read timeout bounds how long a worker waits on a slow gateway
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = env.float('PAYMENT_GATEWAY_CONNECT_TIMEOUT', default=3.05)
+PAYMENT_GATEWAY_READ_TIMEOUT = env.float('PAYMENT_GATEWAY_READ_TIMEOUT', default=15)
+PAYMENT_GATEWAY_RETRIES = env.int('PAYMENT_GATEWAY_RETRIES', default=2)
+PAYMENT_GATEWAY_POOL_SIZE = env.int('PAYMENT_GATEWAY_POOL_SIZE', default=10)
+# Webhooks: signature age limit in seconds, and events are applied in batches
+# at most PAYMENT_WEBHOOK_DELAY seconds after they arrive
+PAYMENT_WEBHOOK_TOLERANCE = env.int('PAYMENT_WEBHOOK_TOLERANCE', default=300)
+PAYMENT_WEBHOOK_DELAY = env.int('PAYMENT_WEBHOOK_DELAY', default=2)
+PAYMENT_WEBHOOK_BATCH_SIZE = env.int('PAYMENT_WEBHOOK_BATCH_SIZE', default=200)
 
 # Twilio Settings (for SMS)
 TWILIO_ACCOUNT_SID = env('TWILIO_ACCOUNT_SID', default='')
 TWILIO_AUTH_TOKEN = env('TWILIO_AUTH_TOKEN', default='')
 TWILIO_PHONE_NUMBER = env('TWILIO_PHONE_NUMBER', default='')
 
+# Notifications
+SMS_BACKEND = env('SMS_BACKEND', default='apps.core.sms.ConsoleBackend')
+SMS_RATE_LIMIT = env('SMS_RATE_LIMIT', default='1/s')
+SMS_TIMEOUT = env.int('SMS_TIMEOUT', default=10)
+NOTIFICATION_EMAIL_BATCH_SIZE = env.int('NOTIFICATION_EMAIL_BATCH_SIZE', default=100)
+
 # Custom Site Settings
 SITE_NAME = env('SITE_NAME', default='متجر إلكتروني')
 SITE_DOMAIN = env('SITE_DOMAIN', default='localhost:8000')
@@ -260,6 +321,67 @@ DEFAULT_TAX_RATE = env.float('DEFAULT_TAX_RATE', default=15.0)
 FREE_SHIPPING_THRESHOLD = env.float('FREE_SHIPPING_THRESHOLD', default=500.0)
 SHIPPING_COST = env.float('SHIPPING_COST', default=25.0)
 
+# Quick orders: dedupe window and (limit, window seconds) throttles
+QUICK_ORDER_DEDUPE_WINDOW = env.int('QUICK_ORDER_DEDUPE_WINDOW', default=600)
+QUICK_ORDER_IP_RATE = (env.int('QUICK_ORDER_IP_LIMIT', default=10), 3600)
+QUICK_ORDER_PHONE_RATE = (env.int('QUICK_ORDER_PHONE_LIMIT', default=5), 3600)
+QUICK_ORDER_FLUSH_DELAY = env.int('QUICK_ORDER_FLUSH_DELAY', default=2)
+QUICK_ORDER_BATCH_SIZE = 500
+# Reverse proxies in front of the app that append to X-Forwarded-For; 0 means
+# the client address is REMOTE_ADDR.
+TRUSTED_PROXY_COUNT = env.int('TRUSTED_PROXY_COUNT', default=0)
+
+# Carts: guest carts idle for CART_ABANDONED_TTL seconds are deleted, customers
+# are reminded after CART_RECOVERY_DELAY seconds. The reaper deletes in batches
+# and sleeps CART_REAP_PAUSE seconds between them.
+CART_COOKIE_NAME = 'cart'
+CART_ABANDONED_TTL = env.int('CART_ABANDONED_TTL', default=60 * 60 * 24 * 30)
+CART_RECOVERY_DELAY = env.int('CART_RECOVERY_DELAY', default=60 * 60 * 24)
+CART_REAP_BATCH_SIZE = env.int('CART_REAP_BATCH_SIZE', default=1000)
+CART_REAP_PAUSE = env.float('CART_REAP_PAUSE', default=0.1)
+
+# Stock: recipients of the low-stock digest
+STOCK_DIGEST_RECIPIENTS = env.list('STOCK_DIGEST_RECIPIENTS', default=[])
+
+# Dashboard KPIs: cached counters live DASHBOARD_KPI_TTL seconds unless
+# reconciled; carts touched within DASHBOARD_ACTIVE_CART_WINDOW count as active
+DASHBOARD_KPI_TTL = env.int('DASHBOARD_KPI_TTL', default=60 * 60)
+DASHBOARD_ACTIVE_CART_WINDOW = env.int('DASHBOARD_ACTIVE_CART_WINDOW', default=60 * 60)
+
+# Recommendations: neighbours kept per product, minimum shared orders and
+# how many days of orders the nightly build uses
+RECOMMENDATION_TOP_K = env.int('RECOMMENDATION_TOP_K', default=12)
+RECOMMENDATION_MIN_SUPPORT = env.int('RECOMMENDATION_MIN_SUPPORT', default=2)
+RECOMMENDATION_WINDOW_DAYS = env.int('RECOMMENDATION_WINDOW_DAYS', default=365)
+
+# Product ranking: order days counted, half-life of a day's sales, how long
+# a product counts as new and how much that adds to its score (in units per
+# day), products flagged as bestsellers and list length per cached section
+RANKING_WINDOW_DAYS = env.int('RANKING_WINDOW_DAYS', default=90)
+RANKING_HALF_LIFE_DAYS = env.float('RANKING_HALF_LIFE_DAYS', default=7)
+RANKING_NEW_DAYS = env.int('RANKING_NEW_DAYS', default=30)
+RANKING_NEW_BOOST = env.float('RANKING_NEW_BOOST', default=1.0)
+RANKING_BESTSELLER_COUNT = env.int('RANKING_BESTSELLER_COUNT', default=50)
+RANKING_TOP_N = env.int('RANKING_TOP_N', default=24)
+RANKING_CACHE_TTL = env.int('RANKING_CACHE_TTL', default=60 * 60 * 24)
+
+# Storefront fragment cache: how long rendered fragments are kept and how
+# many lookups a process counts before adding them to the shared hit stats
+FRAGMENT_CACHE_TIMEOUT = env.int('FRAGMENT_CACHE_TIMEOUT', default=60 * 60 * 24)
+FRAGMENT_STATS_FLUSH_EVERY = env.int('FRAGMENT_STATS_FLUSH_EVERY', default=100)
+
+# Sitemaps and shopping feeds: output directory and its public URL, and
+# product ids per sitemap shard (the protocol allows 50,000 URLs per file)
+SITE_SCHEME = env('SITE_SCHEME', default='https')
+FEED_ROOT = env('FEED_ROOT', default='') or str(MEDIA_ROOT / 'feeds')
+FEED_URL = env('FEED_URL', default=MEDIA_URL + 'feeds/')
+SITEMAP_SHARD_SIZE = env.int('SITEMAP_SHARD_SIZE', default=50000)
+
+# Invoices: TTF font with Arabic glyphs (DejaVu Sans ships with the orders app;
+# Amiri or Noto Naskh Arabic look better if installed)
+INVOICE_FONT_PATH = (env('INVOICE_FONT_PATH', default='')
+                     or str(BASE_DIR / 'apps' / 'orders' / 'fonts' / 'DejaVuSans.ttf'))
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -11,6 +11,7 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', '[::1]']
 # Development-specific apps
 INSTALLED_APPS += [
     'debug_toolbar',
+    'django_extensions',
 ]
 
 MIDDLEWARE += [
@@ -34,6 +35,12 @@ INTERNAL_IPS = [
 # Email backend for development
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
+# Payments are simulated in-process
+PAYMENT_GATEWAY = env('PAYMENT_GATEWAY', default='apps.payment.gateways.FakeGateway')
+
+# Run Celery tasks inline unless a worker and broker are available
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=True)
+
 # Cache - Use dummy cache for development
 CACHES = {
     'default': {
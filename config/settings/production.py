@@ -0,0 +1,44 @@
+"""
+Production settings
+"""
+
+from .base import *
+
+DEBUG = False
+
+# Database - PostgreSQL primary, optional streaming replicas (DB_REPLICA_HOSTS)
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env('DB_NAME', default='ecommerce_db'),
+        'USER': env('DB_USER', default='postgres'),
+        'PASSWORD': env('DB_PASSWORD', default=''),
+        'HOST': env('DB_HOST', default='localhost'),
+        'PORT': env('DB_PORT', default='5432'),
+        # Keep connections open between requests and check them before reuse
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'connect_timeout': env.int('DB_CONNECT_TIMEOUT', default=5),
+        },
+    }
+}
+if env('GUNICORN_WORKER_CLASS', default='gthread') == 'gevent':
+    # Every request runs in a new greenlet, so a persistent connection would
+    # never be reused; pool with PgBouncer instead.
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+for index, host in enumerate(env.list('DB_REPLICA_HOSTS', default=[])):
+    DATABASES[f'replica_{index}'] = dict(DATABASES['default'], HOST=host)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# Cache - Redis (also backs rate limits and write-behind queues)
+CACHES = {
+    'default': {
+        'BACKEND': 'django_redis.cache.RedisCache',
+        'LOCATION': env('REDIS_URL', default='redis://localhost:6379/0'),
+        'OPTIONS': {
+            'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+        },
+    }
+}
@@ -0,0 +1,64 @@
+"""
+Testing settings
+"""
+
+import tempfile
+
+from .base import *
+
+DEBUG = False
+
+# File-backed test database so concurrency tests get real locking
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 30,
+        },
+        'TEST': {
+            'NAME': os.path.join(tempfile.gettempdir(), 'ecommerce_test.sqlite3'),
+        },
+    },
+    # Stand-in read replica: a second connection to the same test database.
+    # Routing to it is enabled per test with DATABASE_REPLICAS=['replica'].
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 30,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+# Local stand-ins for outbound email, SMS and payments
+EMAIL_BACKEND = 'django.core.mail.backends.locmem.EmailBackend'
+SMS_BACKEND = 'apps.core.sms.LocmemBackend'
+PAYMENT_GATEWAY = 'apps.payment.gateways.FakeGateway'
+
+# Run Celery tasks inline
+CELERY_TASK_ALWAYS_EAGER = True
+CELERY_TASK_EAGER_PROPAGATES = True
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'testing',
+    }
+}
+
+# Static files
+STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
+
+# Logging
+LOGGING['handlers'].pop('file')
+LOGGING['loggers']['django']['handlers'] = ['console']
+LOGGING['loggers']['django']['level'] = 'ERROR'
+LOGGING['root']['level'] = 'WARNING'
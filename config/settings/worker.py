@@ -0,0 +1,23 @@
+"""
+Lean settings for Celery workers and maintenance commands.
+
+Drops the apps that only serve the admin, templates and browser clients,
+so workers boot faster. Do not run migrate, collectstatic or the web server
+with this profile.
+
+    DJANGO_SETTINGS_MODULE=config.settings.worker celery -A config worker -l info
+"""
+
+from .production import *
+
+WEB_ONLY_APPS = [
+    'django.contrib.humanize',
+    'django.contrib.staticfiles',
+    'crispy_forms',
+    'crispy_bootstrap5',
+    'corsheaders',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in WEB_ONLY_APPS]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE
+              if not middleware.startswith(('corsheaders.', 'whitenoise.'))]
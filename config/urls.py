@@ -2,21 +2,29 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from django.views.generic import TemplateView
+
+from apps.store.views import home, sitemap_index
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     
     path('accounts/', include('allauth.urls')),
     
-    path('', TemplateView.as_view(template_name='home.html'), name='home'),
+    path('store/', include('apps.store.urls')),
+    path('cart/', include('apps.cart.urls')),
+    path('orders/', include('apps.orders.urls')),
+    path('payment/', include('apps.payment.urls')),
+    path('dashboard/', include('apps.dashboard.urls')),
+    
+    path('sitemap.xml', sitemap_index, name='sitemap'),
+    path('', home, name='home'),
 ]
 
 if settings.DEBUG:
-    import debug_toolbar
-    urlpatterns = [
-        path('__debug__/', include(debug_toolbar.urls)),
-    ] + urlpatterns
+    if 'debug_toolbar' in settings.INSTALLED_APPS:
+        urlpatterns = [
+            path('__debug__/', include('debug_toolbar.urls')),
+        ] + urlpatterns
     
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)